@@ -4,15 +4,31 @@
 # - side: "R" (rojo/blancas) o "N" (negras)
 # - Devuelve jugadas en formato algebraico: "e3-f4" o "c3-e5-g7" (cadena)
 
-from typing import List, Optional, Tuple, Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from pathlib import Path
 import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from experience_log import ExperienceLog
+from position_key import SIDE_HASH, base_hash, key_hash, move_delta, position_hash
+from shared_cache import SharedTT, key_hash as _stable_hash, shared_tt_from_env
 
 Board = List[List[Optional[str]]]
 Coord = Tuple[int, int]
 
 BOARD_SIZE = 10
-IA_ENGINE_VERSION = "IA-ENGINE v7+EXP"
+IA_ENGINE_VERSION = "IA-ENGINE v8+EXP"
+# Reglas del generador de jugadas (damas voladoras + mayoría). Las filas
+# de experiencia validadas al guardarse llevan este tag ("rules"); al
+# cambiar las reglas se sube y las filas de otras reglas se ignoran.
+RULESET_VERSION = "flying-majority-1"
+
+# Nombre fijo: este archivo se carga vía ai_engine/__init__.py con otro __name__
+log = logging.getLogger("ai_engine")
 
 # -------------------------------------------------------------------
 # Archivo donde se guardan las jugadas de experiencia (JSONL)
@@ -39,6 +55,38 @@ def board_to_key(board: Board, side: str) -> str:
     return "/".join(rows) + f"|side:{side}"
 
 
+def key_to_board(k: str) -> Tuple[Optional[Board], Optional[str]]:
+    """
+    Inversa de board_to_key: devuelve (board, side).
+    side es None si la key no trae '|side:'. (None, None) si es inválida.
+    """
+    if not isinstance(k, str):
+        return None, None
+    side: Optional[str] = None
+    body = k
+    if "|side:" in k:
+        body, side = k.split("|side:", 1)
+        side = side.strip() or None
+    rows = body.split("/")
+    if len(rows) != BOARD_SIZE or any(len(row) != BOARD_SIZE for row in rows):
+        return None, None
+    board: Board = [[(ch if ch in ("r", "n", "R", "N") else None) for ch in row] for row in rows]
+    return board, side
+
+
+def initial_board() -> Board:
+    """Posición inicial: 4 filas de peones por bando en casillas oscuras."""
+    board: Board = [[None] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+    for r in range(BOARD_SIZE):
+        for c in range(BOARD_SIZE):
+            if (r + c) % 2 == 1:
+                if r < 4:
+                    board[r][c] = "n"
+                elif r > 5:
+                    board[r][c] = "r"
+    return board
+
+
 # -------------------------------------------------------------------
 # ✅ NUEVO: helpers para aprendizaje independiente del side
 # -------------------------------------------------------------------
@@ -59,127 +107,250 @@ def legal_moves_set(board: Board, side: str) -> set:
         return set()
 
 
+def normalize_move_str(move: str) -> str:
+    """'C3xE5:G7' / 'c3 - d4' -> 'c3-e5-g7' / 'c3-d4'."""
+    s = str(move or "").strip().lower()
+    for sep in ("x", "×", ":", " "):
+        s = s.replace(sep, "-")
+    return "-".join(p for p in s.split("-") if p)
+
+
+def find_legal_move(board: Board, side: str, move: str, moves: Optional[List["Move"]] = None) -> Optional["Move"]:
+    """
+    Jugada legal que corresponde a `move` (o None).
+    Acepta la ruta completa o solo origen-destino si no es ambigua.
+    `moves`: jugadas legales ya generadas para (board, side), si las hay.
+    """
+    code = parse_move(move)
+    if code is None:
+        return None
+    if moves is None:
+        moves = generate_legal_moves(board, side)
+    for mv in moves:
+        if mv.code == code:
+            return mv
+    squares = route_squares(code)
+    if len(squares) == 2:
+        fr, to = squares
+        ends = [mv for mv in moves if mv.fr * BOARD_SIZE + mv.fc == fr and mv.tr * BOARD_SIZE + mv.tc == to]
+        if len(ends) == 1:
+            return ends[0]
+    return None
+
+
+def find_move_by_code(moves: List["Move"], code: Optional[int]) -> Optional["Move"]:
+    for mv in moves:
+        if mv.code == code:
+            return mv
+    return None
+
+
 # -------------------------------------------------------------------
 # Carga de patrones aprendidos desde ai_moves.jsonl (por KEY)
 # Soporta:
 #  - formato recomendado: {"k": "<key>", "move": "e3-f4", "score": 1, ...}
 #  - fallback legacy: {"fen": "<fen>", "move": "..."} si aún existe
 # Acumula puntaje por jugada o conteo si no hay score
+# Se lee vía experience_log.py: tabla compacta (score = suma ya
+# agregada) + segmentos vivos, no toda la historia.
+# Filas con "rules": ya validadas y normalizadas al guardarse (ver
+# _append_moves_to_jsonl en main.py); si el tag es de otras reglas se
+# ignoran. Filas sin tag (legacy) se validan una vez, al cargar: las
+# ilegales se descartan.
+#
+# En memoria: hash de la posición -> {código de jugada: score} (ver
+# position_key.py). Filas con side van bajo su hash; sin side (o fen)
+# bajo el hash base. Consultar una posición es probar 1-3 hashes, sin
+# generar jugadas; "tablero sin side" prueba base^R / base^N y base
+# (de este solo las jugadas cuya pieza de salida es del bando).
+# La tabla se cachea y solo se recarga cuando cambia
+# ExperienceLog.signature() (como experience_engine).
+# Scores enteros se guardan como int (los pequeños no ocupan memoria).
 # -------------------------------------------------------------------
+LearnedTable = Dict[int, Dict[int, float]]
+
+# (archivo, max_lines, signature()) -> tabla; una sola asignación
+_LEARNED_CACHE: Optional[Tuple[Tuple[Any, ...], LearnedTable]] = None
+
+
+def _move_side(board: Board, code: int) -> Optional[str]:
+    """Bando de la pieza en la casilla de salida de la jugada."""
+    sq = (code & _SQ_MASK) - 1
+    return piece_color(board[sq // BOARD_SIZE][sq % BOARD_SIZE])
+
+
 def load_learned_patterns(
     max_lines: int = 5000,
-) -> Dict[str, Dict[str, float]]:
+) -> LearnedTable:
     """
-    Devuelve:
+    Devuelve (cacheada mientras el log no cambie):
       patrones: dict
         {
-          "<key_or_fen>": {
-             "<move>": score_acumulado (float),
-             ...
-          },
+          <hash de la posición>: {<código de jugada>: score_acumulado, ...},
           ...
         }
     """
-    patrones: Dict[str, Dict[str, float]] = {}
+    global _LEARNED_CACHE
 
-    if not LEARNED_FILE.exists():
-        print(f"[IA-LEARN][LOAD] file NOT FOUND -> {LEARNED_FILE}")
-        return patrones
+    explog = ExperienceLog(LEARNED_FILE)
+    sig = (str(LEARNED_FILE), max_lines, explog.signature())
+    cached = _LEARNED_CACHE
+    if cached is not None and cached[0] == sig:
+        return cached[1]
 
     # Confirmar que se está leyendo el archivo correcto y actualizado
-    try:
-        st = LEARNED_FILE.stat()
-        print(
-            f"[IA-LEARN][LOAD] file={LEARNED_FILE} "
-            f"bytes={st.st_size} mtime={int(st.st_mtime)} max_lines={max_lines}"
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(
+            "learned load: file=%s segments=%s max_lines=%d",
+            LEARNED_FILE, sig[2], max_lines,
         )
-    except Exception as e:
-        print(f"[IA-LEARN][LOAD] stat error: {repr(e)} file={LEARNED_FILE}")
 
+    patrones: LearnedTable = {}
+    # filas legacy: (key, bando) -> códigos legales
+    legal: Dict[Tuple[str, str], Set[int]] = {}
     loaded_lines = 0
 
-    with LEARNED_FILE.open("r", encoding="utf-8") as f:
-        for i, line in enumerate(f):
-            if i >= max_lines:
-                break
-            line = line.strip()
-            if not line:
-                continue
+    for row in explog.iter_rows(max_rows=max_lines):
+        loaded_lines += 1
 
-            loaded_lines += 1
+        move = row.get("move")
+        if not move or move == "__GAME_RESULT__":
+            continue
+        rules = row.get("rules")
+        if rules is not None and rules != RULESET_VERSION:
+            continue
+        code = parse_move(move)
+        if code is None:
+            continue
 
+        key = row.get("k") or row.get("fen")
+        if key is None:
+            continue
+
+        # si key viene como lista/dict (legacy), convertir a string estable
+        if not isinstance(key, str):
             try:
-                row = json.loads(line)
+                key = json.dumps(key, ensure_ascii=False, separators=(",", ":"))
             except Exception:
                 continue
+        h = key_hash(key)
+        if h is None:
+            continue
 
-            move = row.get("move")
-            if not move or move == "__GAME_RESULT__":
+        if rules is None:
+            board, key_side = _key_position(key)
+            if board is None:
                 continue
-
-            k = row.get("k")
-            fen = row.get("fen")
-
-            key = k or fen
-            if key is None:
+            mover = key_side if key_side in SIDE_HASH else _move_side(board, code)
+            if mover is None:
+                continue
+            codes = legal.get((key, mover))
+            if codes is None:
+                codes = legal[(key, mover)] = {mv.code for mv in generate_legal_moves(board, mover)}
+            if code not in codes:
                 continue
 
-            # si key viene como lista/dict (legacy), convertir a string estable
-            if not isinstance(key, str):
-                try:
-                    key = json.dumps(key, ensure_ascii=False, separators=(",", ":"))
-                except Exception:
-                    continue
+        try:
+            score = float(row.get("score", 1.0))
+        except Exception:
+            score = 1.0
+        if score.is_integer():
+            score = int(score)
 
-            try:
-                score = float(row.get("score", 1.0))
-            except Exception:
-                score = 1.0
+        slot = patrones.get(h)
+        if slot is None:
+            slot = patrones[h] = {}
+        slot[code] = slot.get(code, 0) + score
 
-            # ✅ Guardar por KEY completa (con side)
-            d = patrones.setdefault(key, {})
-            d[move] = d.get(move, 0.0) + score
+    log.debug("learned load: lines_scanned=%d positions=%d", loaded_lines, len(patrones))
 
-            # ✅ NUEVO: guardar también por KEY SIN side
-            base = strip_side_from_key(key)
-            if base and base != key:
-                d2 = patrones.setdefault(base, {})
-                d2[move] = d2.get(move, 0.0) + score
+    _LEARNED_CACHE = (sig, patrones)
+    return patrones
 
-    print(f"[IA-LEARN][LOAD] lines_scanned={loaded_lines} keys_loaded={len(patrones)}")
 
-    return patrones
+def _key_position(key: str) -> Tuple[Optional[Board], Optional[str]]:
+    """(board, side) de una key de board_to_key o de un fen legacy (side None)."""
+    if key.lstrip().startswith("["):
+        try:
+            rows = json.loads(key)
+            board: Board = [[(ch if ch in ("r", "n", "R", "N") else None) for ch in row] for row in rows]
+        except (ValueError, TypeError):
+            return None, None
+        if len(board) != BOARD_SIZE or any(len(row) != BOARD_SIZE for row in board):
+            return None, None
+        return board, None
+    return key_to_board(key)
+
+
+def learned_moves_for(
+    patrones: LearnedTable,
+    key: Optional[str],
+    sideless_only: bool = False,
+    side: Optional[str] = None,
+) -> Dict[int, float]:
+    """
+    {código: score} de las jugadas aprendidas para `key`. Con side, las
+    de esa posición; sin side (tablero solo), las de cualquier bando más
+    las filas sin side (solo estas con `sideless_only`).
+    `side`: para una key sin side, solo las jugadas de ese bando.
+    """
+    if not patrones or not key:
+        return {}
+    board, key_side = _key_position(key)
+    if board is None:
+        return {}
+    base = base_hash(board)
+    if key_side in SIDE_HASH:
+        return dict(patrones.get(base ^ SIDE_HASH[key_side]) or {})
+
+    sides = (side,) if side in SIDE_HASH else ("R", "N")
+    out: Dict[int, float] = {}
+    if not sideless_only:
+        for s in sides:
+            for code, score in (patrones.get(base ^ SIDE_HASH[s]) or {}).items():
+                out[code] = out.get(code, 0) + score
+    for code, score in (patrones.get(base) or {}).items():
+        if _move_side(board, code) in sides:
+            out[code] = out.get(code, 0) + score
+    return out
+
+
+def _best_learned(moves: Dict[int, float]) -> Optional[str]:
+    best_code, best_score = None, float("-inf")
+    for code, score in moves.items():
+        if score > best_score:
+            best_score = score
+            best_code = code
+    return move_str(best_code) if best_code is not None else None
 
 
 def get_learned_move_by_key(
     key: Optional[str],
     max_lines: int = 5000,
+    side: Optional[str] = None,
+    patrones: Optional[LearnedTable] = None,
 ) -> Optional[str]:
     """
     Si existe una jugada aprendida para esta KEY en ai_moves.jsonl,
     devuelve la jugada con mayor score acumulado. Si no, devuelve None.
+    Key sin '|side:' = tablero sin side (ver learned_moves_for; `side`
+    limita a las jugadas de ese bando). `patrones`: tabla ya cargada.
     """
     if not key:
-        print("[IA-LEARN] key=None (no se puede buscar)")
+        log.debug("learned lookup: key vacía")
         return None
 
-    patrones = load_learned_patterns(max_lines=max_lines)
+    if patrones is None:
+        patrones = load_learned_patterns(max_lines=max_lines)
 
-    print(f"[IA-LEARN][LOOKUP] searching key_head={key[:90]}...")
-
-    moves_for_key = patrones.get(key)
+    moves_for_key = learned_moves_for(patrones, key, side=side)
     if not moves_for_key:
-        print(f"[IA-LEARN] MISS key -> {key[:90]}...")
+        log.debug("learned lookup: miss key=%s", key)
         return None
 
-    best_move, best_score = None, float("-inf")
-    for move_str, score in moves_for_key.items():
-        if score > best_score:
-            best_score = score
-            best_move = move_str
-
+    best_move = _best_learned(moves_for_key)
     if best_move is not None:
-        print(f"[IA-LEARN] HIT key -> {best_move} (score={best_score})")
+        log.debug("learned lookup: hit move=%s", best_move)
 
     return best_move
 
@@ -187,6 +358,8 @@ def get_learned_move_by_key(
 def get_learned_move_fallback_fen(
     fen: Optional[str],
     max_lines: int = 5000,
+    side: Optional[str] = None,
+    patrones: Optional[LearnedTable] = None,
 ) -> Optional[str]:
     """
     Fallback opcional (legacy): si en tu JSONL aún guardas 'fen'
@@ -201,19 +374,15 @@ def get_learned_move_fallback_fen(
         except Exception:
             return None
 
-    patrones = load_learned_patterns(max_lines=max_lines)
-    moves_for_fen = patrones.get(fen)
+    if patrones is None:
+        patrones = load_learned_patterns(max_lines=max_lines)
+    moves_for_fen = learned_moves_for(patrones, fen, sideless_only=True, side=side)
     if not moves_for_fen:
         return None
 
-    best_move, best_score = None, float("-inf")
-    for move_str, score in moves_for_fen.items():
-        if score > best_score:
-            best_score = score
-            best_move = move_str
-
+    best_move = _best_learned(moves_for_fen)
     if best_move is not None:
-        print(f"[IA-LEARN] HIT fen -> {best_move} (score={best_score})")
+        log.debug("learned lookup: hit fen move=%s", best_move)
 
     return best_move
 
@@ -268,11 +437,70 @@ def from_alg(coord: str) -> Coord:
     return (row, col)
 
 
+# -------------------------------------------------------
+# Casillas y jugadas como enteros
+# - casilla: sq = fila * 10 + col (0..99)
+# - jugada: la ruta empaquetada en un int, 7 bits por casilla (sq + 1,
+#   así 0 marca el final), la casilla de salida en los bits bajos
+# La búsqueda, el orden de jugadas y la TT solo manejan estos ints;
+# el texto ("c3-e5-g7") se genera/parsea en los bordes (API, logs,
+# experiencia) con tablas precalculadas y strings internados.
+# -------------------------------------------------------
+_SQ_BITS = 7
+_SQ_MASK = (1 << _SQ_BITS) - 1
+
+SQ_ALG: Tuple[str, ...] = tuple(
+    sys.intern(to_alg(sq // BOARD_SIZE, sq % BOARD_SIZE)) for sq in range(BOARD_SIZE * BOARD_SIZE)
+)
+ALG_SQ: Dict[str, int] = {name: sq for sq, name in enumerate(SQ_ALG)}
+
+# código -> "c3-e5-g7" (internado); se vacía entero al llenarse
+_MOVE_STR: Dict[int, str] = {}
+_MOVE_STR_MAX = 1 << 16
+
+
+def encode_route(route: List[Coord]) -> int:
+    code = 0
+    for r, c in reversed(route):
+        code = (code << _SQ_BITS) | (r * BOARD_SIZE + c + 1)
+    return code
+
+
+def route_squares(code: int) -> List[int]:
+    out: List[int] = []
+    while code:
+        out.append((code & _SQ_MASK) - 1)
+        code >>= _SQ_BITS
+    return out
+
+
+def move_str(code: int) -> str:
+    """Código de jugada -> algebraica (cacheada e internada)."""
+    s = _MOVE_STR.get(code)
+    if s is None:
+        s = sys.intern("-".join([SQ_ALG[sq] for sq in route_squares(code)]))
+        if len(_MOVE_STR) >= _MOVE_STR_MAX:
+            _MOVE_STR.clear()
+        _MOVE_STR[code] = s
+    return s
+
+
+def parse_move(move: str) -> Optional[int]:
+    """'C3xE5:G7' / 'c3-d4' -> código, o None si alguna casilla no existe."""
+    code = 0
+    try:
+        for name in reversed(normalize_move_str(move).split("-")):
+            code = (code << _SQ_BITS) | (ALG_SQ[name] + 1)
+    except KeyError:
+        return None
+    return code or None
+
+
 # -------------------------------------------------------
 # Representación de jugadas
 # -------------------------------------------------------
 class Move:
-    __slots__ = ("fr", "fc", "tr", "tc", "captures", "route")
+    __slots__ = ("fr", "fc", "tr", "tc", "captures", "route", "code")
 
     def __init__(
         self,
@@ -282,6 +510,7 @@ class Move:
         tc: int,
         captures: Optional[List[Coord]] = None,
         route: Optional[List[Coord]] = None,
+        code: Optional[int] = None,
     ) -> None:
         self.fr = fr
         self.fc = fc
@@ -289,16 +518,14 @@ class Move:
         self.tc = tc
         self.captures: List[Coord] = captures or []
         self.route: List[Coord] = route or [(fr, fc), (tr, tc)]
+        self.code: int = code if code is not None else encode_route(self.route)
 
     @property
     def is_capture(self) -> bool:
         return len(self.captures) > 0
 
     def to_algebraic(self) -> str:
-        if self.route and len(self.route) > 1:
-            parts = [to_alg(r, c) for (r, c) in self.route]
-            return "-".join(parts)
-        return f"{to_alg(self.fr, self.fc)}-{to_alg(self.tr, self.tc)}"
+        return move_str(self.code)
 
     def __repr__(self) -> str:
         return f"Move({self.fr},{self.fc}->{self.tr},{self.tc}, caps={self.captures}, route={self.route})"
@@ -332,201 +559,230 @@ def pawn_forward_dr(piece: str) -> int:
 
 
 # -------------------------------------------------------
-# Generación de capturas (multi-saltos)
+# Rayos diagonales precalculados
+# RAYS[r][c][i] = casillas desde (r, c) hacia DIRECTIONS[i] hasta el
+# borde (sin incluir (r, c)). El peón usa solo la primera (y la
+# segunda para saltar) de sus 2 rayos hacia delante; la dama recorre
+# el rayo entero (dama voladora).
 # -------------------------------------------------------
 DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
 
+Ray = Tuple[Coord, ...]
 
-def _explore_captures_for_piece(
-    board: Board,
-    side: str,
-    r: int,
-    c: int,
-    path: List[Coord],
-    captures: List[Coord],
-    results: List[Move],
-    start_r: int,
-    start_c: int,
-) -> None:
-    piece = board[r][c]
-    if piece is None:
-        return
-
-    enemy_color = "N" if side == "R" else "R"
-    found = False
-
-    forbidden = set(captures)
-    forbidden.add((start_r, start_c))
-
-    for dr, dc in DIRECTIONS:
-        if not is_king(piece):
-            pf = pawn_forward_dr(piece)
-            if dr != pf:
-                continue
 
-        r_mid = r + dr
-        c_mid = c + dc
-        r_to = r + 2 * dr
-        c_to = c + 2 * dc
-
-        if not (in_bounds(r_mid, c_mid) and in_bounds(r_to, c_to)):
-            continue
-
-        if (r_to, c_to) in path:
-            continue
+def _build_rays() -> List[List[Tuple[Ray, ...]]]:
+    rays: List[List[Tuple[Ray, ...]]] = []
+    for r in range(BOARD_SIZE):
+        row: List[Tuple[Ray, ...]] = []
+        for c in range(BOARD_SIZE):
+            per_dir: List[Ray] = []
+            for dr, dc in DIRECTIONS:
+                sq: List[Coord] = []
+                rr, cc = r + dr, c + dc
+                while in_bounds(rr, cc):
+                    sq.append((rr, cc))
+                    rr += dr
+                    cc += dc
+                per_dir.append(tuple(sq))
+            row.append(tuple(per_dir))
+        rays.append(row)
+    return rays
+
+
+RAYS = _build_rays()
+# índices en DIRECTIONS de los rayos "hacia delante" de cada bando
+_PAWN_RAYS = {"R": (0, 1), "N": (2, 3)}
+_SIDE_PIECES = {"R": ("r", "R"), "N": ("n", "N")}  # (peón, dama)
 
-        if (r_mid, c_mid) in forbidden or (r_to, c_to) in forbidden:
-            continue
 
-        mid_piece = board[r_mid][c_mid]
-        dest_piece = board[r_to][c_to]
-
-        if (
-            mid_piece is not None
-            and piece_color(mid_piece) == enemy_color
-            and dest_piece is None
-        ):
-            found = True
-            new_board = clone_board(board)
-            moving_piece = new_board[r][c]
-            new_board[r][c] = None
-            new_board[r_mid][c_mid] = None
-            new_board[r_to][c_to] = moving_piece
-
-            new_path = path + [(r_to, c_to)]
-            new_captures = captures + [(r_mid, c_mid)]
-
-            _explore_captures_for_piece(
-                new_board,
-                side,
-                r_to,
-                c_to,
-                new_path,
-                new_captures,
-                results,
-                start_r,
-                start_c,
-            )
-
-    if not found and captures:
-        start_rr, start_cc = path[0]
-        end_r, end_c = path[-1]
-        results.append(
-            Move(
-                start_rr,
-                start_cc,
-                end_r,
-                end_c,
-                captures=list(captures),
-                route=list(path),
-            )
-        )
+# -------------------------------------------------------
+# Generación de capturas (multi-saltos)
+# -------------------------------------------------------
+# Ley de la mayoría como chainPolicies.js: primero cantidad de piezas,
+# luego puntos (dama 1.5, peón 1). Cada captura suma 100 + puntos, así
+# una sola suma ordena igual que (cantidad, puntos): los puntos de una
+# cadena nunca llegan a 100.
+_MAJORITY_COUNT = 100.0
+_CAPTURE_VALUE = {ch: _MAJORITY_COUNT + piece_value(ch) for ch in ("r", "n", "R", "N")}
 
 
 def generate_capture_moves(board: Board, side: str) -> List[Move]:
-    all_moves: List[Move] = []
+    """
+    Capturas obligatorias por ley de la mayoría (cantidad, luego puntos)
+    y, a igualdad total, preferencia de dama (PREFER_QUEEN_ON_MIXED_PURE_TIE).
+
+    Reglas (las de src/rules/pieces y chain.js):
+      - peón: salta solo hacia delante; si corona, la cadena termina
+      - dama voladora: recorre la diagonal hasta la primera pieza; si es
+        enemiga, cada casilla libre detrás es un aterrizaje distinto
+      - las piezas capturadas siguen en el tablero hasta el final de la
+        cadena (no se saltan dos veces y bloquean el paso)
+      - no se aterriza en una casilla donde la cadena ya se detuvo ni se
+        cruza la de salida (la pieza sigue ahí en `board`: hace de muro)
+
+    Búsqueda en profundidad por pieza sin clonar el tablero: las piezas
+    capturadas van en `forbidden`. El valor de cada secuencia se acumula
+    al saltar (una vez); solo se guardan las del mejor valor visto y se
+    podan las ramas que no pueden alcanzarlo: un peón solo captura hacia
+    delante, así que su cota es lo ya capturado + el material enemigo en
+    filas por delante.
+    """
+    pawn_ch, king_ch = _SIDE_PIECES[side]
+    enemy = _SIDE_PIECES["N" if side == "R" else "R"]
 
+    # un solo recorrido: piezas propias + material enemigo por fila
+    # -> ahead[r] = material en filas "por delante" de r
+    pieces: List[Tuple[int, int, bool]] = []
+    row_value = [0.0] * BOARD_SIZE
     for r in range(BOARD_SIZE):
+        row = board[r]
         for c in range(BOARD_SIZE):
-            piece = board[r][c]
-            if piece is None:
-                continue
-            if piece_color(piece) != side:
+            ch = row[c]
+            if ch is None:
                 continue
-
-            _explore_captures_for_piece(
-                board,
-                side,
-                r,
-                c,
-                path=[(r, c)],
-                captures=[],
-                results=all_moves,
-                start_r=r,
-                start_c=c,
-            )
-
-    if not all_moves:
+            if ch in enemy:
+                row_value[r] += _CAPTURE_VALUE[ch]
+            elif ch == pawn_ch:
+                pieces.append((r, c, True))
+            elif ch == king_ch:
+                pieces.append((r, c, False))
+    total_enemy = sum(row_value)
+    if total_enemy == 0.0 or not pieces:
         return []
-
-    values: List[float] = []
-    for mv in all_moves:
-        v = sum(piece_value(board[rr][cc]) for (rr, cc) in mv.captures)
-        values.append(v)
-
-    max_val = max(values)
+    ahead = [0.0] * BOARD_SIZE
+    acc = 0.0
+    rows = range(BOARD_SIZE) if side == "R" else range(BOARD_SIZE - 1, -1, -1)
+    for r in rows:
+        ahead[r] = acc          # estrictamente por delante (R sube: filas < r)
+        acc += row_value[r]
+
+    pawn_rays = _PAWN_RAYS[side]
+    best_val = 0.0
     best_moves: List[Move] = []
-    for mv in all_moves:
-        captured_value = sum(piece_value(board[rr][cc]) for (rr, cc) in mv.captures)
-        if captured_value == max_val:
-            best_moves.append(mv)
-
-    king_moves: List[Move] = []
-    pawn_moves: List[Move] = []
-
-    for mv in best_moves:
-        piece = board[mv.fr][mv.fc] if 0 <= mv.fr < BOARD_SIZE and 0 <= mv.fc < BOARD_SIZE else None
-        if is_king(piece):
-            king_moves.append(mv)
-        else:
-            pawn_moves.append(mv)
+    path: List[Coord] = []
+    caps: List[Coord] = []
+    forbidden: set = set()
+
+    def explore(r: int, c: int, pawn: bool, value: float) -> None:
+        nonlocal best_val, best_moves
+        found = False
+        rays = RAYS[r][c]
+        for ray in ((rays[pawn_rays[0]], rays[pawn_rays[1]]) if pawn else rays):
+            n = len(ray)
+            j = 0
+            if not pawn:
+                while j < n and board[ray[j][0]][ray[j][1]] is None:
+                    j += 1
+            if j + 1 >= n:
+                continue
+            r_mid, c_mid = ray[j]
+            mid_piece = board[r_mid][c_mid]
+            if mid_piece not in enemy or (r_mid, c_mid) in forbidden:
+                continue
 
-    if king_moves and pawn_moves:
-        candidate_moves = king_moves
-    else:
-        candidate_moves = best_moves
+            v = value + _CAPTURE_VALUE[mid_piece]
+            end = j + 2 if pawn else n
+            j += 1
+            while j < end:
+                r_to, c_to = ray[j]
+                j += 1
+                if board[r_to][c_to] is not None:
+                    break
+                if (r_to, c_to) in path:
+                    continue
+                found = True
+                bound = v + (ahead[r_to] if pawn else total_enemy - v)
+                if bound < best_val:
+                    continue
+                caps.append((r_mid, c_mid))
+                path.append((r_to, c_to))
+                forbidden.add((r_mid, c_mid))
+                explore(r_to, c_to, pawn, v)
+                forbidden.discard((r_mid, c_mid))
+                path.pop()
+                caps.pop()
+
+        if not found and caps:
+            if value > best_val:
+                best_val = value
+                best_moves = []
+            if value == best_val:
+                (sr, sc), (er, ec) = path[0], path[-1]
+                best_moves.append(Move(sr, sc, er, ec, captures=list(caps), route=list(path)))
+
+    for r, c, pawn in pieces:
+        if pawn and ahead[r] < best_val:
+            continue
+        path.append((r, c))
+        explore(r, c, pawn, 0.0)
+        path.pop()
 
-    if len(candidate_moves) <= 1:
-        return candidate_moves
+    if len(best_moves) <= 1:
+        return best_moves
 
-    if side == "N":
-        best_row = max(mv.tr for mv in candidate_moves)
-        advanced_moves = [mv for mv in candidate_moves if mv.tr == best_row]
-    else:
-        best_row = min(mv.tr for mv in candidate_moves)
-        advanced_moves = [mv for mv in candidate_moves if mv.tr == best_row]
-
-    return advanced_moves if advanced_moves else candidate_moves
+    # empate total entre peón y dama -> solo las de dama
+    king_moves = [mv for mv in best_moves if board[mv.fr][mv.fc] == king_ch]
+    if king_moves and len(king_moves) < len(best_moves):
+        return king_moves
+    return best_moves
 
 
 # -------------------------------------------------------
 # Movimientos simples (sin captura)
 # -------------------------------------------------------
 def generate_quiet_moves(board: Board, side: str) -> List[Move]:
+    """Peón: 1 paso hacia delante. Dama: cualquier distancia por diagonal libre."""
     moves: List[Move] = []
+    pawn_ch, king_ch = _SIDE_PIECES[side]
+    f0, f1 = _PAWN_RAYS[side]
 
     for r in range(BOARD_SIZE):
+        row = board[r]
         for c in range(BOARD_SIZE):
-            piece = board[r][c]
-            if piece is None:
-                continue
-            if piece_color(piece) != side:
+            ch = row[c]
+            if ch is None:
                 continue
+            sq = r * BOARD_SIZE + c + 1      # código de la casilla de salida
+            if ch == pawn_ch:
+                rays = RAYS[r][c]
+                for ray in (rays[f0], rays[f1]):
+                    if ray and board[ray[0][0]][ray[0][1]] is None:
+                        rr, cc = ray[0]
+                        code = sq | ((rr * BOARD_SIZE + cc + 1) << _SQ_BITS)
+                        moves.append(Move(r, c, rr, cc, captures=[], route=[(r, c), (rr, cc)], code=code))
+            elif ch == king_ch:
+                for ray in RAYS[r][c]:
+                    for rr, cc in ray:
+                        if board[rr][cc] is not None:
+                            break
+                        code = sq | ((rr * BOARD_SIZE + cc + 1) << _SQ_BITS)
+                        moves.append(Move(r, c, rr, cc, captures=[], route=[(r, c), (rr, cc)], code=code))
 
-            if is_king(piece):
-                candidate_dirs = DIRECTIONS
-            else:
-                pf = pawn_forward_dr(piece)
-                candidate_dirs = [(pf, -1), (pf, 1)]
+    return moves
 
-            for dr, dc in candidate_dirs:
-                rr = r + dr
-                cc = c + dc
-                if not in_bounds(rr, cc):
-                    continue
-                if board[rr][cc] is None:
-                    moves.append(
-                        Move(
-                            r,
-                            c,
-                            rr,
-                            cc,
-                            captures=[],
-                            route=[(r, c), (rr, cc)],
-                        )
-                    )
 
-    return moves
+def count_quiet_moves(board: Board) -> Tuple[int, int]:
+    """(jugadas simples de R, de N) sin construir Move (movilidad de evaluate_board)."""
+    counts = {"r": 0, "n": 0, "R": 0, "N": 0}
+    for r in range(BOARD_SIZE):
+        row = board[r]
+        for c in range(BOARD_SIZE):
+            ch = row[c]
+            if ch is None:
+                continue
+            rays = RAYS[r][c]
+            if ch == "r" or ch == "n":
+                f0, f1 = _PAWN_RAYS["R" if ch == "r" else "N"]
+                for ray in (rays[f0], rays[f1]):
+                    if ray and board[ray[0][0]][ray[0][1]] is None:
+                        counts[ch] += 1
+            else:
+                for ray in rays:
+                    for rr, cc in ray:
+                        if board[rr][cc] is not None:
+                            break
+                        counts[ch] += 1
+    return counts["r"] + counts["R"], counts["n"] + counts["N"]
 
 
 def generate_legal_moves(board: Board, side: str) -> List[Move]:
@@ -539,13 +795,70 @@ def generate_legal_moves(board: Board, side: str) -> List[Move]:
 # -------------------------------------------------------
 # Evaluación
 # -------------------------------------------------------
+# Pesos a nivel de módulo (los usa también batch_eval.py)
+PAWN_VALUE          = 1.0
+KING_VALUE          = 1.5
+ADVANCE_WEIGHT      = 0.01
+KING_CENTER_WEIGHT  = 0.06
+EDGE_PENALTY        = 0.03
+MOBILITY_WEIGHT     = 0.03
+
+
+# Pesos ajustados offline (tuner.py). Si no existe el archivo, se usan los de arriba.
+EVAL_WEIGHTS_FILE = Path(
+    os.environ.get("DAMAS_EVAL_WEIGHTS")
+    or (Path(__file__).resolve().parent / "data" / "eval_weights.json")
+)
+EVAL_WEIGHTS_VERSION = "builtin"
+
+
+def eval_weights() -> Dict[str, float]:
+    return {
+        "pawn": PAWN_VALUE,
+        "king": KING_VALUE,
+        "advance": ADVANCE_WEIGHT,
+        "king_center": KING_CENTER_WEIGHT,
+        "edge": EDGE_PENALTY,
+        "mobility": MOBILITY_WEIGHT,
+    }
+
+
+def load_eval_weights(path: Optional[Path] = None) -> str:
+    """
+    Carga un archivo de pesos versionado ({"version", "weights": {...}})
+    y devuelve la versión activa. Pesos ausentes conservan su valor.
+    """
+    global PAWN_VALUE, KING_VALUE, ADVANCE_WEIGHT, KING_CENTER_WEIGHT
+    global EDGE_PENALTY, MOBILITY_WEIGHT, EVAL_WEIGHTS_VERSION
+
+    p = Path(path) if path else EVAL_WEIGHTS_FILE
+    try:
+        if not p.exists():
+            return EVAL_WEIGHTS_VERSION
+        obj = json.loads(p.read_text(encoding="utf-8"))
+        w = obj.get("weights") or {}
+        PAWN_VALUE = float(w.get("pawn", PAWN_VALUE))
+        KING_VALUE = float(w.get("king", KING_VALUE))
+        ADVANCE_WEIGHT = float(w.get("advance", ADVANCE_WEIGHT))
+        KING_CENTER_WEIGHT = float(w.get("king_center", KING_CENTER_WEIGHT))
+        EDGE_PENALTY = float(w.get("edge", EDGE_PENALTY))
+        MOBILITY_WEIGHT = float(w.get("mobility", MOBILITY_WEIGHT))
+        EVAL_WEIGHTS_VERSION = str(obj.get("version") or p.name)
+        log.info("eval weights loaded version=%s file=%s", EVAL_WEIGHTS_VERSION, p)
+    except Exception as e:
+        log.warning("eval weights no cargados (%r), se usan los actuales", e)
+    return EVAL_WEIGHTS_VERSION
+
+
+load_eval_weights()
+
+
+def engine_version() -> str:
+    """Versión efectiva del motor (código + pesos); sirve como parte de claves de caché."""
+    return f"{IA_ENGINE_VERSION}|{_search_tag()}|w:{EVAL_WEIGHTS_VERSION}"
+
+
 def evaluate_board(board: Board, side: str) -> float:
-    PAWN_VALUE          = 1.0
-    KING_VALUE          = 1.5
-    ADVANCE_WEIGHT      = 0.01
-    KING_CENTER_WEIGHT  = 0.06
-    EDGE_PENALTY        = 0.03
-    MOBILITY_WEIGHT     = 0.03
 
     own_color   = side
     enemy_color = "N" if side == "R" else "R"
@@ -601,8 +914,8 @@ def evaluate_board(board: Board, side: str) -> float:
                     enemy_score -= EDGE_PENALTY
 
     try:
-        own_moves   = len(generate_quiet_moves(board, own_color))
-        enemy_moves = len(generate_quiet_moves(board, enemy_color))
+        r_moves, n_moves = count_quiet_moves(board)
+        own_moves, enemy_moves = (r_moves, n_moves) if own_color == "R" else (n_moves, r_moves)
         mobility_score = (own_moves - enemy_moves) * MOBILITY_WEIGHT
     except Exception:
         mobility_score = 0.0
@@ -610,9 +923,157 @@ def evaluate_board(board: Board, side: str) -> float:
     return (own_score - enemy_score) + mobility_score
 
 
+# -------------------------------------------------------
+# Estadísticas de búsqueda (opcionales, por request)
+# -------------------------------------------------------
+CUTOFF_BUCKETS = 8  # índices 0..6 exactos, el último agrupa 7+
+
+
+class SearchStats:
+    """
+    Contadores de una búsqueda. Se pasa a minimax/choose_best_move;
+    con stats=None la búsqueda no mide nada (coste cero).
+    """
+    __slots__ = (
+        "nodes", "leaf_evals", "cutoffs", "cutoffs_by_index", "max_ply",
+        "capture_extensions", "movegen_time", "eval_time", "elapsed",
+        "depth", "source", "score", "researches", "aspiration_fails", "tt_hits",
+        "lmr_reductions", "lmr_researches", "futility_prunes", "razor_cuts", "razor_researches",
+        "repetitions", "king_rule_draws",
+    )
+
+    def __init__(self) -> None:
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.cutoffs = 0
+        self.cutoffs_by_index: List[int] = [0] * CUTOFF_BUCKETS
+        self.max_ply = 0
+        self.capture_extensions = 0
+        self.movegen_time = 0.0
+        self.eval_time = 0.0
+        self.elapsed = 0.0
+        self.depth = 0
+        self.source: Optional[str] = None
+        self.score: Optional[float] = None
+        self.researches = 0          # PVS: re-búsquedas tras fallo alto de ventana nula
+        self.aspiration_fails = 0
+        self.tt_hits = 0
+        self.lmr_reductions = 0
+        self.lmr_researches = 0      # reducida que falló alto -> profundidad completa
+        self.futility_prunes = 0
+        self.razor_cuts = 0
+        self.razor_researches = 0    # razoring no confirmado -> búsqueda normal
+        self.repetitions = 0         # nodos cortados por posición repetida (tablas)
+        self.king_rule_draws = 0
+
+    def record_cutoff(self, move_index: int) -> None:
+        self.cutoffs += 1
+        self.cutoffs_by_index[min(move_index, CUTOFF_BUCKETS - 1)] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "nodes": self.nodes,
+            "leaf_evals": self.leaf_evals,
+            "cutoffs": self.cutoffs,
+            "cutoffs_by_index": list(self.cutoffs_by_index),
+            "max_ply": self.max_ply,
+            "capture_extensions": self.capture_extensions,
+            "movegen_ms": round(self.movegen_time * 1000.0, 3),
+            "eval_ms": round(self.eval_time * 1000.0, 3),
+            "elapsed_ms": round(self.elapsed * 1000.0, 3),
+            "nps": int(self.nodes / self.elapsed) if self.elapsed > 0 else None,
+            "depth": self.depth,
+            "source": self.source,
+            "score": self.score,
+            "researches": self.researches,
+            "aspiration_fails": self.aspiration_fails,
+            "tt_hits": self.tt_hits,
+            "lmr_reductions": self.lmr_reductions,
+            "lmr_researches": self.lmr_researches,
+            "futility_prunes": self.futility_prunes,
+            "razor_cuts": self.razor_cuts,
+            "razor_researches": self.razor_researches,
+            "repetitions": self.repetitions,
+            "king_rule_draws": self.king_rule_draws,
+        }
+
+
+class SearchStatsAggregate:
+    """Acumulado thread-safe de SearchStats (para endpoints de métricas)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.searches = 0
+            self.by_source: Dict[str, int] = {}
+            self.totals = SearchStats()
+            self.max_elapsed = 0.0
+
+    def add(self, st: SearchStats) -> None:
+        with self._lock:
+            self.searches += 1
+            src = st.source or "unknown"
+            self.by_source[src] = self.by_source.get(src, 0) + 1
+            t = self.totals
+            t.nodes += st.nodes
+            t.leaf_evals += st.leaf_evals
+            t.cutoffs += st.cutoffs
+            for i, n in enumerate(st.cutoffs_by_index):
+                t.cutoffs_by_index[i] += n
+            t.max_ply = max(t.max_ply, st.max_ply)
+            t.capture_extensions += st.capture_extensions
+            t.movegen_time += st.movegen_time
+            t.eval_time += st.eval_time
+            t.elapsed += st.elapsed
+            t.researches += st.researches
+            t.aspiration_fails += st.aspiration_fails
+            t.tt_hits += st.tt_hits
+            t.lmr_reductions += st.lmr_reductions
+            t.lmr_researches += st.lmr_researches
+            t.futility_prunes += st.futility_prunes
+            t.razor_cuts += st.razor_cuts
+            t.razor_researches += st.razor_researches
+            t.repetitions += st.repetitions
+            t.king_rule_draws += st.king_rule_draws
+            self.max_elapsed = max(self.max_elapsed, st.elapsed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            d = self.totals.to_dict()
+            d.pop("source", None)
+            d.pop("score", None)
+            d.pop("depth", None)
+            n = max(self.searches, 1)
+            d.update({
+                "searches": self.searches,
+                "by_source": dict(self.by_source),
+                "avg_nodes": round(self.totals.nodes / n, 1),
+                "avg_elapsed_ms": round(self.totals.elapsed * 1000.0 / n, 3),
+                "max_elapsed_ms": round(self.max_elapsed * 1000.0, 3),
+            })
+            return d
+
+
+class SearchAborted(Exception):
+    """La búsqueda se canceló desde fuera (stop.is_set() devolvió True)."""
+
+
 # -------------------------------------------------------
 # MINIMAX + alpha-beta
 # -------------------------------------------------------
+def _evaluate_leaf(board: Board, side: str, stats: Optional[SearchStats]) -> float:
+    if stats is None:
+        return evaluate_board(board, side)
+    t0 = time.perf_counter()
+    score = evaluate_board(board, side)
+    stats.eval_time += time.perf_counter() - t0
+    stats.leaf_evals += 1
+    return score
+
+
 def minimax(
     board: Board,
     side_to_move: str,
@@ -620,13 +1081,32 @@ def minimax(
     alpha: float,
     beta: float,
     maximizing_side: str,
+    stats: Optional[SearchStats] = None,
+    ply: int = 0,
+    stop: Any = None,
 ) -> Tuple[float, Optional[Move]]:
+    # stop: objeto con is_set() (threading.Event o similar); si se activa
+    # la búsqueda termina con SearchAborted (pondering, cancelaciones)
+    if stop is not None and stop.is_set():
+        raise SearchAborted()
+
+    if stats is not None:
+        stats.nodes += 1
+        if ply > stats.max_ply:
+            stats.max_ply = ply
+
     if depth == 0:
-        return evaluate_board(board, maximizing_side), None
+        return _evaluate_leaf(board, maximizing_side, stats), None
+
+    if stats is None:
+        moves = generate_legal_moves(board, side_to_move)
+    else:
+        t0 = time.perf_counter()
+        moves = generate_legal_moves(board, side_to_move)
+        stats.movegen_time += time.perf_counter() - t0
 
-    moves = generate_legal_moves(board, side_to_move)
     if not moves:
-        score = evaluate_board(board, maximizing_side)
+        score = _evaluate_leaf(board, maximizing_side, stats)
         if side_to_move == maximizing_side:
             score -= 2.0
         else:
@@ -637,15 +1117,17 @@ def minimax(
 
     if side_to_move == maximizing_side:
         value = float("-inf")
-        for mv in moves:
+        for i, mv in enumerate(moves):
             newb = apply_move(board, mv, side_to_move)
             next_side = "N" if side_to_move == "R" else "R"
 
             next_depth = depth - 1
             if mv.is_capture and depth > 1:
                 next_depth = depth
+                if stats is not None:
+                    stats.capture_extensions += 1
 
-            child_val, _ = minimax(newb, next_side, next_depth, alpha, beta, maximizing_side)
+            child_val, _ = minimax(newb, next_side, next_depth, alpha, beta, maximizing_side, stats, ply + 1, stop)
 
             if child_val > value:
                 value = child_val
@@ -653,20 +1135,24 @@ def minimax(
 
             alpha = max(alpha, value)
             if beta <= alpha:
+                if stats is not None:
+                    stats.record_cutoff(i)
                 break
 
         return value, best_move
     else:
         value = float("inf")
-        for mv in moves:
+        for i, mv in enumerate(moves):
             newb = apply_move(board, mv, side_to_move)
             next_side = "N" if side_to_move == "R" else "R"
 
             next_depth = depth - 1
             if mv.is_capture and depth > 1:
                 next_depth = depth
+                if stats is not None:
+                    stats.capture_extensions += 1
 
-            child_val, _ = minimax(newb, next_side, next_depth, alpha, beta, maximizing_side)
+            child_val, _ = minimax(newb, next_side, next_depth, alpha, beta, maximizing_side, stats, ply + 1, stop)
 
             if child_val < value:
                 value = child_val
@@ -674,11 +1160,648 @@ def minimax(
 
             beta = min(beta, value)
             if beta <= alpha:
+                if stats is not None:
+                    stats.record_cutoff(i)
                 break
 
         return value, best_move
 
 
+# -------------------------------------------------------
+# Negamax + PVS (búsqueda principal) y tabla de transposición
+#
+# minimax (arriba) se conserva como referencia: bench pvs compara
+# nodos y jugadas de ambos a la misma profundidad.
+# -------------------------------------------------------
+PVS_EPS = 1e-6              # ancho de la ventana nula (scores son float)
+ASPIRATION_WINDOW = 0.25    # ± alrededor del score de la iteración anterior
+ASPIRATION_MAX = 4.0        # más allá de esto la ventana pasa a ±inf
+
+# búsqueda de choose_best_move: "pvs" (iterative_deepening) o "minimax" (la de antes)
+SEARCH_ALGO = (os.environ.get("DAMAS_SEARCH", "") or "pvs").strip().lower()
+if SEARCH_ALGO not in ("pvs", "minimax"):
+    SEARCH_ALGO = "pvs"
+
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+
+# TT compartida entre workers (DAMAS_SHARED_TT, ver shared_cache.py);
+# None = cada búsqueda con su TT en memoria, como siempre
+SHARED_TT: Optional[SharedTT] = shared_tt_from_env(Path(__file__).resolve().parent / "data")
+SHARED_TT_MIN_DEPTH = 2     # las entradas cerca de las hojas no compensan el mmap
+
+
+# -------------------------------------------------------
+# Búsqueda selectiva (solo negamax; cada técnica con su toggle)
+#   lmr       jugadas tranquilas tardías a profundidad reducida;
+#             si fallan alto se repiten a profundidad completa
+#   futility  a profundidad 1, si eval estática + margen <= alpha
+#             no se buscan las tranquilas (salvo la primera)
+#   razoring  a profundidad 2, si eval estática + 2·margen <= alpha
+#             se prueba a profundidad 1; si no confirma el fallo
+#             bajo, búsqueda normal
+# Nunca se recortan capturas ni coronaciones.
+# -------------------------------------------------------
+def _env_flag(name: str, default: bool) -> bool:
+    v = os.environ.get(name, "").strip().lower()
+    if not v:
+        return default
+    return v not in ("0", "false", "no", "off")
+
+
+SELECTIVE: Dict[str, bool] = {
+    "lmr": _env_flag("DAMAS_LMR", True),
+    "futility": _env_flag("DAMAS_FUTILITY", True),
+    "razoring": _env_flag("DAMAS_RAZORING", True),
+}
+
+LMR_MIN_DEPTH = 3           # no se reduce cerca de las hojas
+LMR_MIN_INDEX = 3           # las 3 primeras jugadas (TT + generador) nunca
+LMR_LATE_INDEX = 8          # desde aquí se reduce 2 plies
+FUTILITY_MOBILITY_SWING = 8  # jugadas tranquilas que puede ganar/perder un bando
+
+
+def set_selective(**flags: bool) -> Dict[str, bool]:
+    """Cambia toggles (lmr/futility/razoring) y devuelve los anteriores."""
+    prev = dict(SELECTIVE)
+    for name, on in flags.items():
+        if name not in SELECTIVE:
+            raise KeyError(name)
+        SELECTIVE[name] = bool(on)
+    return prev
+
+
+def futility_margin() -> float:
+    """
+    Cota de lo que una jugada tranquila sin coronar puede mover
+    evaluate_board: un paso de avance, el borde, el bonus de centro de
+    una dama y la movilidad de ambos bandos. El material no cambia.
+    """
+    return (
+        ADVANCE_WEIGHT
+        + EDGE_PENALTY
+        + 4.0 * KING_CENTER_WEIGHT
+        + FUTILITY_MOBILITY_SWING * MOBILITY_WEIGHT
+    )
+
+
+def _is_promotion(board: Board, mv: Move) -> bool:
+    piece = board[mv.fr][mv.fc]
+    return (piece == "r" and mv.tr == 0) or (piece == "n" and mv.tr == BOARD_SIZE - 1)
+
+
+def _search_tag() -> str:
+    if SEARCH_ALGO != "pvs":
+        return SEARCH_ALGO
+    on = [name for name in ("lmr", "futility", "razoring") if SELECTIVE[name]]
+    return "+".join(["pvs"] + on)
+
+
+class TranspositionTable:
+    """
+    hash de la posición (position_key) -> (depth, flag, score, código
+    de jugada o None).
+    Vive lo que dura una búsqueda (todas las iteraciones de
+    iterative_deepening); al llenarse se vacía entera.
+    Con `shared` (SharedTT) las entradas de depth >= SHARED_TT_MIN_DEPTH
+    se escriben también ahí y un fallo local se consulta ahí: otros
+    workers y búsquedas posteriores las reutilizan. La clave compartida
+    lleva engine_version(), así no se mezclan pesos/reglas distintos.
+    Los scores que dependen de la historia de la partida (por debajo hubo
+    un corte por repetición o regla de 25, ver PositionHistory.draws) se
+    guardan solo aquí, con put(..., shared=False), y quedan marcados:
+    un corte por TT en ellos también cuenta como dependiente.
+    """
+    __slots__ = ("max_entries", "_d", "shared", "_tag", "_local_only")
+
+    def __init__(self, max_entries: int = 200_000, shared: Optional[SharedTT] = None) -> None:
+        self.max_entries = max_entries
+        self._d: Dict[int, Tuple[int, int, float, Optional[int]]] = {}
+        self.shared = shared
+        self._tag = _stable_hash(engine_version()) if shared is not None else 0
+        self._local_only: Set[int] = set()
+
+    def get(self, k: int) -> Optional[Tuple[int, int, float, Optional[int]]]:
+        entry = self._d.get(k)
+        if entry is None and self.shared is not None:
+            entry = self.shared.get(k ^ self._tag)
+            if entry is not None:
+                self._store(k, entry)
+        return entry
+
+    def put(
+        self, k: int, depth: int, flag: int, score: float, move: Optional[int], shared: bool = True,
+    ) -> None:
+        self._store(k, (depth, flag, score, move))
+        if self.shared is None:
+            return
+        if not shared:
+            self._local_only.add(k)
+            return
+        self._local_only.discard(k)
+        if depth >= SHARED_TT_MIN_DEPTH:
+            self.shared.put(k ^ self._tag, depth, flag, score, move)
+
+    def local_only(self, k: int) -> bool:
+        """La entrada de k depende de la historia de la partida (no se comparte)."""
+        return k in self._local_only
+
+    def _store(self, k: int, entry: Tuple[int, int, float, Optional[int]]) -> None:
+        if len(self._d) >= self.max_entries and k not in self._d:
+            self._d.clear()
+            self._local_only.clear()
+        self._d[k] = entry
+
+    def __len__(self) -> int:
+        return len(self._d)
+
+
+# -------------------------------------------------------
+# Repeticiones y regla de 25 jugadas de damas
+#
+# Las jugadas de peón y las capturas son irreversibles: una posición
+# solo puede repetirse dentro del tramo de jugadas de dama sin captura.
+# En la búsqueda, volver a una posición del camino (o de la partida)
+# puntúa DRAW_SCORE y no se expande: los ciclos de damas se cortan.
+# -------------------------------------------------------
+DRAW_SCORE = 0.0
+KING_RULE_PLIES = 50        # 25 jugadas por bando solo con damas y sin capturas
+KING_RULE = _env_flag("DAMAS_KING_DRAW_RULE", False)
+# volver a la misma posición (mismo bando) exige que cada bando mueva
+# una dama ida y vuelta: con menos plies reversibles no se mira el hash
+REPETITION_MIN_PLIES = 4
+
+
+def is_reversible(board: Board, mv: Move) -> bool:
+    """Jugada de dama sin captura (la única que puede repetir posiciones)."""
+    return not mv.is_capture and is_king(board[mv.fr][mv.fc])
+
+
+class PositionHistory:
+    """
+    Pila de hashes: posiciones anteriores de la partida (desde la última
+    jugada irreversible) + camino actual de la búsqueda.
+    negamax hace push/pop; tras SearchAborted la pila queda a medias
+    (la historia es de una búsqueda y se descarta).
+    `draws` cuenta los cortes por repetición / regla de 25: si cambia
+    durante un subárbol, su score depende de la historia.
+    """
+    __slots__ = ("_count", "_stack", "draws")
+
+    def __init__(self, keys: Optional[List[int]] = None) -> None:
+        self._count: Dict[int, int] = {}
+        self._stack: List[int] = []
+        self.draws = 0
+        for k in keys or ():
+            self.push(k)
+
+    def push(self, k: int) -> None:
+        self._stack.append(k)
+        self._count[k] = self._count.get(k, 0) + 1
+
+    def pop(self) -> None:
+        k = self._stack.pop()
+        n = self._count[k] - 1
+        if n:
+            self._count[k] = n
+        else:
+            del self._count[k]
+
+    def seen(self, k: int) -> bool:
+        return k in self._count
+
+    def __len__(self) -> int:
+        return len(self._stack)
+
+
+def negamax(
+    board: Board,
+    side: str,
+    depth: int,
+    alpha: float,
+    beta: float,
+    stats: Optional[SearchStats] = None,
+    ply: int = 0,
+    stop: Any = None,
+    tt: Optional[TranspositionTable] = None,
+    history: Optional[PositionHistory] = None,
+    king_plies: int = 0,
+    h: Optional[int] = None,
+) -> Tuple[float, Optional[Move]]:
+    """
+    Negamax con PVS (fail-soft): la primera jugada se busca con ventana
+    completa y el resto con ventana nula (alpha, alpha+ε); si una falla
+    alto dentro de (alpha, beta) se vuelve a buscar con ventana completa.
+    Score desde el lado que mueve: a ventana completa y sin búsqueda
+    selectiva (set_selective) coincide con minimax(board, side, depth,
+    -inf, inf, side) (misma extensión de capturas y score terminal).
+    Con `history`, una posición ya vista vale DRAW_SCORE (y también
+    king_plies >= KING_RULE_PLIES si KING_RULE está activa).
+    `h`: hash de la posición (position_hash); si falta y hay TT o
+    history se calcula aquí, y los hijos lo reciben incremental.
+    """
+    if stop is not None and stop.is_set():
+        raise SearchAborted()
+
+    if stats is not None:
+        stats.nodes += 1
+        if ply > stats.max_ply:
+            stats.max_ply = ply
+
+    if h is None and (tt is not None or history is not None):
+        h = position_hash(board, side)
+    if history is not None and ply > 0 and king_plies >= REPETITION_MIN_PLIES:
+        if history.seen(h):
+            if stats is not None:
+                stats.repetitions += 1
+            history.draws += 1
+            return DRAW_SCORE, None
+        if KING_RULE and king_plies >= KING_RULE_PLIES:
+            if stats is not None:
+                stats.king_rule_draws += 1
+            history.draws += 1
+            return DRAW_SCORE, None
+
+    if depth == 0:
+        return _evaluate_leaf(board, side, stats), None
+
+    tt_move: Optional[int] = None
+    if tt is not None:
+        entry = tt.get(h)
+        if entry is not None:
+            e_depth, flag, e_score, tt_move = entry
+            # en la raíz siempre se busca: hace falta la jugada
+            if ply > 0 and e_depth >= depth and (
+                flag == TT_EXACT
+                or (flag == TT_LOWER and e_score >= beta)
+                or (flag == TT_UPPER and e_score <= alpha)
+            ):
+                if stats is not None:
+                    stats.tt_hits += 1
+                if history is not None and tt.local_only(h):
+                    history.draws += 1
+                return e_score, None
+
+    draws0 = history.draws if history is not None else 0
+
+    if stats is None:
+        moves = generate_legal_moves(board, side)
+    else:
+        t0 = time.perf_counter()
+        moves = generate_legal_moves(board, side)
+        stats.movegen_time += time.perf_counter() - t0
+
+    if not moves:
+        return _evaluate_leaf(board, side, stats) - 2.0, None
+
+    # nodo tranquilo (sin capturas obligatorias) cerca de las hojas: eval estática
+    quiet = not moves[0].is_capture
+    static: Optional[float] = None
+    fut_margin = 0.0
+    if quiet and depth <= 2 and ply > 0 and alpha > float("-inf") and (
+        (depth == 1 and SELECTIVE["futility"]) or (depth == 2 and SELECTIVE["razoring"])
+    ):
+        static = _evaluate_leaf(board, side, stats)
+        fut_margin = futility_margin()
+
+    if depth == 2 and static is not None and static + 2.0 * fut_margin <= alpha:
+        # razoring: ¿confirma una búsqueda a profundidad 1 que falla bajo?
+        # (misma ply: la posición aún no está en history)
+        razor = negamax(board, side, 1, alpha, alpha + PVS_EPS, stats, ply, stop, tt, history, king_plies, h)[0]
+        if razor <= alpha:
+            if stats is not None:
+                stats.razor_cuts += 1
+            return razor, None
+        if stats is not None:
+            stats.razor_researches += 1
+
+    if tt_move is not None and len(moves) > 1:
+        # la mejor jugada conocida primero (sort estable: resto en orden del generador)
+        moves.sort(key=lambda m: m.code != tt_move)
+
+    lmr = quiet and depth >= LMR_MIN_DEPTH and SELECTIVE["lmr"]
+    if history is not None:
+        history.push(h)
+    next_side = "N" if side == "R" else "R"
+    a = alpha
+    value = float("-inf")
+    best_move: Optional[Move] = None
+    for i, mv in enumerate(moves):
+        if i > 0 and depth == 1 and static is not None and static + fut_margin <= a and not _is_promotion(board, mv):
+            # futility: ninguna tranquila puede subir de a; cota fail-soft = static + margen
+            if stats is not None:
+                stats.futility_prunes += 1
+            if static + fut_margin > value:
+                value = static + fut_margin
+            continue
+
+        ch = h ^ move_delta(board, mv, side) if h is not None else None
+        newb = apply_move(board, mv, side)
+        kp = king_plies + 1 if is_reversible(board, mv) else 0
+
+        next_depth = depth - 1
+        if mv.is_capture and depth > 1:
+            next_depth = depth
+            if stats is not None:
+                stats.capture_extensions += 1
+
+        if i == 0:
+            score = -negamax(newb, next_side, next_depth, -beta, -a, stats, ply + 1, stop, tt, history, kp, ch)[0]
+        else:
+            reduce = 0
+            if lmr and i >= LMR_MIN_INDEX and not _is_promotion(board, mv):
+                reduce = min(2 if i >= LMR_LATE_INDEX else 1, next_depth - 1)
+            if reduce > 0:
+                if stats is not None:
+                    stats.lmr_reductions += 1
+                score = -negamax(
+                    newb, next_side, next_depth - reduce, -a - PVS_EPS, -a, stats, ply + 1, stop, tt, history, kp, ch,
+                )[0]
+                if score > a:
+                    # verificación: la reducida falló alto -> profundidad completa
+                    if stats is not None:
+                        stats.lmr_researches += 1
+                    score = -negamax(newb, next_side, next_depth, -a - PVS_EPS, -a, stats, ply + 1, stop, tt, history, kp, ch)[0]
+            else:
+                score = -negamax(newb, next_side, next_depth, -a - PVS_EPS, -a, stats, ply + 1, stop, tt, history, kp, ch)[0]
+            if a < score < beta:
+                if stats is not None:
+                    stats.researches += 1
+                score = -negamax(newb, next_side, next_depth, -beta, -a, stats, ply + 1, stop, tt, history, kp, ch)[0]
+
+        if score > value:
+            value = score
+            best_move = mv
+        if value > a:
+            a = value
+        if a >= beta:
+            if stats is not None:
+                stats.record_cutoff(i)
+            break
+
+    if history is not None:
+        history.pop()
+    if tt is not None:
+        # con cortes por repetición debajo, el score es de ESTA partida
+        shareable = history is None or history.draws == draws0
+        if value <= alpha:
+            tt.put(h, depth, TT_UPPER, value, None, shareable)
+        else:
+            flag = TT_LOWER if value >= beta else TT_EXACT
+            tt.put(h, depth, flag, value, best_move.code if best_move is not None else None, shareable)
+    return value, best_move
+
+
+def pvs_root(
+    board: Board,
+    side: str,
+    depth: int,
+    guess: Optional[float] = None,
+    stats: Optional[SearchStats] = None,
+    stop: Any = None,
+    tt: Optional[TranspositionTable] = None,
+    history: Optional[PositionHistory] = None,
+    king_plies: int = 0,
+) -> Tuple[float, Optional[Move]]:
+    """
+    Raíz con ventana de aspiración centrada en `guess` (score de la
+    iteración anterior). Si el resultado cae fuera, se amplía la ventana
+    por ese lado (×4) y se repite; pasado ASPIRATION_MAX, ±inf.
+    """
+    inf = float("inf")
+    if guess is None or depth <= 1 or guess in (inf, -inf):
+        return negamax(board, side, depth, -inf, inf, stats, 0, stop, tt, history, king_plies)
+
+    lo_delta = hi_delta = ASPIRATION_WINDOW
+    while True:
+        lo = guess - lo_delta if lo_delta <= ASPIRATION_MAX else -inf
+        hi = guess + hi_delta if hi_delta <= ASPIRATION_MAX else inf
+        score, mv = negamax(board, side, depth, lo, hi, stats, 0, stop, tt, history, king_plies)
+        if score <= lo and lo != -inf:
+            lo_delta *= 4.0
+        elif score >= hi and hi != inf:
+            hi_delta *= 4.0
+        else:
+            return score, mv
+        if stats is not None:
+            stats.aspiration_fails += 1
+
+
+def iterative_deepening(
+    board: Board,
+    side: str,
+    max_depth: int,
+    stats: Optional[SearchStats] = None,
+    stop: Any = None,
+    on_iteration: Optional[Callable[[Dict[str, Any]], None]] = None,
+    tt: Optional[TranspositionTable] = None,
+    history: Optional[List[int]] = None,
+    king_plies: int = 0,
+) -> Tuple[float, Optional[Move]]:
+    """
+    Profundidad 1..max_depth con PVS; cada iteración aprovecha la TT de
+    la anterior (ordenación) y su score (ventana de aspiración), y llama
+    on_iteration({depth, score, move, nodes, elapsed_ms}).
+    `history`: hashes (position_hash) de las posiciones anteriores de la
+    partida (sin la actual); con ellas y el camino de la búsqueda se detectan repeticiones.
+    Si se cancela (stop) devuelve la última iteración completa; si no
+    llegó a completar ninguna, propaga SearchAborted.
+    """
+    t0 = time.perf_counter()
+    if tt is None:
+        tt = TranspositionTable(shared=SHARED_TT)
+    path = PositionHistory(history)
+    best: Optional[Move] = None
+    score = float("-inf")
+    guess: Optional[float] = None
+    completed = 0
+    for d in range(1, max(1, max_depth) + 1):
+        try:
+            sc, mv = pvs_root(board, side, d, guess, stats, stop, tt, path, king_plies)
+        except SearchAborted:
+            if completed == 0:
+                raise
+            break
+        completed = d
+        score = guess = sc
+        best = mv or best
+        if stats is not None:
+            stats.depth = d
+        if on_iteration is not None:
+            on_iteration({
+                "depth": d,
+                "score": sc,
+                "move": best.to_algebraic() if best is not None else None,
+                "nodes": stats.nodes if stats is not None else None,
+                "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+            })
+        if mv is None:
+            break
+    return score, best
+
+
+# -------------------------------------------------------
+# Multi-PV: las K mejores jugadas de la raíz, con score y variante
+#
+# Un solo bucle de profundización y una sola TT para las K líneas:
+# en la raíz, cada jugada se prueba con ventana nula contra el score
+# de la K-ésima mejor; solo las que la superan se buscan con ventana
+# (K-ésima, +inf) para tener su score exacto. Con K=1 es alpha-beta
+# normal en la raíz.
+# -------------------------------------------------------
+def principal_variation(
+    board: Board,
+    side: str,
+    first: Move,
+    tt: TranspositionTable,
+    max_len: int = 12,
+) -> List[str]:
+    """`first` + la cadena de mejores jugadas guardadas en la TT."""
+    pv = [first.to_algebraic()]
+    h = position_hash(board, side)
+    seen = {h}
+    h ^= move_delta(board, first, side)
+    b = apply_move(board, first, side)
+    s = "N" if side == "R" else "R"
+    while len(pv) < max_len:
+        if h in seen:
+            break
+        seen.add(h)
+        entry = tt.get(h)
+        if entry is None or entry[3] is None:
+            break
+        mv = find_move_by_code(generate_legal_moves(b, s), entry[3])
+        if mv is None:
+            break
+        pv.append(mv.to_algebraic())
+        h ^= move_delta(b, mv, s)
+        b = apply_move(b, mv, s)
+        s = "N" if s == "R" else "R"
+    return pv
+
+
+def multipv_root(
+    board: Board,
+    side: str,
+    depth: int,
+    k: int,
+    moves: List[Move],
+    stats: Optional[SearchStats] = None,
+    stop: Any = None,
+    tt: Optional[TranspositionTable] = None,
+    history: Optional[PositionHistory] = None,
+    king_plies: int = 0,
+) -> List[Tuple[float, Move]]:
+    """Las `k` mejores de `moves` (en ese orden de búsqueda), de mejor a peor."""
+    if stop is not None and stop.is_set():
+        raise SearchAborted()
+    if stats is not None:
+        stats.nodes += 1
+
+    inf = float("inf")
+    next_side = "N" if side == "R" else "R"
+    h = position_hash(board, side)
+    lines: List[Tuple[float, int, Move]] = []
+    for i, mv in enumerate(moves):
+        ch = h ^ move_delta(board, mv, side)
+        newb = apply_move(board, mv, side)
+        kp = king_plies + 1 if is_reversible(board, mv) else 0
+
+        next_depth = depth - 1
+        if mv.is_capture and depth > 1:
+            next_depth = depth
+            if stats is not None:
+                stats.capture_extensions += 1
+
+        floor = lines[k - 1][0] if len(lines) >= k else -inf
+        if floor == -inf:
+            score = -negamax(newb, next_side, next_depth, -inf, inf, stats, 1, stop, tt, history, kp, ch)[0]
+        else:
+            score = -negamax(newb, next_side, next_depth, -floor - PVS_EPS, -floor, stats, 1, stop, tt, history, kp, ch)[0]
+            if score <= floor:
+                continue
+            if stats is not None:
+                stats.researches += 1
+            score = -negamax(newb, next_side, next_depth, -inf, -floor, stats, 1, stop, tt, history, kp, ch)[0]
+            if score <= floor:
+                continue
+
+        lines.append((score, i, mv))
+        lines.sort(key=lambda t: (-t[0], t[1]))  # empates: orden de búsqueda
+        del lines[k:]
+    return [(sc, mv) for sc, _, mv in lines]
+
+
+def multipv(
+    board: Board,
+    side: str,
+    max_depth: int,
+    k: int = 3,
+    stats: Optional[SearchStats] = None,
+    stop: Any = None,
+    on_iteration: Optional[Callable[[Dict[str, Any]], None]] = None,
+    tt: Optional[TranspositionTable] = None,
+    history: Optional[List[int]] = None,
+    king_plies: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Profundización iterativa multi-PV: [{move, score, pv}] de mejor a
+    peor (hasta k, o menos si no hay tantas jugadas legales). Cada
+    iteración busca primero las líneas de la anterior. Cancelación y
+    on_iteration({depth, lines, nodes, elapsed_ms}) como en
+    iterative_deepening.
+    """
+    t0 = time.perf_counter()
+    if tt is None:
+        tt = TranspositionTable(shared=SHARED_TT)
+    moves = generate_legal_moves(board, side)
+    if not moves:
+        return []
+    k = max(1, min(int(k), len(moves)))
+
+    path = PositionHistory(history)
+    root_key = position_hash(board, side)
+    lines: List[Dict[str, Any]] = []
+    for d in range(1, max(1, max_depth) + 1):
+        path.push(root_key)
+        try:
+            ranked = multipv_root(board, side, d, k, moves, stats, stop, tt, path, king_plies)
+        except SearchAborted:
+            if not lines:
+                raise
+            break
+        path.pop()
+
+        top = {id(mv) for _, mv in ranked}
+        moves = [mv for _, mv in ranked] + [m for m in moves if id(m) not in top]
+        lines = [
+            {"move": mv.to_algebraic(), "score": sc, "pv": principal_variation(board, side, mv, tt, d + 4)}
+            for sc, mv in ranked
+        ]
+        if stats is not None:
+            stats.depth = d
+            stats.score = lines[0]["score"] if lines else None
+        if on_iteration is not None:
+            on_iteration({
+                "depth": d,
+                "lines": lines,
+                "nodes": stats.nodes if stats is not None else None,
+                "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+            })
+    return lines
+
+
+def _pvs_searcher(
+    board: Board,
+    side: str,
+    depth: int,
+    stats: Optional[SearchStats],
+    stop: Any,
+    history: Optional[List[int]] = None,
+    king_plies: int = 0,
+) -> Tuple[float, Optional[Move]]:
+    return iterative_deepening(board, side, depth, stats, stop, history=history, king_plies=king_plies)
+
+
 # -------------------------------------------------------
 # API pública usada por main.py
 # -------------------------------------------------------
@@ -696,55 +1819,96 @@ def choose_best_move(
     fen: Optional[str] = None,          # legacy/optional
     use_learned: bool = True,
     learned_max_lines: int = 5000,
+    stats: Optional[SearchStats] = None,
+    stop: Any = None,
+    searcher: Optional[Callable[..., Tuple[float, Optional[Move]]]] = None,
+    history: Optional[List[int]] = None,
+    king_plies: int = 0,
 ) -> Optional[str]:
     """
     Motor principal:
     1) EXPERIENCIA (por key canónica) -> si hay match, usarla
-    2) ✅ NUEVO: fallback por key sin side (solo si jugada es legal)
+    2) ✅ NUEVO: fallback por key sin side (solo jugadas del bando `side`)
     3) (opcional) fallback legacy por fen si lo estás usando
-    4) MINIMAX normal
+    4) búsqueda: PVS con profundización iterativa (DAMAS_SEARCH=minimax
+       vuelve al minimax de siempre)
+
+    Si se pasa `stats`, se rellena con contadores y stats.source
+    ("learned_key" / "learned_base" / "learned_fen" / "minimax").
+    Con `stop` (is_set()) la búsqueda puede cancelarse: SearchAborted.
+    `searcher(board, side, depth, stats, stop, history, king_plies) ->
+    (score, Move)` sustituye a la búsqueda del paso 4 (p.ej.
+    iterative_deepening con streaming). `history`/`king_plies`: ver
+    iterative_deepening (repeticiones de la partida); minimax los ignora.
     """
     if not board or len(board) != BOARD_SIZE:
         return None
 
+    t_start = time.perf_counter()
+
     if use_learned:
+        patrones: Optional[LearnedTable] = None
         try:
+            # una sola carga (cacheada) para los tres intentos
+            patrones = load_learned_patterns(max_lines=learned_max_lines)
+
             # 1) Match exacto (con side)
             key = board_to_key(board, side)
-            learned = get_learned_move_by_key(key, max_lines=learned_max_lines)
+            learned = get_learned_move_by_key(key, patrones=patrones)
             if learned:
+                if stats is not None:
+                    stats.source = "learned_key"
+                    stats.elapsed = time.perf_counter() - t_start
                 return learned
 
             # 2) ✅ Fallback: match por tablero SIN side
             base = strip_side_from_key(key)
-            learned2 = get_learned_move_by_key(base, max_lines=learned_max_lines)
+            learned2 = get_learned_move_by_key(base, side=side, patrones=patrones)
             if learned2:
-                legal = legal_moves_set(board, side)
-                if learned2 in legal:
-                    print(f"[IA-LEARN] HIT base-key ✅ {learned2}")
-                    return learned2
-                else:
-                    print(f"[IA-LEARN] base-key encontró jugada NO legal para side={side}: {learned2}")
+                log.debug("learned lookup: base-key hit move=%s", learned2)
+                if stats is not None:
+                    stats.source = "learned_base"
+                    stats.elapsed = time.perf_counter() - t_start
+                return learned2
 
         except Exception as e:
-            print(f"[IA-LEARN] ERROR leyendo experiencia: {e}")
+            log.warning("error leyendo experiencia: %r", e)
 
         if fen:
             try:
-                learned3 = get_learned_move_fallback_fen(fen, max_lines=learned_max_lines)
+                learned3 = get_learned_move_fallback_fen(
+                    fen, max_lines=learned_max_lines, side=side, patrones=patrones,
+                )
                 if learned3:
+                    if stats is not None:
+                        stats.source = "learned_fen"
+                        stats.elapsed = time.perf_counter() - t_start
                     return learned3
             except Exception as e:
-                print(f"[IA-LEARN] ERROR leyendo experiencia por fen: {e}")
-
-    _, best_mv = minimax(
-        board,
-        side_to_move=side,
-        depth=depth,
-        alpha=float("-inf"),
-        beta=float("inf"),
-        maximizing_side=side,
-    )
+                log.warning("error leyendo experiencia por fen: %r", e)
+
+    if searcher is None and SEARCH_ALGO == "pvs":
+        searcher = _pvs_searcher
+    if searcher is not None:
+        score, best_mv = searcher(board, side, depth, stats, stop, history, king_plies)
+    else:
+        score, best_mv = minimax(
+            board,
+            side_to_move=side,
+            depth=depth,
+            alpha=float("-inf"),
+            beta=float("inf"),
+            maximizing_side=side,
+            stats=stats,
+            stop=stop,
+        )
+
+    if stats is not None:
+        stats.source = "minimax"
+        if searcher is None:
+            stats.depth = depth
+        stats.score = score if best_mv is not None else None
+        stats.elapsed = time.perf_counter() - t_start
 
     if best_mv is None:
         return None
@@ -15,14 +15,48 @@ _mod = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(_mod)
 
 IA_ENGINE_VERSION = getattr(_mod, "IA_ENGINE_VERSION", "IA-ENGINE")
+RULESET_VERSION = getattr(_mod, "RULESET_VERSION", None)
 
 board_to_key = getattr(_mod, "board_to_key", None)
+key_to_board = getattr(_mod, "key_to_board", None)
+initial_board = getattr(_mod, "initial_board", None)
 choose_best_move = getattr(_mod, "choose_best_move", None)
 choose_ai_capture_move = getattr(_mod, "choose_ai_capture_move", None)
 
 load_learned_patterns = getattr(_mod, "load_learned_patterns", None)
+learned_moves_for = getattr(_mod, "learned_moves_for", None)
 get_learned_move_by_key = getattr(_mod, "get_learned_move_by_key", None)
 get_learned_move_fallback_fen = getattr(_mod, "get_learned_move_fallback_fen", None)
 
+# Núcleo del motor (benchmarks / herramientas offline)
+generate_legal_moves = getattr(_mod, "generate_legal_moves", None)
+apply_move = getattr(_mod, "apply_move", None)
+find_legal_move = getattr(_mod, "find_legal_move", None)
+normalize_move_str = getattr(_mod, "normalize_move_str", None)
+parse_move = getattr(_mod, "parse_move", None)
+move_str = getattr(_mod, "move_str", None)
+find_move_by_code = getattr(_mod, "find_move_by_code", None)
+evaluate_board = getattr(_mod, "evaluate_board", None)
+eval_weights = getattr(_mod, "eval_weights", None)
+load_eval_weights = getattr(_mod, "load_eval_weights", None)
+engine_version = getattr(_mod, "engine_version", None)
+minimax = getattr(_mod, "minimax", None)
+negamax = getattr(_mod, "negamax", None)
+pvs_root = getattr(_mod, "pvs_root", None)
+TranspositionTable = getattr(_mod, "TranspositionTable", None)
+SHARED_TT = getattr(_mod, "SHARED_TT", None)
+set_selective = getattr(_mod, "set_selective", None)
+PositionHistory = getattr(_mod, "PositionHistory", None)
+multipv = getattr(_mod, "multipv", None)
+principal_variation = getattr(_mod, "principal_variation", None)
+is_reversible = getattr(_mod, "is_reversible", None)
+KING_RULE = getattr(_mod, "KING_RULE", False)
+KING_RULE_PLIES = getattr(_mod, "KING_RULE_PLIES", 50)
+iterative_deepening = getattr(_mod, "iterative_deepening", None)
+SearchStats = getattr(_mod, "SearchStats", None)
+SearchStatsAggregate = getattr(_mod, "SearchStatsAggregate", None)
+SearchAborted = getattr(_mod, "SearchAborted", None)
+engine_module = _mod
+
 if choose_best_move is None:
     raise ImportError("ai_engine.py no exporta choose_best_move (no existe esa función).")
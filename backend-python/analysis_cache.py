@@ -0,0 +1,241 @@
+# backend-python/analysis_cache.py
+# =========================================================
+# Caché de análisis (LRU + TTL) delante de choose_best_move
+#
+# Clave = k canónica + parámetros de búsqueda + versión del motor
+#         (código + pesos de evaluación, ver engine_version()).
+# - Límite por número de entradas y por bytes estimados
+# - TTL por entrada (la experiencia aprendida cambia con el tiempo)
+# - Invalidación por posición: un teach override o filas nuevas en
+#   /ai/log-moves para esa k borran todas sus variantes (depth, etc.)
+#   Se indexa por k SIN side: learned_base también mira la base.
+# - En L1 la k se guarda como hash de 64 bits (position_key.py); el
+#   string solo se usa para la clave de L2 (que ya va hasheada).
+# - Thread-safe (los endpoints sync corren en el threadpool)
+# - L2 opcional: SharedCache (mmap) compartida entre workers; cada
+#   entrada L1 guarda su ts de escritura y se descarta si otro worker
+#   invalidó la posición después (ver shared_cache.py)
+#
+# Uso:
+#   hit = CACHE.get(k, params)
+#   if hit is None: ... CACHE.put(k, params, value)
+# =========================================================
+
+from __future__ import annotations
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+from position_key import key_hashes
+from shared_cache import SharedCache, shared_cache_from_env
+
+CacheKey = Tuple[int, Hashable]   # (hash de la posición, params)
+
+
+def _hashes(k: str) -> Tuple[int, int]:
+    """(hash, hash base) de k; un k que no es tablero usa hash() del string."""
+    hs = key_hashes(k)
+    if hs is None:
+        return hash(k), hash(k)
+    return hs
+
+
+def _estimate_size(value: Any) -> int:
+    """Tamaño aproximado en bytes (valor + clave y overhead fijo del nodo)."""
+    size = 240
+    if isinstance(value, dict):
+        for kk, vv in value.items():
+            size += sys.getsizeof(kk) + sys.getsizeof(vv)
+            if isinstance(vv, dict):
+                size += sum(sys.getsizeof(x) for x in vv.values())
+    else:
+        size += sys.getsizeof(value)
+    return size
+
+
+def _l2_key(k: str, params: Hashable) -> str:
+    return f"{k}\x1f{params!r}"
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class AnalysisCache:
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl: float = 900.0,
+        l2: Optional[SharedCache] = None,
+    ) -> None:
+        self.enabled = int(max_entries) > 0
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1024, int(max_bytes))
+        self.ttl = float(ttl)
+        self.l2 = l2
+        self._lock = threading.Lock()
+        # CacheKey -> (expira_en, bytes, valor, ts_ms de escritura, hash base)
+        self._data: "OrderedDict[CacheKey, Tuple[float, int, Any, int, int]]" = OrderedDict()
+        self._by_base: Dict[int, Set[CacheKey]] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # -------------------------------------------------------
+    def _drop(self, ck: CacheKey) -> None:
+        entry = self._data.pop(ck, None)
+        if entry is None:
+            return
+        self._bytes -= entry[1]
+        base = entry[4]
+        keys = self._by_base.get(base)
+        if keys is not None:
+            keys.discard(ck)
+            if not keys:
+                del self._by_base[base]
+
+    def get(self, k: str, params: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        ck = (_hashes(k)[0], params)
+        now = time.monotonic()
+        # invalidaciones hechas por otros workers (0 = ninguna / sin L2)
+        inval_ts = self.l2.invalidated_at(k) if self.l2 is not None else 0
+        with self._lock:
+            entry = self._data.get(ck)
+            if entry is not None:
+                if entry[0] < now:
+                    self._drop(ck)
+                    self.expired += 1
+                elif entry[3] <= inval_ts:
+                    self._drop(ck)
+                    self.invalidations += 1
+                else:
+                    self._data.move_to_end(ck)
+                    self.hits += 1
+                    return entry[2]
+            if self.l2 is None:
+                self.misses += 1
+                return None
+
+        hit = self.l2.get_raw(_l2_key(k, params), min_ts=inval_ts + 1)
+        value = None
+        if hit is not None:
+            try:
+                value = json.loads(hit[0])
+            except ValueError:
+                value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.l2_hits += 1
+        self._put_local(k, params, value, hit[1])
+        return value
+
+    def contains(self, k: str, params: Hashable) -> bool:
+        """Solo L1 y sin tocar contadores (para el ponder)."""
+        with self._lock:
+            entry = self._data.get((_hashes(k)[0], params))
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def _put_local(self, k: str, params: Hashable, value: Any, ts_ms: int) -> bool:
+        h, base = _hashes(k)
+        ck = (h, params)
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            self._drop(ck)
+            self._data[ck] = (time.monotonic() + self.ttl, size, value, ts_ms, base)
+            self._bytes += size
+            self._by_base.setdefault(base, set()).add(ck)
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+        return True
+
+    def put(self, k: str, params: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        if self._put_local(k, params, value, _now_ms()) and self.l2 is not None:
+            try:
+                self.l2.put(_l2_key(k, params), value, ttl=self.ttl)
+            except (TypeError, ValueError):
+                pass  # valor no serializable: solo L1
+
+    def invalidate(self, k: str) -> int:
+        """Borra todas las entradas de la posición (ambos sides); devuelve cuántas."""
+        base = _hashes(k)[1]
+        with self._lock:
+            keys = list(self._by_base.get(base, ()))
+            for ck in keys:
+                self._drop(ck)
+            self.invalidations += len(keys)
+        if self.l2 is not None:
+            self.l2.invalidate(k)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._by_base.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "l2_hits": self.l2_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "l2": self.l2.stats() if self.l2 is not None else None,
+            }
+
+
+def _env_num(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, "") or default)
+    except ValueError:
+        return default
+
+
+def cache_from_env(data_dir: Optional[Path] = None) -> AnalysisCache:
+    """
+    DAMAS_ANALYSIS_CACHE_SIZE  (entradas, 0 = desactivada)
+    DAMAS_ANALYSIS_CACHE_MB
+    DAMAS_ANALYSIS_CACHE_TTL   (segundos)
+    + L2 compartida: DAMAS_SHARED_CACHE / DAMAS_SHARED_CACHE_MB
+    """
+    max_entries = int(_env_num("DAMAS_ANALYSIS_CACHE_SIZE", 4096))
+    l2 = shared_cache_from_env(data_dir) if data_dir is not None and max_entries > 0 else None
+    return AnalysisCache(
+        max_entries=max_entries,
+        max_bytes=int(_env_num("DAMAS_ANALYSIS_CACHE_MB", 16) * 1024 * 1024),
+        ttl=_env_num("DAMAS_ANALYSIS_CACHE_TTL", 900),
+        l2=l2,
+    )
@@ -0,0 +1,170 @@
+# backend-python/batch_eval.py
+# =========================================================
+# Evaluación vectorizada (NumPy) de muchos tableros a la vez
+#
+# Misma fórmula que ai_engine.evaluate_board, pero sobre un tensor
+# (N, 10, 10) int8:
+#     0 = vacío, 1 = 'r', 2 = 'R', -1 = 'n', -2 = 'N'
+#
+# La evaluación es lineal en 6 términos (features), calculados
+# desde el punto de vista de R:
+#     pawn, king, advance, king_center, edge, mobility
+# eval(side) = signo(side) * (features @ pesos)
+#
+# Uso típico (self-play, reconstrucción de tablas, tuner):
+#     t = boards_to_tensor(boards)
+#     scores = evaluate_batch(t, sides)
+# =========================================================
+
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from ai_engine import eval_weights
+
+BOARD_SIZE = 10
+FEATURES = ("pawn", "king", "advance", "king_center", "edge", "mobility")
+
+_CODE = {"r": 1, "R": 2, "n": -1, "N": -2}
+_ROWS = np.arange(BOARD_SIZE, dtype=np.int64).reshape(1, BOARD_SIZE, 1)
+_CENTER = (BOARD_SIZE - 1) / 2.0
+_r, _c = np.meshgrid(np.arange(BOARD_SIZE), np.arange(BOARD_SIZE), indexing="ij")
+# max(0, 4 - distancia Manhattan al centro), por casilla
+_CENTER_BONUS = np.maximum(0.0, 4.0 - (np.abs(_r - _CENTER) + np.abs(_c - _CENTER)))
+_EDGE_COLS = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=bool)
+_EDGE_COLS[:, 0] = True
+_EDGE_COLS[:, BOARD_SIZE - 1] = True
+
+
+# ---------------------------------------------------------
+# Conversión tablero <-> tensor
+# ---------------------------------------------------------
+_LUT = np.zeros(256, dtype=np.int8)
+for _ch, _v in _CODE.items():
+    _LUT[ord(_ch)] = _v
+
+
+def _cells_to_tensor(cells: bytes, n: int) -> np.ndarray:
+    return _LUT[np.frombuffer(cells, dtype=np.uint8)].reshape(n, BOARD_SIZE, BOARD_SIZE)
+
+
+def board_to_array(board: Sequence[Sequence[Optional[str]]]) -> np.ndarray:
+    return boards_to_tensor([board])[0]
+
+
+def boards_to_tensor(boards: Iterable[Sequence[Sequence[Optional[str]]]]) -> np.ndarray:
+    # 1 byte por casilla y una sola pasada por la LUT para todo el lote
+    parts = ["".join((ch or ".") for row in b for ch in row) for b in boards]
+    if not parts:
+        return np.zeros((0, BOARD_SIZE, BOARD_SIZE), dtype=np.int8)
+    return _cells_to_tensor("".join(parts).encode("ascii", "replace"), len(parts))
+
+
+def keys_to_tensor(keys: Iterable[str]) -> np.ndarray:
+    """Directo desde keys board_to_key (con o sin '|side:'), sin construir listas."""
+    parts = [k.split("|", 1)[0].replace("/", "") for k in keys]
+    if not parts:
+        return np.zeros((0, BOARD_SIZE, BOARD_SIZE), dtype=np.int8)
+    if any(len(p) != BOARD_SIZE * BOARD_SIZE for p in parts):
+        raise ValueError("key con tamaño de tablero inválido")
+    return _cells_to_tensor("".join(parts).encode("ascii", "replace"), len(parts))
+
+
+def sides_to_sign(sides: Iterable[str]) -> np.ndarray:
+    return np.array([1.0 if s == "R" else -1.0 for s in sides], dtype=np.float64)
+
+
+# ---------------------------------------------------------
+# Features (vista de R)
+# ---------------------------------------------------------
+def _quiet_move_counts(t: np.ndarray) -> np.ndarray:
+    """Jugadas simples de R menos jugadas simples de N (como generate_quiet_moves)."""
+    n = t.shape[0]
+    # padding con una "pieza" para que los bordes nunca cuenten como vacío;
+    # BOARD_SIZE de margen: la dama voladora mira hasta 9 casillas
+    m = BOARD_SIZE
+    pad = np.full((n, BOARD_SIZE + 2 * m, BOARD_SIZE + 2 * m), 9, dtype=np.int8)
+    pad[:, m:-m, m:-m] = t
+
+    def empty_at(dr: int, dc: int) -> np.ndarray:
+        return pad[:, m + dr:m + dr + BOARD_SIZE, m + dc:m + dc + BOARD_SIZE] == 0
+
+    up = empty_at(-1, -1).astype(np.int32) + empty_at(-1, 1)
+    down = empty_at(1, -1).astype(np.int32) + empty_at(1, 1)
+
+    # dama: casillas libres seguidas en cada diagonal
+    ray = np.zeros((n, BOARD_SIZE, BOARD_SIZE), dtype=np.int32)
+    for dr, dc in ((-1, -1), (-1, 1), (1, -1), (1, 1)):
+        free = np.ones((n, BOARD_SIZE, BOARD_SIZE), dtype=bool)
+        for step in range(1, BOARD_SIZE):
+            free &= empty_at(step * dr, step * dc)
+            ray += free
+
+    mob_r = (up * (t == 1)).sum(axis=(1, 2)) + (ray * (t == 2)).sum(axis=(1, 2))
+    mob_n = (down * (t == -1)).sum(axis=(1, 2)) + (ray * (t == -2)).sum(axis=(1, 2))
+    return (mob_r - mob_n).astype(np.float64)
+
+
+def features_batch(t: np.ndarray) -> np.ndarray:
+    """(N,10,10) int8 -> (N,6) float64 con FEATURES en orden."""
+    t = np.asarray(t, dtype=np.int8)
+    if t.ndim == 2:
+        t = t[None]
+
+    r_pawn = t == 1
+    r_king = t == 2
+    n_pawn = t == -1
+    n_king = t == -2
+
+    pawn = r_pawn.sum(axis=(1, 2)) - n_pawn.sum(axis=(1, 2))
+    king = r_king.sum(axis=(1, 2)) - n_king.sum(axis=(1, 2))
+
+    # avance: r cuenta (9 - fila), n cuenta fila
+    advance = ((BOARD_SIZE - 1 - _ROWS) * r_pawn).sum(axis=(1, 2)) - (_ROWS * n_pawn).sum(axis=(1, 2))
+
+    king_center = (_CENTER_BONUS * r_king).sum(axis=(1, 2)) - (_CENTER_BONUS * n_king).sum(axis=(1, 2))
+
+    # el término de borde resta al dueño: feature = -(bordes R - bordes N)
+    edge = -((_EDGE_COLS & r_pawn).sum(axis=(1, 2)) - (_EDGE_COLS & n_pawn).sum(axis=(1, 2)))
+
+    mobility = _quiet_move_counts(t)
+
+    return np.stack(
+        [pawn.astype(np.float64), king.astype(np.float64), advance.astype(np.float64),
+         king_center, edge.astype(np.float64), mobility],
+        axis=1,
+    )
+
+
+def weights_vector(weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    w = weights or eval_weights()
+    return np.array([float(w[name]) for name in FEATURES], dtype=np.float64)
+
+
+# ---------------------------------------------------------
+# API principal
+# ---------------------------------------------------------
+def evaluate_batch(
+    t: np.ndarray,
+    sides,
+    weights: Optional[Dict[str, float]] = None,
+) -> np.ndarray:
+    """
+    Evalúa N tableros. `sides` puede ser lista de "R"/"N", un array de
+    signos (+1 R / -1 N) o un único "R"/"N" para todos.
+    Coincide con evaluate_board salvo redondeo de coma flotante (< 1e-9).
+    """
+    feats = features_batch(t)
+    if isinstance(sides, str):
+        sign = np.full(feats.shape[0], 1.0 if sides == "R" else -1.0)
+    elif isinstance(sides, np.ndarray) and sides.dtype.kind in "fi":
+        sign = sides.astype(np.float64)
+    else:
+        sign = sides_to_sign(sides)
+    return (feats @ weights_vector(weights)) * sign
+
+
+def evaluate_boards(boards: List, sides, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Atajo: listas de tableros 10x10 -> scores."""
+    return evaluate_batch(boards_to_tensor(boards), sides, weights)
@@ -0,0 +1,18 @@
+# backend-python/bench/__init__.py
+# =========================================================
+# Benchmarks del motor IA (velocidad + corrección)
+#
+#   python -m bench perft                 # conteo de nodos vs valores conocidos
+#   python -m bench search --depth 4      # choose_best_move sobre el corpus
+#   python -m bench pvs --depth 4         # nodos/jugadas: minimax vs PVS
+#   python -m bench corpus                # corpus desde data/ai_moves.jsonl
+#   python -m bench all --json out.json --baseline base.json
+#
+# Ejecutar desde backend-python/ (igual que uvicorn main:app).
+# =========================================================
+
+from .perft import perft, divide, run_perft
+from .positions import PERFT_POSITIONS, BUILTIN_CORPUS
+from .corpus import build_corpus, load_corpus
+from .search import run_pvs_compare, run_search_bench
+from .compare import compare_reports
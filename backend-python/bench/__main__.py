@@ -0,0 +1,120 @@
+# backend-python/bench/__main__.py
+# ---------------------------------------------------------
+# CLI: python -m bench {perft,search,pvs,corpus,all} [opciones]
+# Código de salida 1 si perft no cuadra o hay regresión vs --baseline.
+# ---------------------------------------------------------
+
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+from ai_engine import engine_version
+
+from .compare import compare_reports
+from .corpus import DEFAULT_CORPUS, DEFAULT_LOG, build_corpus, load_corpus, save_corpus
+from .perft import run_perft
+from .search import run_pvs_compare, run_search_bench
+
+
+def _print_perft(rows) -> None:
+    for r in rows:
+        flag = "ok" if r["ok"] else f"MISMATCH (esperado {r['expected']})"
+        print(f"perft {r['name']:<20} d={r['depth']} nodes={r['nodes']:<9} "
+              f"{r['seconds']:.3f}s nps={r['nps']} {flag}")
+
+
+def _print_search(rows) -> None:
+    for r in rows:
+        ttd = " ".join(f"{t:.3f}" for t in r["time_to_depth"])
+        print(f"search {r['name']:<20} d={r['depth']} move={r['move']} nodes={r['nodes']} "
+              f"nps={r['nps']} ttd=[{ttd}] peak_kb={r['peak_kb']}")
+
+
+def _print_pvs(cmp) -> None:
+    for r in cmp["rows"]:
+        mm, pv = r["minimax"], r["pvs"]
+        same = "=" if mm["move"] == pv["move"] else f"≠ (minimax {round(r.get('pvs_move_minimax_score') or 0.0, 6)})"
+        print(f"pvs {r['name']:<20} d={r['depth']} nodes mm={mm['nodes']:<7} pvs={pv['nodes']:<7} "
+              f"ratio={r['node_ratio']} move mm={mm['move']} pvs={pv['move']} {same} "
+              f"score_diff={r['score_diff']} re={pv['researches']} asp={pv['aspiration_fails']}")
+    print(f"pvs TOTAL nodes mm={cmp['nodes_minimax']} pvs={cmp['nodes_pvs']} ratio={cmp['node_ratio']} "
+          f"seconds mm={cmp['seconds_minimax']:.3f} pvs={cmp['seconds_pvs']:.3f} selective={cmp['selective']}")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench", description="Benchmarks del motor Damas10x10")
+    ap.add_argument("cmd", choices=["perft", "search", "pvs", "corpus", "all"])
+    ap.add_argument("--depth", type=int, default=4, help="profundidad de búsqueda (search)")
+    ap.add_argument("--perft-depth", type=int, default=5)
+    ap.add_argument("--corpus", type=Path, default=None, help=f"corpus JSON (def: {DEFAULT_CORPUS.name})")
+    ap.add_argument("--log", type=Path, default=DEFAULT_LOG, help="ai_moves.jsonl para 'corpus'")
+    ap.add_argument("--limit", type=int, default=40)
+    ap.add_argument("--no-memory", action="store_true", help="omite la pasada con tracemalloc")
+    ap.add_argument("--json", type=Path, default=None, help="escribe el reporte en JSON")
+    ap.add_argument("--baseline", type=Path, default=None, help="reporte base para comparar")
+    ap.add_argument("--tolerance", type=float, default=0.15)
+    ap.add_argument("--score-tol", type=float, default=1e-6, help="pvs: diferencia de score que cuenta como empate")
+    ap.add_argument("--selective", action="store_true", help="pvs: con LMR/futility/razoring activados")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "corpus":
+        corpus = build_corpus(args.log, limit=args.limit)
+        if not corpus:
+            print(f"[BENCH] sin posiciones en {args.log}")
+            return 1
+        save_corpus(corpus, args.corpus or DEFAULT_CORPUS)
+        print(f"[BENCH] corpus: {len(corpus)} posiciones -> {args.corpus or DEFAULT_CORPUS}")
+        return 0
+
+    report = {
+        "engine": engine_version(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "ts": int(time.time() * 1000),
+    }
+    exit_code = 0
+
+    if args.cmd in ("perft", "all"):
+        report["perft"] = run_perft(max_depth=args.perft_depth)
+        _print_perft(report["perft"])
+        if not all(r["ok"] for r in report["perft"]):
+            exit_code = 1
+
+    if args.cmd in ("search", "all"):
+        corpus = load_corpus(args.corpus)
+        report["search"] = run_search_bench(corpus, depth=args.depth, measure_memory=not args.no_memory)
+        _print_search(report["search"])
+
+    if args.cmd == "pvs":
+        corpus = load_corpus(args.corpus)
+        report["pvs"] = run_pvs_compare(corpus, depth=args.depth, score_tol=args.score_tol,
+                                        selective=args.selective)
+        _print_pvs(report["pvs"])
+        for p in report["pvs"]["problems"]:
+            print("[BENCH] PVS:", p)
+        for n in report["pvs"]["notes"]:
+            print("[BENCH] nota:", n)
+        if not report["pvs"]["ok"]:
+            exit_code = 1
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        report["compare"] = compare_reports(report, baseline, tolerance=args.tolerance)
+        for p in report["compare"]["problems"]:
+            print("[BENCH] REGRESIÓN:", p)
+        for n in report["compare"]["notes"]:
+            print("[BENCH] nota:", n)
+        if not report["compare"]["ok"]:
+            exit_code = 1
+
+    if args.json:
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
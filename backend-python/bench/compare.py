@@ -0,0 +1,50 @@
+# backend-python/bench/compare.py
+# ---------------------------------------------------------
+# Comparación contra un reporte base guardado (JSON).
+# - perft: cualquier diferencia de nodos = error de corrección
+# - search: tiempo a profundidad > (1 + tolerance) × base = regresión
+# ---------------------------------------------------------
+
+from typing import Any, Dict, List, Tuple
+
+
+def _index(rows: List[Dict[str, Any]]) -> Dict[Tuple[str, int], Dict[str, Any]]:
+    return {(r["name"], int(r["depth"])): r for r in rows or []}
+
+
+def compare_reports(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = 0.15,
+) -> Dict[str, Any]:
+    problems: List[Dict[str, Any]] = []
+    notes: List[Dict[str, Any]] = []
+
+    base_perft = _index(baseline.get("perft", []))
+    for row in current.get("perft", []):
+        b = base_perft.get((row["name"], int(row["depth"])))
+        if b is None:
+            continue
+        if b["nodes"] != row["nodes"]:
+            problems.append({"kind": "perft_mismatch", "name": row["name"], "depth": row["depth"],
+                             "baseline": b["nodes"], "current": row["nodes"]})
+        elif b.get("seconds") and row["seconds"] > b["seconds"] * (1.0 + tolerance):
+            problems.append({"kind": "perft_slower", "name": row["name"], "depth": row["depth"],
+                             "baseline": b["seconds"], "current": row["seconds"]})
+
+    base_search = _index(baseline.get("search", []))
+    for row in current.get("search", []):
+        b = base_search.get((row["name"], int(row["depth"])))
+        if b is None:
+            continue
+        if b.get("seconds") and row["seconds"] > b["seconds"] * (1.0 + tolerance):
+            problems.append({"kind": "search_slower", "name": row["name"], "depth": row["depth"],
+                             "baseline": b["seconds"], "current": row["seconds"]})
+        if b.get("move") != row.get("move"):
+            notes.append({"kind": "move_changed", "name": row["name"], "depth": row["depth"],
+                          "baseline": b.get("move"), "current": row.get("move")})
+        if b.get("nodes") and row.get("nodes") != b.get("nodes"):
+            notes.append({"kind": "nodes_changed", "name": row["name"], "depth": row["depth"],
+                          "baseline": b.get("nodes"), "current": row.get("nodes")})
+
+    return {"ok": not problems, "tolerance": tolerance, "problems": problems, "notes": notes}
@@ -0,0 +1,67 @@
+# backend-python/bench/corpus.py
+# ---------------------------------------------------------
+# Corpus de posiciones para el benchmark de búsqueda.
+# Se construye desde data/ai_moves.jsonl (tabla compacta + segmentos
+# vivos, ver experience_log.py): keys únicas con side, ordenadas por
+# frecuencia (las posiciones que más se juegan).
+# ---------------------------------------------------------
+
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ai_engine import generate_legal_moves, key_to_board
+from experience_log import ExperienceLog
+
+from .positions import BUILTIN_CORPUS
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_LOG = BENCH_DIR.parent / "data" / "ai_moves.jsonl"
+DEFAULT_CORPUS = BENCH_DIR / "corpus.json"
+
+
+def build_corpus(
+    log_path: Path = DEFAULT_LOG,
+    limit: int = 40,
+    min_moves: int = 2,
+) -> List[Dict[str, Any]]:
+    """
+    Devuelve [{name, k, hits}] con las `limit` posiciones más frecuentes
+    que tengan side y al menos `min_moves` jugadas legales.
+    """
+    freq: Counter = Counter()
+    for row in ExperienceLog(log_path).iter_rows():
+        k = row.get("k")
+        if not isinstance(k, str) or "|side:" not in k or row.get("move") == "__GAME_RESULT__":
+            continue
+        freq[k] += int(row.get("count") or 1)
+
+    out: List[Dict[str, Any]] = []
+    # desempate estable por key para que el corpus sea reproducible
+    for k, hits in sorted(freq.items(), key=lambda kv: (-kv[1], kv[0])):
+        board, side = key_to_board(k)
+        if board is None or side not in ("R", "N"):
+            continue
+        if len(generate_legal_moves(board, side)) < min_moves:
+            continue
+        out.append({"name": f"log-{len(out) + 1:03d}", "k": k, "hits": hits})
+        if len(out) >= limit:
+            break
+    return out
+
+
+def save_corpus(corpus: List[Dict[str, Any]], path: Path = DEFAULT_CORPUS) -> None:
+    path.write_text(json.dumps(corpus, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def load_corpus(path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    p = Path(path) if path else DEFAULT_CORPUS
+    if p.exists():
+        try:
+            data = json.loads(p.read_text(encoding="utf-8"))
+            if isinstance(data, list) and data:
+                return data
+        except Exception:
+            pass
+    return list(BUILTIN_CORPUS)
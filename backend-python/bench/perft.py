@@ -0,0 +1,61 @@
+# backend-python/bench/perft.py
+# ---------------------------------------------------------
+# Perft: cuenta hojas del árbol de jugadas legales a profundidad d
+# usando generate_legal_moves/apply_move del motor real.
+# ---------------------------------------------------------
+
+import time
+from typing import Any, Dict, List, Optional
+
+from ai_engine import apply_move, generate_legal_moves, key_to_board
+
+from .positions import PERFT_POSITIONS
+
+
+def _other(side: str) -> str:
+    return "N" if side == "R" else "R"
+
+
+def perft(board, side: str, depth: int) -> int:
+    if depth <= 0:
+        return 1
+    moves = generate_legal_moves(board, side)
+    if depth == 1:
+        return len(moves)
+    nxt = _other(side)
+    return sum(perft(apply_move(board, mv, side), nxt, depth - 1) for mv in moves)
+
+
+def divide(board, side: str, depth: int) -> Dict[str, int]:
+    """Perft desglosado por jugada raíz (para depurar diferencias)."""
+    out: Dict[str, int] = {}
+    for mv in generate_legal_moves(board, side):
+        out[mv.to_algebraic()] = perft(apply_move(board, mv, side), _other(side), depth - 1)
+    return out
+
+
+def run_perft(
+    positions: Optional[List[Dict[str, Any]]] = None,
+    max_depth: int = 5,
+) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for pos in positions or PERFT_POSITIONS:
+        board, side = key_to_board(pos["k"])
+        if board is None:
+            continue
+        known = {int(d): int(n) for d, n in (pos.get("nodes") or {}).items()}
+        for depth in range(1, max_depth + 1):
+            t0 = time.perf_counter()
+            nodes = perft(board, side or "R", depth)
+            secs = time.perf_counter() - t0
+            expected = known.get(depth)
+            results.append({
+                "name": pos["name"],
+                "depth": depth,
+                "nodes": nodes,
+                "expected": expected,
+                "ok": expected is None or expected == nodes,
+                "seconds": round(secs, 6),
+                "nps": int(nodes / secs) if secs > 0 else None,
+            })
+    return results
@@ -0,0 +1,67 @@
+# backend-python/bench/positions.py
+# ---------------------------------------------------------
+# Posiciones fijas 10x10 (formato board_to_key) con conteos
+# perft conocidos para las reglas actuales del motor Python
+# (damas voladoras, ley de la mayoría cantidad > puntos > dama).
+# Los conteos salen del generador de referencia independiente
+# (python -m bench.reference), no del motor; tests/test_perft.py
+# comprueba que ambos coinciden. Si cambian las reglas hay que
+# cambiar bench/reference.py y regenerar estos valores.
+# ---------------------------------------------------------
+
+from typing import Any, Dict, List
+
+PERFT_POSITIONS: List[Dict[str, Any]] = [
+    {
+        "name": "initial",
+        "k": ".n.n.n.n.n/n.n.n.n.n./.n.n.n.n.n/n.n.n.n.n./........../........../.r.r.r.r.r/r.r.r.r.r./.r.r.r.r.r/r.r.r.r.r.|side:R",
+        "nodes": {1: 9, 2: 81, 3: 658, 4: 4265, 5: 26875},
+    },
+    {
+        "name": "kings-endgame",
+        "k": ".n......../........n./...n....../......n.../.......N../....R...../........../..R......./.r......../r.........|side:R",
+        "nodes": {1: 1, 2: 17, 3: 257, 4: 3157, 5: 40404},
+    },
+    {
+        "name": "multi-capture",
+        "k": ".....n..../..n......./...n....../........../...n...n../........../...n.n.n../..r...r.../.........r/....r.....|side:R",
+        "nodes": {1: 2, 2: 5, 3: 11, 4: 41, 5: 118},
+    },
+    {
+        # a1 salta c3 y puede aterrizar en cualquiera de las 7 casillas libres detrás
+        "name": "flying-king-landings",
+        "k": "........../n........./.N......../........../.........n/........../........../..n......./........../R.........|side:R",
+        "nodes": {1: 7, 2: 70, 3: 784, 4: 8832, 5: 91755},
+    },
+    {
+        # solo el aterrizaje en e5 sigue la cadena (h2): mayoría de 2 capturas
+        "name": "flying-king-chain",
+        "k": ".n......../........../........../........../........../........../.........N/..n......./.......n../R.........|side:R",
+        "nodes": {1: 1, 2: 11, 3: 96, 4: 1019, 5: 10567},
+    },
+    {
+        # j4xh6 -> g7, luego h8 o d4: h8 capturada sigue en el tablero hasta el
+        # final de la cadena y tapa la vuelta por la diagonal (si no, 3 capturas)
+        "name": "king-captured-blocks",
+        "k": ".......R../..n......./.......r../........../.......r../........../...r.n...N/........../........../......r...|side:N",
+        "nodes": {1: 5, 2: 55, 3: 206, 4: 1468, 5: 15483},
+    },
+]
+
+# Corpus de búsqueda por defecto (si no hay bench/corpus.json)
+BUILTIN_CORPUS: List[Dict[str, Any]] = [
+    {"name": p["name"], "k": p["k"]} for p in PERFT_POSITIONS
+] + [
+    {
+        "name": "opening-ply12",
+        "k": ".n.n.n.n.n/..n.n.n.n./.n.n.n.n.n/n.n.n...../........../....n.n.r./.r.......r/r.r.r...r./.r.r.r.r.r/r.r.r.r.r.|side:R",
+    },
+    {
+        "name": "middlegame-ply24",
+        "k": "...n.n.n.n/n.n.n.n.n./.n.n...n../n.n.n...r./.........n/......n.../.r.......r/r.r...r.r./.r.r.r...r/r.r...r.r.|side:R",
+    },
+    {
+        "name": "middlegame-ply36",
+        "k": "...n.....n/n.n.n.n.n./.n.n.n...n/n.n.n...../.......r.n/..r...n.../.r...r..../..r.r...r./.r.r.r...r/r.r.....r.|side:R",
+    },
+]
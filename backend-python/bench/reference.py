@@ -0,0 +1,174 @@
+# backend-python/bench/reference.py
+# ---------------------------------------------------------
+# Generador de jugadas de REFERENCIA, escrito desde las reglas y sin
+# usar nada del motor (ni rayos, ni códigos, ni apply_move): copia el
+# tablero en cada salto y recorre las diagonales a mano. Lento, pero
+# independiente: los conteos perft de positions.py salen de aquí y
+# tests/test_perft.py comprueba que el motor da lo mismo.
+#
+# Reglas (las del motor, ver generate_capture_moves en ai_engine.py):
+# - peón: avanza 1 en diagonal; captura solo hacia delante
+# - dama voladora: se desliza y captura a distancia, aterriza en
+#   cualquier casilla libre tras la pieza capturada
+# - las capturadas siguen en el tablero hasta acabar la cadena (no se
+#   saltan dos veces y tapan el paso); la casilla de salida hace de muro
+# - captura obligatoria, ley de la mayoría: más piezas, luego más
+#   puntos (dama 1.5, peón 1); a igualdad, la dama tiene prioridad
+# - corona solo si TERMINA en la última fila
+# ---------------------------------------------------------
+
+from typing import List, Optional, Tuple
+
+N = 10
+DIAGONALS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+CAPTURED = "X"  # marca de pieza ya capturada dentro de la cadena
+
+Board = List[List[Optional[str]]]
+Square = Tuple[int, int]
+# (ruta de casillas, casillas capturadas, pieza)
+RefMove = Tuple[Tuple[Square, ...], Tuple[Square, ...], str]
+
+
+def _owner(ch: Optional[str]) -> Optional[str]:
+    if ch in ("r", "R"):
+        return "R"
+    if ch in ("n", "N"):
+        return "N"
+    return None
+
+
+def _inside(r: int, c: int) -> bool:
+    return 0 <= r < N and 0 <= c < N
+
+
+def _alg(sq: Square) -> str:
+    r, c = sq
+    return f"{chr(ord('a') + c)}{N - r}"
+
+
+def _captures_from(board: Board, side: str, origin: Square) -> List[RefMove]:
+    ch = board[origin[0]][origin[1]]
+    king = ch in ("R", "N")
+    forward = -1 if side == "R" else 1
+    dirs = DIAGONALS if king else tuple(d for d in DIAGONALS if d[0] == forward)
+    found: List[RefMove] = []
+
+    def walk(b: Board, at: Square, path: List[Square], caps: List[Square]) -> None:
+        extended = False
+        for dr, dc in dirs:
+            r, c = at[0] + dr, at[1] + dc
+            if king:
+                while _inside(r, c) and b[r][c] is None and (r, c) != origin:
+                    r, c = r + dr, c + dc
+            if not _inside(r, c) or (r, c) == origin:
+                continue
+            victim = b[r][c]
+            if victim is None or victim == CAPTURED or _owner(victim) == side:
+                continue
+            lr, lc = r + dr, c + dc
+            while _inside(lr, lc) and b[lr][lc] is None and (lr, lc) != origin:
+                if (lr, lc) not in path:
+                    nb = [row[:] for row in b]
+                    nb[at[0]][at[1]] = None
+                    nb[r][c] = CAPTURED
+                    nb[lr][lc] = ch
+                    walk(nb, (lr, lc), path + [(lr, lc)], caps + [(r, c)])
+                    extended = True
+                if not king:
+                    break
+                lr, lc = lr + dr, lc + dc
+        if not extended and caps:
+            found.append((tuple(path), tuple(caps), ch))
+
+    b0 = [row[:] for row in board]
+    b0[origin[0]][origin[1]] = None
+    walk(b0, origin, [origin], [])
+    return found
+
+
+def _quiet_from(board: Board, side: str, origin: Square) -> List[RefMove]:
+    r0, c0 = origin
+    ch = board[r0][c0]
+    out: List[RefMove] = []
+    if ch in ("R", "N"):
+        for dr, dc in DIAGONALS:
+            r, c = r0 + dr, c0 + dc
+            while _inside(r, c) and board[r][c] is None:
+                out.append(((origin, (r, c)), (), ch))
+                r, c = r + dr, c + dc
+    else:
+        dr = -1 if side == "R" else 1
+        for dc in (-1, 1):
+            r, c = r0 + dr, c0 + dc
+            if _inside(r, c) and board[r][c] is None:
+                out.append(((origin, (r, c)), (), ch))
+    return out
+
+
+def reference_moves(board: Board, side: str) -> List[RefMove]:
+    """Jugadas legales de `side` según las reglas de arriba."""
+    own = [(r, c) for r in range(N) for c in range(N) if _owner(board[r][c]) == side]
+    caps: List[RefMove] = []
+    for sq in own:
+        caps += _captures_from(board, side, sq)
+    if not caps:
+        out: List[RefMove] = []
+        for sq in own:
+            out += _quiet_from(board, side, sq)
+        return out
+
+    def weight(m: RefMove) -> Tuple[int, float]:
+        _, taken, _ = m
+        return len(taken), sum(1.5 if board[r][c] in ("R", "N") else 1.0 for r, c in taken)
+
+    best = max(weight(m) for m in caps)
+    top = [m for m in caps if weight(m) == best]
+    kings = [m for m in top if m[2] in ("R", "N")]
+    return kings if kings else top
+
+
+def reference_move_strs(board: Board, side: str) -> List[str]:
+    return sorted("-".join(_alg(sq) for sq in m[0]) for m in reference_moves(board, side))
+
+
+def reference_apply(board: Board, move: RefMove) -> Board:
+    path, taken, ch = move
+    nb = [row[:] for row in board]
+    (r0, c0), (r1, c1) = path[0], path[-1]
+    nb[r0][c0] = None
+    for r, c in taken:
+        nb[r][c] = None
+    if ch == "r" and r1 == 0:
+        ch = "R"
+    elif ch == "n" and r1 == N - 1:
+        ch = "N"
+    nb[r1][c1] = ch
+    return nb
+
+
+def reference_perft(board: Board, side: str, depth: int) -> int:
+    if depth <= 0:
+        return 1
+    moves = reference_moves(board, side)
+    if depth == 1:
+        return len(moves)
+    other = "N" if side == "R" else "R"
+    return sum(reference_perft(reference_apply(board, m), other, depth - 1) for m in moves)
+
+
+def parse_key(k: str) -> Tuple[Board, str]:
+    """Key de board_to_key -> (tablero, side), sin pasar por el motor."""
+    body, _, side = k.partition("|side:")
+    board: Board = [[(ch if ch in ("r", "n", "R", "N") else None) for ch in row] for row in body.split("/")]
+    if len(board) != N or any(len(row) != N for row in board):
+        raise ValueError(f"key inválida: {k!r}")
+    return board, (side.strip() or "R")
+
+
+if __name__ == "__main__":
+    # python -m bench.reference: conteos de referencia para positions.py
+    from .positions import PERFT_POSITIONS
+
+    for pos in PERFT_POSITIONS:
+        b, s = parse_key(pos["k"])
+        print(pos["name"], {d: reference_perft(b, s, d) for d in range(1, 6)})
@@ -0,0 +1,172 @@
+# backend-python/bench/search.py
+# ---------------------------------------------------------
+# Benchmark de búsqueda: choose_best_move a profundidad fija
+# (sin experiencia) sobre el corpus.
+# Reporta nodos, nodos/seg, tiempo-hasta-profundidad y pico de memoria.
+#
+# run_pvs_compare: minimax (referencia) vs PVS a igual profundidad.
+# Si eligen jugadas distintas, la de PVS se puntúa con minimax: debe
+# valer lo mismo que la de minimax (± score_tol), es decir, un empate.
+# Por defecto sin búsqueda selectiva (PVS exacto); con selective=True
+# se mide LMR/futility/razoring y las pérdidas van a notas.
+# ---------------------------------------------------------
+
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from ai_engine import (
+    SearchStats,
+    apply_move,
+    choose_best_move,
+    iterative_deepening,
+    key_to_board,
+    minimax,
+    set_selective,
+)
+
+_INF = float("inf")
+
+
+def _search(board, side: str, depth: int, stats: Optional[SearchStats] = None):
+    return choose_best_move(board, side, depth=depth, use_learned=False, stats=stats)
+
+
+def run_search_bench(
+    corpus: List[Dict[str, Any]],
+    depth: int = 4,
+    measure_memory: bool = True,
+) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for pos in corpus:
+        board, side = key_to_board(pos["k"])
+        if board is None:
+            continue
+        side = side or "R"
+
+        time_to_depth: List[float] = []
+        move = None
+        stats = SearchStats()
+        for d in range(1, depth + 1):
+            stats = SearchStats()
+            t0 = time.perf_counter()
+            move = _search(board, side, d, stats)
+            time_to_depth.append(round(time.perf_counter() - t0, 6))
+        nodes = stats.nodes
+
+        peak_kb = None
+        if measure_memory:
+            # pasada aparte: tracemalloc distorsiona los tiempos
+            tracemalloc.start()
+            try:
+                _search(board, side, depth)
+                peak_kb = round(tracemalloc.get_traced_memory()[1] / 1024.0, 1)
+            finally:
+                tracemalloc.stop()
+
+        secs = time_to_depth[-1] if time_to_depth else 0.0
+        results.append({
+            "name": pos["name"],
+            "depth": depth,
+            "move": move,
+            "nodes": nodes,
+            "seconds": secs,
+            "nps": int(nodes / secs) if secs > 0 else None,
+            "time_to_depth": time_to_depth,
+            "peak_kb": peak_kb,
+            "stats": stats.to_dict(),
+        })
+    return results
+
+
+def _minimax_value_of(board, side: str, depth: int, mv) -> float:
+    """Valor minimax (desde `side`) de jugar `mv`, con la misma extensión de capturas."""
+    child = apply_move(board, mv, side)
+    next_depth = depth if (mv.is_capture and depth > 1) else depth - 1
+    other = "N" if side == "R" else "R"
+    return minimax(child, other, next_depth, -_INF, _INF, side)[0]
+
+
+def run_pvs_compare(
+    corpus: List[Dict[str, Any]],
+    depth: int = 4,
+    score_tol: float = 1e-6,
+    selective: bool = False,
+) -> Dict[str, Any]:
+    prev = set_selective(lmr=selective, futility=selective, razoring=selective)
+    try:
+        return _pvs_compare(corpus, depth, score_tol, selective)
+    finally:
+        set_selective(**prev)
+
+
+def _pvs_compare(corpus: List[Dict[str, Any]], depth: int, score_tol: float, selective: bool) -> Dict[str, Any]:
+    rows: List[Dict[str, Any]] = []
+    problems: List[Dict[str, Any]] = []
+    notes: List[Dict[str, Any]] = []
+    tot_mm = tot_pvs = 0
+    secs_mm_total = secs_pvs_total = 0.0
+    for pos in corpus:
+        board, side = key_to_board(pos["k"])
+        if board is None:
+            continue
+        side = side or "R"
+
+        st_mm = SearchStats()
+        t0 = time.perf_counter()
+        sc_mm, mv_mm = minimax(board, side, depth, -_INF, _INF, side, st_mm)
+        secs_mm = time.perf_counter() - t0
+
+        st_pvs = SearchStats()
+        t0 = time.perf_counter()
+        sc_pvs, mv_pvs = iterative_deepening(board, side, depth, st_pvs)
+        secs_pvs = time.perf_counter() - t0
+
+        alg_mm = mv_mm.to_algebraic() if mv_mm is not None else None
+        alg_pvs = mv_pvs.to_algebraic() if mv_pvs is not None else None
+        row: Dict[str, Any] = {
+            "name": pos["name"],
+            "depth": depth,
+            "minimax": {"move": alg_mm, "score": sc_mm, "nodes": st_mm.nodes, "seconds": round(secs_mm, 6)},
+            "pvs": {
+                "move": alg_pvs, "score": sc_pvs, "nodes": st_pvs.nodes, "seconds": round(secs_pvs, 6),
+                "researches": st_pvs.researches, "aspiration_fails": st_pvs.aspiration_fails,
+                "tt_hits": st_pvs.tt_hits,
+                "lmr_reductions": st_pvs.lmr_reductions, "lmr_researches": st_pvs.lmr_researches,
+                "futility_prunes": st_pvs.futility_prunes, "razor_cuts": st_pvs.razor_cuts,
+            },
+            "node_ratio": round(st_pvs.nodes / st_mm.nodes, 3) if st_mm.nodes else None,
+            "score_diff": round(sc_pvs - sc_mm, 9) if mv_mm is not None else None,
+        }
+        if alg_mm != alg_pvs and mv_pvs is not None and mv_mm is not None:
+            # ¿empate? la jugada de PVS tiene que valer lo mismo según minimax
+            v = _minimax_value_of(board, side, depth, mv_pvs)
+            row["pvs_move_minimax_score"] = v
+            if abs(v - sc_mm) > score_tol:
+                (notes if selective else problems).append({
+                    "kind": "move_mismatch", "name": pos["name"], "depth": depth,
+                    "minimax": alg_mm, "pvs": alg_pvs, "loss": round(sc_mm - v, 9),
+                })
+        elif (mv_mm is None) != (mv_pvs is None):
+            problems.append({"kind": "move_mismatch", "name": pos["name"], "depth": depth,
+                             "minimax": alg_mm, "pvs": alg_pvs})
+        rows.append(row)
+        tot_mm += st_mm.nodes
+        tot_pvs += st_pvs.nodes
+        secs_mm_total += secs_mm
+        secs_pvs_total += secs_pvs
+
+    return {
+        "ok": not problems,
+        "depth": depth,
+        "score_tol": score_tol,
+        "selective": selective,
+        "nodes_minimax": tot_mm,
+        "nodes_pvs": tot_pvs,
+        "node_ratio": round(tot_pvs / tot_mm, 3) if tot_mm else None,
+        "seconds_minimax": round(secs_mm_total, 6),
+        "seconds_pvs": round(secs_pvs_total, 6),
+        "rows": rows,
+        "problems": problems,
+        "notes": notes,
+    }
@@ -0,0 +1,168 @@
+# backend-python/board_codec.py
+# =========================================================
+# Parseo rápido de tableros para los endpoints /ai/*, /games, /ws/ai
+#
+# Formatos aceptados (todos -> Board 10x10 del motor):
+#   1) lista 10x10 con 'r','n','R','N' o None          (legacy)
+#   2) string JSON de esa lista: "[[null,\"n\",...],...]" (legacy)
+#   3) key de board_to_key: "..n.n/..../...|side:R"  (109 chars + side)
+#   4) 100 chars seguidos (las 10 filas sin '/')
+#   5) 50 chars: solo casillas oscuras ((fila+col) impar), fila a fila
+# En los compactos (3-5) vacío = '.', '-', '_', '0' o ' '; cualquier
+# otro carácter invalida el tablero.
+#
+# - Un solo recorrido: se construye el Board y a la vez el cuerpo de
+#   la key canónica (así /ai/move no necesita board_to_key).
+# - Strings (compactos o JSON) cacheados en un LRU: el mismo tablero
+#   repetido cuesta una búsqueda en dict + copiar 10 filas.
+# - Listas: camino rápido (map de C por fila -> cuerpo de key); si una
+#   fila trae algo raro (espacios, "null", dicts...) se limpia como antes.
+# =========================================================
+
+from __future__ import annotations
+import json
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+BOARD_SIZE = 10
+N_DARK = BOARD_SIZE * BOARD_SIZE // 2
+
+Board = List[List[Optional[str]]]
+Position = Tuple[Board, str]  # (board, cuerpo de key sin '|side:')
+
+_ALLOWED = {"r", "n", "R", "N"}
+_TO_CHAR = {None: ".", "r": "r", "n": "n", "R": "R", "N": "N"}
+_CHAR = {"r": "r", "n": "n", "R": "R", "N": "N", ".": None, "-": None, "_": None, "0": None, " ": None}
+
+# índices (fila, col) de las casillas oscuras, en orden de lectura
+DARK_SQUARES: Tuple[Tuple[int, int], ...] = tuple(
+    (r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE) if (r + c) % 2 == 1
+)
+
+
+# ---------------------------------------------------------
+# Limpieza legacy (celdas sueltas)
+# ---------------------------------------------------------
+def _clean_cell(cell: Any) -> Optional[str]:
+    if isinstance(cell, str):
+        s = cell.strip()
+        if s in _ALLOWED:
+            return s
+    return None
+
+
+def _from_rows(x: Any) -> Optional[Position]:
+    """Lista 10x10 -> (board, cuerpo de key); filas limpias se copian tal cual."""
+    if not isinstance(x, list) or len(x) != BOARD_SIZE:
+        return None
+    out: Board = []
+    parts: List[str] = []
+    to_char = _TO_CHAR.__getitem__
+    for row in x:
+        if not isinstance(row, list) or len(row) != BOARD_SIZE:
+            return None
+        try:
+            parts.append("".join(map(to_char, row)))
+            out.append(row[:])
+        except (KeyError, TypeError):
+            clean = [_clean_cell(c) for c in row]
+            parts.append("".join(ch or "." for ch in clean))
+            out.append(clean)
+    return out, "/".join(parts)
+
+
+# ---------------------------------------------------------
+# Strings (cacheados; resultado inmutable)
+# ---------------------------------------------------------
+_Frozen = Tuple[Tuple[Optional[str], ...], ...]
+
+
+def _freeze(board: Board) -> _Frozen:
+    return tuple(tuple(row) for row in board)
+
+
+def _compact_cells(s: str) -> Optional[List[Optional[str]]]:
+    try:
+        return [_CHAR[ch] for ch in s]
+    except KeyError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _parse_str(s: str) -> Optional[Tuple[_Frozen, str]]:
+    s = s.strip()
+    if not s:
+        return None
+
+    if s[0] == "[":
+        try:
+            pos = _from_rows(json.loads(s))
+        except ValueError:
+            return None
+        return (_freeze(pos[0]), pos[1]) if pos is not None else None
+
+    if "|" in s:
+        s = s.split("|", 1)[0]
+
+    if len(s) == BOARD_SIZE * BOARD_SIZE + BOARD_SIZE - 1 and s.count("/") == BOARD_SIZE - 1:
+        s = s.replace("/", "")
+
+    if len(s) == BOARD_SIZE * BOARD_SIZE:
+        cells = _compact_cells(s)
+        if cells is None:
+            return None
+        rows = tuple(tuple(cells[i:i + BOARD_SIZE]) for i in range(0, BOARD_SIZE * BOARD_SIZE, BOARD_SIZE))
+    elif len(s) == N_DARK:
+        cells = _compact_cells(s)
+        if cells is None:
+            return None
+        grid: Board = [[None] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+        for (r, c), ch in zip(DARK_SQUARES, cells):
+            grid[r][c] = ch
+        rows = _freeze(grid)
+    else:
+        return None
+
+    body = "/".join("".join(ch or "." for ch in row) for row in rows)
+    return rows, body
+
+
+# ---------------------------------------------------------
+# API
+# ---------------------------------------------------------
+def parse_position(x: Any) -> Optional[Position]:
+    """(board, cuerpo de key) o None si no es un tablero 10x10 válido."""
+    if isinstance(x, str):
+        hit = _parse_str(x)
+        if hit is None:
+            return None
+        return [list(row) for row in hit[0]], hit[1]
+    return _from_rows(x)
+
+
+def parse_board(x: Any) -> Optional[Board]:
+    pos = parse_position(x)
+    return pos[0] if pos is not None else None
+
+
+def position_key(body: str, side: str) -> str:
+    """Misma key que board_to_key(board, side) a partir del cuerpo."""
+    return f"{body}|side:{side}"
+
+
+def normalize_side(side_raw: Any) -> str:
+    s = str(side_raw or "R").strip().upper()
+    if s in ("ROJO", "R", "WHITE", "W", "BLANCO", "BLANCAS"):
+        return "R"
+    if s in ("NEGRO", "N", "BLACK", "B", "NEGRAS"):
+        return "N"
+    return "R" if s.startswith("R") else "N"
+
+
+def encode_dark(board: Board) -> str:
+    """Board -> 50 chars (solo casillas oscuras), el formato más corto."""
+    return "".join(board[r][c] or "." for r, c in DARK_SQUARES)
+
+
+def cache_info() -> Any:
+    return _parse_str.cache_info()
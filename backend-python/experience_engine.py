@@ -4,7 +4,9 @@
 #
 # IDEA:
 # - Leemos el archivo data/ai_moves.jsonl que se llena con
-#   /ai/log-moves (MoveLogEntry: {ts, fen, move, score}).
+#   /ai/log-moves (MoveLogEntry: {ts, fen, move, score}), vía
+#   experience_log.py: tabla compacta (score = suma de "count" filas)
+#   + segmentos vivos, no toda la historia.
 # - Para cada posición guardada, extraemos un "patrón"
 #   MUY sencillo basado en:
 #       · cantidad de peones y damas de R
@@ -23,12 +25,17 @@
 # ---------------------------------------------------------
 
 from pathlib import Path
-import json
+import logging
 from typing import Dict, Tuple, List, Optional
 
+from experience_log import ExperienceLog
+
+log = logging.getLogger(__name__)
+
 # Ruta del archivo de logs (debe coincidir con main.py)
 DATA_DIR = Path("data")
 AI_MOVES_LOG = DATA_DIR / "ai_moves.jsonl"
+EXPERIENCE_LOG = ExperienceLog(AI_MOVES_LOG)
 
 # Tipo de clave para patrones de experiencia:
 # (num_r, num_R, num_n, num_N)
@@ -37,7 +44,7 @@ FeatureKey = Tuple[int, int, int, int]
 # Caché en memoria
 _EXPERIENCE_TABLE: Dict[FeatureKey, float] = {}
 _EXPERIENCE_LOADED: bool = False
-_EXPERIENCE_MTIME: Optional[float] = None
+_EXPERIENCE_MTIME: Optional[tuple] = None  # signature() del log
 
 # Peso con el que la experiencia afecta a la evaluación.
 # Si lo subimos, la IA confiará más en lo aprendido.
@@ -89,49 +96,42 @@ def _features_from_fen(fen: str) -> FeatureKey:
 # ---------------------------------------------------------
 # Carga de experiencia desde data/ai_moves.jsonl
 # ---------------------------------------------------------
-def _build_experience_table(log_path: Path) -> Dict[FeatureKey, float]:
+def _build_experience_table(explog: ExperienceLog) -> Dict[FeatureKey, float]:
   """
-  Lee el archivo JSONL de logs y construye un diccionario:
+  Lee el log de experiencia y construye un diccionario:
       patrón -> promedio(score)
 
   Donde:
     - score se espera en el rango [-1, 1].
     - Si no hay 'score' en una entrada, se ignora.
+    - Filas compactadas: score es la suma de 'count' filas.
   """
   table_sum: Dict[FeatureKey, float] = {}
   table_count: Dict[FeatureKey, int] = {}
 
-  if not log_path.exists():
-    # No hay experiencia todavía.
-    return {}
-
-  with log_path.open("r", encoding="utf-8") as f:
-    for line in f:
-      line = line.strip()
-      if not line:
-        continue
-      try:
-        obj = json.loads(line)
-      except Exception:
-        continue
-
-      fen = obj.get("fen")
-      score = obj.get("score")
-
-      # Necesitamos al menos fen + score para aprender algo útil.
-      if not isinstance(fen, str):
-        continue
-      try:
-        score = float(score)
-      except (TypeError, ValueError):
-        continue
-
-      # Extraer patrón desde el FEN
-      key = _features_from_fen(fen)
-
-      # Acumular
-      table_sum[key] = table_sum.get(key, 0.0) + score
-      table_count[key] = table_count.get(key, 0) + 1
+  for obj in explog.iter_rows():
+    k = obj.get("k")
+    fen = obj.get("fen")
+    score = obj.get("score")
+
+    # Necesitamos al menos k/fen + score para aprender algo útil.
+    # (las filas compactadas solo guardan k)
+    if isinstance(k, str):
+      # solo el tablero: el '|side:R' contaría una pieza de más
+      fen = k.split("|", 1)[0]
+    if not isinstance(fen, str):
+      continue
+    try:
+      score = float(score)
+    except (TypeError, ValueError):
+      continue
+
+    # Extraer patrón desde el FEN
+    key = _features_from_fen(fen)
+
+    # Acumular
+    table_sum[key] = table_sum.get(key, 0.0) + score
+    table_count[key] = table_count.get(key, 0) + int(obj.get("count") or 1)
 
   # Convertir a promedio
   table_avg: Dict[FeatureKey, float] = {}
@@ -146,25 +146,17 @@ def _ensure_experience_loaded() -> None:
   """
   Carga (o recarga) la tabla de experiencia solo si:
     - Aún no se ha cargado.
-    - O el archivo ha cambiado (mtime distinto).
+    - O el log ha cambiado (tabla compacta, manifest o segmento activo).
   """
   global _EXPERIENCE_TABLE, _EXPERIENCE_LOADED, _EXPERIENCE_MTIME
 
-  try:
-    mtime = AI_MOVES_LOG.stat().st_mtime
-  except FileNotFoundError:
-    _EXPERIENCE_TABLE = {}
-    _EXPERIENCE_LOADED = True
-    _EXPERIENCE_MTIME = None
-    return
+  mtime = EXPERIENCE_LOG.signature()
 
   if not _EXPERIENCE_LOADED or _EXPERIENCE_MTIME != mtime:
-    _EXPERIENCE_TABLE = _build_experience_table(AI_MOVES_LOG)
+    _EXPERIENCE_TABLE = _build_experience_table(EXPERIENCE_LOG)
     _EXPERIENCE_LOADED = True
     _EXPERIENCE_MTIME = mtime
-    print(
-      f"[EXP] Tabla de experiencia cargada: {len(_EXPERIENCE_TABLE)} patrones."
-    )
+    log.info("experience table loaded: %d patrones", len(_EXPERIENCE_TABLE))
 
 
 # ---------------------------------------------------------
@@ -0,0 +1,485 @@
+# backend-python/experience_log.py
+# =========================================================
+# Log de experiencia segmentado (data/ai_moves.jsonl)
+#
+# Archivos, junto al segmento activo (p.ej. data/ai_moves.jsonl):
+#   ai_moves.jsonl                  segmento ACTIVO: todas las escrituras
+#                                   van aquí (el mismo archivo de siempre)
+#   ai_moves.segments/000001.jsonl  sellados, pendientes de compactar
+#   ai_moves.segments/archive/      sellados ya compactados (historia
+#                                   cruda; DAMAS_EXPLOG_ARCHIVE=0 los borra)
+#   ai_moves.compact.jsonl          tabla agregada, 1 fila por (k, jugada, rules, src):
+#                                   {"k", "move", "score": suma, "count", "last_ts"}
+#                                   (también "__GAME_RESULT__": suma de resultados)
+#                                   (1.ª línea: {"compacted_through": seq, ...})
+#   ai_moves.manifest.json          {"seq", "active_since", "live": [seq, ...]}
+#   ai_moves.lock                   flock: append/lectura compartido,
+#                                   rotar/publicar exclusivo
+#
+# - El activo se sella (rota) al pasar DAMAS_EXPLOG_SEGMENT_MB, o
+#   DAMAS_EXPLOG_SEGMENT_S desde la rotación anterior.
+# - Compactor en segundo plano: sella por tiempo y pliega los sellados
+#   en la tabla (archivo nuevo + replace) y los saca del manifest. Un
+#   solo compactor a la vez entre procesos (flock no bloqueante sobre
+#   ai_moves.compact.lock). Si se corta entre publicar la tabla y el
+#   manifest, "compacted_through" evita contar un segmento dos veces.
+# - Lectores (load_learned_patterns, experience_engine): tabla + sellados
+#   aún vivos + activo. El costo de carga depende de los pares
+#   (k, jugada) distintos, no de toda la historia. max_rows solo recorta
+#   la tabla: las filas recientes (vivos + activo) se leen siempre.
+# =========================================================
+
+from __future__ import annotations
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+try:  # coordinación entre procesos (workers + selfplay)
+    import fcntl
+except ImportError:  # Windows: solo dentro del proceso
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+
+# (k, jugada, rules, src) -> [score_sum, count, last_ts]
+# src separa p.ej. el self-play (score = resultado) de las filas de la API
+GroupKey = Tuple[str, str, Optional[str], Optional[str]]
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _env_num(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, "") or default)
+    except ValueError:
+        return default
+
+
+def _open_text(path: Path) -> Optional[TextIO]:
+    try:
+        return path.open("r", encoding="utf-8")
+    except FileNotFoundError:
+        return None
+
+
+def _rows_of(f: TextIO) -> Iterator[Dict[str, Any]]:
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(row, dict):
+            yield row
+
+
+def _read_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    f = _open_text(path)
+    if f is None:
+        return
+    with f:
+        yield from _rows_of(f)
+
+
+def _group_key(row: Dict[str, Any]) -> Optional[Tuple[GroupKey, str]]:
+    """((k, jugada, rules, src), campo de la key) de una fila cruda, o None."""
+    move = row.get("move")
+    if not move:
+        return None
+    field = "k" if row.get("k") is not None else "fen"
+    key = row.get(field)
+    if key is None:
+        return None
+    if not isinstance(key, str):
+        try:
+            key = json.dumps(key, ensure_ascii=False, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return None
+    return (key, str(move), row.get("rules"), row.get("src")), field
+
+
+class ExperienceLog:
+    def __init__(
+        self,
+        active: Path,
+        segment_bytes: int = 8 * 1024 * 1024,
+        segment_s: float = 86400.0,
+        compact_every: float = 60.0,
+        archive: bool = True,
+    ) -> None:
+        self.active = Path(active)
+        stem = self.active.stem
+        self.seg_dir = self.active.with_name(f"{stem}.segments")
+        self.archive_dir = self.seg_dir / "archive"
+        self.compact_path = self.active.with_name(f"{stem}.compact.jsonl")
+        self.manifest_path = self.active.with_name(f"{stem}.manifest.json")
+        self.lock_path = self.active.with_name(f"{stem}.lock")
+        self.compact_lock_path = self.active.with_name(f"{stem}.compact.lock")
+
+        self.segment_bytes = max(1024, int(segment_bytes))
+        self.segment_s = float(segment_s)
+        self.compact_every = max(1.0, float(compact_every))
+        self.archive = archive
+
+        self._local = threading.Lock()  # sin fcntl: al menos dentro del proceso
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.rolls = 0
+        self.compactions = 0
+        self.folded_rows = 0
+
+    # -----------------------------------------------------
+    # Locks
+    # -----------------------------------------------------
+    @contextmanager
+    def _locked(self, exclusive: bool, blocking: bool = True):
+        """Cede True con el lock tomado; False si blocking=False y está ocupado."""
+        if fcntl is None:
+            if not self._local.acquire(blocking):
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                self._local.release()
+            return
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(self.lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+        finally:
+            os.close(fd)  # libera el flock
+
+    # -----------------------------------------------------
+    # Manifest
+    # -----------------------------------------------------
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            m = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            if isinstance(m, dict):
+                return m
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _write_manifest(self, m: Dict[str, Any]) -> None:
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(m, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.manifest_path)
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.seg_dir / f"{int(seq):06d}.jsonl"
+
+    def _compacted_through(self) -> int:
+        for row in _read_jsonl(self.compact_path):
+            return int(row.get("compacted_through") or 0)
+        return 0
+
+    # -----------------------------------------------------
+    # Escritura
+    # -----------------------------------------------------
+    def append_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Un solo write() al segmento activo; devuelve bytes escritos."""
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+        if not data:
+            return 0
+        self.active.parent.mkdir(parents=True, exist_ok=True)
+        with self._locked(exclusive=False):
+            with self.active.open("a", encoding="utf-8") as f:
+                f.write(data)
+        self.maybe_roll()
+        return len(data.encode("utf-8"))
+
+    def maybe_roll(self) -> bool:
+        """Sella el activo si pasó de tamaño o de edad."""
+        try:
+            size = self.active.stat().st_size
+        except FileNotFoundError:
+            return False
+        if size == 0:
+            return False
+        m = self._read_manifest()
+        if not m:
+            with self._locked(exclusive=True, blocking=False) as ok:
+                if ok and not self._read_manifest():
+                    self._write_manifest({"seq": 0, "active_since": _now_ms(), "live": []})
+            m = self._read_manifest()
+            if not m:
+                return False
+        age_s = (_now_ms() - int(m.get("active_since") or _now_ms())) / 1000.0
+        if size < self.segment_bytes and age_s < self.segment_s:
+            return False
+        # sin esperar: si un lector largo (tuner) tiene el lock, lo
+        # reintenta la próxima escritura o el compactor
+        return self.roll(blocking=False) is not None
+
+    def roll(self, blocking: bool = True) -> Optional[int]:
+        """Sella el activo (si tiene filas); devuelve el seq del segmento."""
+        with self._locked(exclusive=True, blocking=blocking) as ok:
+            if not ok:
+                return None
+            try:
+                if self.active.stat().st_size == 0:
+                    return None
+            except FileNotFoundError:
+                return None
+            m = self._read_manifest()
+            seq = int(m.get("seq") or 0) + 1
+            live = [int(s) for s in m.get("live") or []]
+            # manifest antes que el rename: si se corta en medio, el seq
+            # apunta a un archivo que no existe (se ignora) y no se pierde nada
+            self._write_manifest({"seq": seq, "active_since": _now_ms(), "live": live + [seq]})
+            self.seg_dir.mkdir(parents=True, exist_ok=True)
+            self.active.replace(self._segment_path(seq))
+        self.rolls += 1
+        self._wake.set()
+        log.info("experience log: segmento %06d sellado", seq)
+        return seq
+
+    # -----------------------------------------------------
+    # Lectura
+    # -----------------------------------------------------
+    def iter_rows(self, max_rows: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Filas crudas de los sellados vivos y del activo (count implícito
+        1) y luego las de la tabla compacta (con "count"). `max_rows`
+        limita solo las de la tabla: lo reciente nunca se pierde.
+        El lock compartido solo se toma para abrir los archivos: los
+        descriptores abiertos siguen viendo esa foto aunque luego se
+        selle, compacte (rename) o archive; la lectura va sin lock, así
+        un lector lento (o que deja el generador a medias) no frena a
+        _publish.
+        """
+        with self._locked(exclusive=False):
+            through = self._compacted_through()
+            paths: List[Path] = []
+            for seq in sorted(int(s) for s in self._read_manifest().get("live") or []):
+                if seq > through:
+                    paths.append(self._segment_path(seq))
+            paths.append(self.active)
+            paths.append(self.compact_path)
+            files = [_open_text(p) for p in paths]
+        *sources, compact = files
+        try:
+            for f in sources:
+                if f is not None:
+                    yield from _rows_of(f)
+            if compact is None:
+                return
+            n = 0
+            for row in _rows_of(compact):
+                if "compacted_through" in row:
+                    continue
+                if max_rows is not None and n >= max_rows:
+                    return
+                n += 1
+                yield row
+        finally:
+            for f in files:
+                if f is not None:
+                    f.close()
+
+    def signature(self) -> Tuple[Any, ...]:
+        """Cambia cuando cambia lo que ve iter_rows (para recargas por mtime)."""
+        out: List[Any] = []
+        for p in (self.compact_path, self.manifest_path, self.active):
+            try:
+                st = p.stat()
+                out.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                out.append(None)
+        return tuple(out)
+
+    # -----------------------------------------------------
+    # Compactación
+    # -----------------------------------------------------
+    def compact(self) -> int:
+        """Pliega los sellados vivos en la tabla; devuelve cuántos segmentos."""
+        if fcntl is not None:
+            self.compact_lock_path.parent.mkdir(parents=True, exist_ok=True)
+            cfd = os.open(str(self.compact_lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(cfd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(cfd)
+                return 0  # otro proceso está compactando
+        else:
+            cfd = -1
+        try:
+            return self._compact_locked()
+        finally:
+            if cfd >= 0:
+                os.close(cfd)
+
+    def _compact_locked(self) -> int:
+        through = self._compacted_through()
+        live = sorted(int(s) for s in self._read_manifest().get("live") or [])
+        todo = [s for s in live if s > through and self._segment_path(s).exists()]
+        if not todo:
+            if live:
+                self._publish(None, through, live)  # limpiar el manifest
+            return 0
+
+        # tabla actual + sellados; sin lock: los sellados ya no cambian
+        table: Dict[GroupKey, List[Any]] = {}
+        fields: Dict[GroupKey, str] = {}
+        for row in _read_jsonl(self.compact_path):
+            if "compacted_through" in row:
+                continue
+            g = _group_key(row)
+            if g is None:
+                continue
+            table[g[0]] = [row.get("score", 0), int(row.get("count") or 1), int(row.get("last_ts") or 0)]
+            fields[g[0]] = g[1]
+        folded = 0
+        for seq in todo:
+            for row in _read_jsonl(self._segment_path(seq)):
+                g = _group_key(row)
+                if g is None:
+                    continue
+                try:
+                    score = float(row.get("score", 1.0))
+                except (TypeError, ValueError):
+                    score = 1.0
+                if score.is_integer():
+                    score = int(score)
+                try:
+                    ts = int(row.get("ts") or 0)
+                except (TypeError, ValueError):
+                    ts = 0
+                acc = table.get(g[0])
+                if acc is None:
+                    table[g[0]] = [score, 1, ts]
+                    fields[g[0]] = g[1]
+                else:
+                    acc[0] += score
+                    acc[1] += 1
+                    if ts > acc[2]:
+                        acc[2] = ts
+                folded += 1
+
+        new_through = todo[-1]
+        tmp = self.compact_path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            f.write(json.dumps({"compacted_through": new_through, "rows": len(table), "ts": _now_ms()}) + "\n")
+            for g, (score, count, last_ts) in table.items():
+                key, move, rules, src = g
+                row = {fields[g]: key, "move": move, "score": score, "count": count, "last_ts": last_ts}
+                if rules is not None:
+                    row["rules"] = rules
+                if src is not None:
+                    row["src"] = src
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._publish(tmp, new_through, live)
+
+        self.compactions += 1
+        self.folded_rows += folded
+        log.info(
+            "experience log: %d segmentos (%d filas) -> tabla de %d filas",
+            len(todo), folded, len(table),
+        )
+        return len(todo)
+
+    def _publish(self, tmp: Optional[Path], through: int, live: List[int]) -> None:
+        """Tabla nueva + manifest sin los segmentos plegados (lock exclusivo)."""
+        with self._locked(exclusive=True):
+            if tmp is not None:
+                tmp.replace(self.compact_path)
+            m = self._read_manifest()
+            # fuera también los que no existen (corte entre manifest y rename en roll)
+            m["live"] = [int(s) for s in m.get("live") or [] if int(s) > through and self._segment_path(int(s)).exists()]
+            self._write_manifest(m)
+        for seq in live:
+            if seq > through:
+                continue
+            path = self._segment_path(seq)
+            try:
+                if self.archive:
+                    self.archive_dir.mkdir(parents=True, exist_ok=True)
+                    path.replace(self.archive_dir / path.name)
+                else:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+    # -----------------------------------------------------
+    # Compactor en segundo plano
+    # -----------------------------------------------------
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="explog-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.maybe_roll()
+                self.compact()
+            except Exception:
+                log.exception("experience log: error compactando")
+            self._wake.wait(timeout=self.compact_every)
+            self._wake.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        m = self._read_manifest()
+
+        def size(p: Path) -> int:
+            try:
+                return p.stat().st_size
+            except FileNotFoundError:
+                return 0
+
+        live = [int(s) for s in m.get("live") or []]
+        return {
+            "active_bytes": size(self.active),
+            "live_segments": live,
+            "live_bytes": sum(size(self._segment_path(s)) for s in live),
+            "compact_bytes": size(self.compact_path),
+            "compacted_through": self._compacted_through(),
+            "segment_bytes": self.segment_bytes,
+            "segment_s": self.segment_s,
+            "rolls": self.rolls,
+            "compactions": self.compactions,
+            "folded_rows": self.folded_rows,
+        }
+
+
+def experience_log_from_env(active: Path) -> ExperienceLog:
+    """
+    DAMAS_EXPLOG_SEGMENT_MB   (tamaño para sellar el activo)
+    DAMAS_EXPLOG_SEGMENT_S    (edad para sellarlo, segundos)
+    DAMAS_EXPLOG_COMPACT_S    (cada cuánto mira el compactor)
+    DAMAS_EXPLOG_ARCHIVE      (1 = guardar crudos compactados en archive/, 0 = borrarlos)
+    """
+    return ExperienceLog(
+        active,
+        segment_bytes=int(_env_num("DAMAS_EXPLOG_SEGMENT_MB", 8) * 1024 * 1024),
+        segment_s=_env_num("DAMAS_EXPLOG_SEGMENT_S", 86400),
+        compact_every=_env_num("DAMAS_EXPLOG_COMPACT_S", 60),
+        archive=os.environ.get("DAMAS_EXPLOG_ARCHIVE", "1").strip().lower() not in ("0", "false", "no", "off"),
+    )
@@ -0,0 +1,223 @@
+# backend-python/game_sessions.py
+# =========================================================
+# Partidas en el servidor (sesiones) para /games
+#
+# El cliente crea la partida una vez y luego solo manda jugadas
+# ("c3-d4"); el servidor mantiene la posición y su estado derivado:
+#   - board + side + k (key canónica) de la posición actual
+#   - jugadas legales de la posición (se generan 1 vez y sirven para
+#     validar la jugada del cliente y para detectar fin de partida)
+#   - historial de jugadas y de keys; desde la última jugada
+#     irreversible (peón o captura) también los hashes (position_key)
+#     de las posiciones repetibles, que pasan a la búsqueda para que no
+#     entre en ciclos de damas
+#   - tablas: misma posición 3 veces, o (DAMAS_KING_DRAW_RULE=1) 25
+#     jugadas por bando solo con damas y sin capturas
+# Las sesiones inactivas más de `idle_s` se expulsan (barrido
+# perezoso en create/get); si se supera `max_sessions` sale la de
+# uso más antiguo.
+# =========================================================
+
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from ai_engine import (
+    KING_RULE,
+    KING_RULE_PLIES,
+    apply_move,
+    board_to_key,
+    find_legal_move,
+    generate_legal_moves,
+    is_reversible,
+)
+from position_key import move_delta, position_hash
+
+Board = List[List[Optional[str]]]
+
+
+def _other(side: str) -> str:
+    return "N" if side == "R" else "R"
+
+
+class GameSession:
+    def __init__(
+        self,
+        game_id: str,
+        board: Board,
+        side: str,
+        ai_side: Optional[str] = None,
+        ponder: bool = False,
+    ) -> None:
+        self.id = game_id
+        self.board = board
+        self.side = side
+        self.ai_side = ai_side        # None = la IA responde a cualquier bando
+        self.ponder = ponder
+        self.k = board_to_key(board, side)
+        self.h = position_hash(board, side)
+        self.ply = 0
+        self.moves: List[str] = []
+        self.keys: List[str] = [self.k]
+        self.reversible: List[int] = []   # hashes anteriores desde la última jugada irreversible
+        self.king_plies = 0               # plies seguidos de dama sin captura
+        self._counts: Dict[int, int] = {self.h: 1}
+        self.created = time.time()
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()  # una jugada a la vez por partida
+        self._legal: Optional[List[Any]] = None
+
+    @property
+    def legal(self) -> List[Any]:
+        if self._legal is None:
+            self._legal = generate_legal_moves(self.board, self.side)
+        return self._legal
+
+    @property
+    def winner(self) -> Optional[str]:
+        """Sin jugadas legales = pierde quien mueve."""
+        return _other(self.side) if not self.legal else None
+
+    @property
+    def draw(self) -> Optional[str]:
+        if self._counts.get(self.h, 0) >= 3:
+            return "repetition"
+        if KING_RULE and self.king_plies >= KING_RULE_PLIES:
+            return "king_moves_25"
+        return None
+
+    @property
+    def over(self) -> bool:
+        return self.draw is not None or self.winner is not None
+
+    def find(self, move: str) -> Optional[Any]:
+        # se busca en las legales ya generadas (sin volver a generarlas)
+        return find_legal_move(self.board, self.side, move, self.legal)
+
+    def play(self, mv: Any) -> str:
+        alg = mv.to_algebraic()
+        if is_reversible(self.board, mv):
+            self.reversible.append(self.h)
+            self.king_plies += 1
+        else:
+            # ninguna posición anterior puede volver a darse
+            self.reversible = []
+            self.king_plies = 0
+            self._counts = {}
+        self.h ^= move_delta(self.board, mv, self.side)
+        self.board = apply_move(self.board, mv, self.side)
+        self.side = _other(self.side)
+        self.k = board_to_key(self.board, self.side)
+        self._counts[self.h] = self._counts.get(self.h, 0) + 1
+        self.ply += 1
+        self.moves.append(alg)
+        self.keys.append(self.k)
+        self._legal = None
+        return alg
+
+    def to_dict(self, with_legal: bool = False) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "id": self.id,
+            "k": self.k,
+            "side": self.side,
+            "ai_side": self.ai_side,
+            "ply": self.ply,
+            "last_move": self.moves[-1] if self.moves else None,
+            "winner": self.winner,
+            "draw": self.draw,
+            "king_plies": self.king_plies,
+        }
+        if with_legal:
+            out["legal"] = [mv.to_algebraic() for mv in self.legal]
+        return out
+
+
+class SessionStore:
+    def __init__(
+        self,
+        max_sessions: int = 2000,
+        idle_s: float = 1800.0,
+        on_evict: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_s = float(idle_s)
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, GameSession]" = OrderedDict()
+        self._last_sweep = time.monotonic()
+        self.evicted = 0
+
+    def create(self, board: Board, side: str, ai_side: Optional[str] = None, ponder: bool = False) -> GameSession:
+        sess = GameSession(uuid4().hex[:16], board, side, ai_side, ponder)
+        dropped: List[str] = []
+        with self._lock:
+            self._sessions[sess.id] = sess
+            while len(self._sessions) > self.max_sessions:
+                gid, _ = self._sessions.popitem(last=False)
+                dropped.append(gid)
+            dropped += self._sweep_locked()
+        self._notify(dropped)
+        return sess
+
+    def get(self, game_id: str) -> Optional[GameSession]:
+        with self._lock:
+            dropped = self._sweep_locked()
+            sess = self._sessions.get(game_id)
+            if sess is not None:
+                sess.last_used = time.monotonic()
+                self._sessions.move_to_end(game_id)
+        self._notify(dropped)
+        return sess
+
+    def delete(self, game_id: str) -> bool:
+        with self._lock:
+            sess = self._sessions.pop(game_id, None)
+        if sess is not None and self.on_evict is not None:
+            self.on_evict(game_id)
+        return sess is not None
+
+    def _sweep_locked(self, force: bool = False) -> List[str]:
+        now = time.monotonic()
+        if not force and now - self._last_sweep < min(30.0, self.idle_s):
+            return []
+        self._last_sweep = now
+        # orden LRU: las inactivas están al principio
+        dropped: List[str] = []
+        for gid, sess in list(self._sessions.items()):
+            if now - sess.last_used < self.idle_s:
+                break
+            del self._sessions[gid]
+            dropped.append(gid)
+        return dropped
+
+    def evict_idle(self) -> int:
+        with self._lock:
+            dropped = self._sweep_locked(force=True)
+        self._notify(dropped)
+        return len(dropped)
+
+    def _notify(self, dropped: List[str]) -> None:
+        if not dropped:
+            return
+        self.evicted += len(dropped)
+        if self.on_evict is not None:
+            for gid in dropped:
+                try:
+                    self.on_evict(gid)
+                except Exception:
+                    pass
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "idle_s": self.idle_s,
+                "evicted": self.evicted,
+            }
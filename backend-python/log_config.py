@@ -0,0 +1,159 @@
+# backend-python/log_config.py
+# =========================================================
+# Logging estructurado del backend
+# - Líneas JSON (1 por evento) con request_id
+# - QueueHandler: el hilo de la request solo encola; el formateo
+#   (getMessage + json.dumps) y la escritura van en el hilo listener
+# - Niveles desde el entorno:
+#     DAMAS_LOG_LEVEL=INFO                      (raíz)
+#     DAMAS_LOG_LEVELS=ai_engine=DEBUG,main=INFO (por módulo)
+#     DAMAS_LOG_FORMAT=json|text
+#     DAMAS_DEBUG_AI=1   (atajo: main + ai_engine en DEBUG)
+# - Con DEBUG apagado, log.debug("...%s", x) solo cuesta el
+#   chequeo de nivel (formateo perezoso).
+# =========================================================
+
+from __future__ import annotations
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+REQUEST_ID: ContextVar[str] = ContextVar("request_id", default="-")
+
+_LISTENER: Optional[logging.handlers.QueueListener] = None
+
+# Atributos estándar de LogRecord (lo demás se trata como campo extra)
+_STD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+class _RequestIdFilter(logging.Filter):
+    """Captura el request_id en el hilo que loguea (el listener no ve el ContextVar)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = REQUEST_ID.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        for k, v in record.__dict__.items():
+            if k not in _STD_ATTRS and not k.startswith("_"):
+                out[k] = v
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler.prepare() formatea en el hilo que loguea; aquí solo
+    copiamos el record para que el formateo ocurra en el listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            # el traceback debe resolverse antes de salir del except
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def _parse_levels(spec: str) -> Dict[str, int]:
+    levels: Dict[str, int] = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        name, lvl = part.split("=", 1)
+        lvl_no = logging.getLevelName(lvl.strip().upper())
+        if name.strip() and isinstance(lvl_no, int):
+            levels[name.strip()] = lvl_no
+    return levels
+
+
+def setup_logging() -> None:
+    """Configura el logging raíz una sola vez (idempotente)."""
+    global _LISTENER
+    if _LISTENER is not None:
+        return
+
+    fmt = os.environ.get("DAMAS_LOG_FORMAT", "json").strip().lower()
+    stream = logging.StreamHandler(sys.stdout)
+    if fmt == "text":
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    else:
+        stream.setFormatter(JsonFormatter())
+
+    q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    qh = _LazyQueueHandler(q)
+    qh.addFilter(_RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [qh]
+    root_level = logging.getLevelName(os.environ.get("DAMAS_LOG_LEVEL", "INFO").strip().upper())
+    root.setLevel(root_level if isinstance(root_level, int) else logging.INFO)
+
+    levels = _parse_levels(os.environ.get("DAMAS_LOG_LEVELS", ""))
+    if os.environ.get("DAMAS_DEBUG_AI", "").strip() in ("1", "true", "yes"):
+        levels.setdefault("main", logging.DEBUG)
+        levels.setdefault("ai_engine", logging.DEBUG)
+    for name, lvl in levels.items():
+        logging.getLogger(name).setLevel(lvl)
+
+    _LISTENER = logging.handlers.QueueListener(q, stream, respect_handler_level=False)
+    _LISTENER.start()
+
+
+def shutdown_logging() -> None:
+    global _LISTENER
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
+
+
+# ---------------------------------------------------------
+# Middleware ASGI: request id por request (X-Request-ID)
+# ---------------------------------------------------------
+class RequestIdMiddleware:
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope.get("type") not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        rid = ""
+        for name, value in scope.get("headers") or []:
+            if name == b"x-request-id":
+                rid = value.decode("latin-1")[:64]
+                break
+        rid = rid or uuid4().hex[:16]
+        token = REQUEST_ID.set(rid)
+
+        async def _send(message: Dict[str, Any]) -> None:
+            if message.get("type") == "http.response.start":
+                headers = list(message.get("headers") or [])
+                headers.append((b"x-request-id", rid.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            REQUEST_ID.reset(token)
@@ -0,0 +1,365 @@
+# backend-python/mail_queue.py
+# =========================================================
+# Cola de correo saliente (asíncrona, persistente en disco)
+# - enqueue(): escribe 1 JSON en data/mail_spool/pending y vuelve
+# - Worker en segundo plano:
+#     · reutiliza UNA conexión SMTP autenticada entre mensajes
+#     · envía en lotes (batch_size)
+#     · reintentos con backoff exponencial; tras max_attempts -> dead/
+#     · cada ciclo lee cada archivo del spool UNA vez; los ilegibles
+#       (JSON corrupto) van directo a dead/
+#     · varios workers (uvicorn --workers N) comparten el spool: antes
+#       de enviar, cada uno reclama el archivo con os.rename a inflight/
+#       (atómico: solo uno gana); al arrancar, los de inflight/ más
+#       viejos que inflight_timeout (un worker que murió) vuelven a pending/
+# - Probable contra un servidor SMTP local (aiosmtpd, socket stub...)
+#   usando use_tls=False y sin usuario.
+# =========================================================
+
+from __future__ import annotations
+import json
+import logging
+import os
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+
+log = logging.getLogger(__name__)
+
+
+def _now() -> float:
+    return time.time()
+
+
+def _next_at_of(item: Dict[str, Any]) -> float:
+    try:
+        return float(item.get("next_at") or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _earliest(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    if a is None:
+        return b
+    return a if b is None else min(a, b)
+
+
+class MailQueue:
+    def __init__(
+        self,
+        spool_dir: Path,
+        host: str,
+        port: int,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        sender: str = "",
+        use_tls: bool = True,
+        batch_size: int = 20,
+        max_attempts: int = 6,
+        base_backoff: float = 2.0,
+        max_backoff: float = 600.0,
+        idle_close: float = 30.0,
+        inflight_timeout: float = 600.0,
+        smtp_factory: Callable[..., smtplib.SMTP] = smtplib.SMTP,
+    ) -> None:
+        self.spool_dir = Path(spool_dir)
+        self.pending_dir = self.spool_dir / "pending"
+        self.inflight_dir = self.spool_dir / "inflight"
+        self.dead_dir = self.spool_dir / "dead"
+        self.pending_dir.mkdir(parents=True, exist_ok=True)
+        self.inflight_dir.mkdir(parents=True, exist_ok=True)
+        self.dead_dir.mkdir(parents=True, exist_ok=True)
+
+        self.host = host
+        self.port = int(port)
+        self.user = user
+        self.password = password
+        self.sender = sender
+        self.use_tls = use_tls
+        self.batch_size = max(1, int(batch_size))
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_backoff = float(base_backoff)
+        self.max_backoff = float(max_backoff)
+        self.idle_close = float(idle_close)
+        self.inflight_timeout = float(inflight_timeout)
+        self.smtp_factory = smtp_factory
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._next_at: Optional[float] = None  # próximo reintento (último ciclo)
+
+        self.sent = 0
+        self.failed = 0
+        self.dead = 0
+
+    # -----------------------------------------------------
+    # API de productores (handlers de request)
+    # -----------------------------------------------------
+    def enqueue(self, to_email: str, subject: str, body: str) -> str:
+        msg_id = f"{int(_now() * 1000):013d}-{uuid4().hex[:12]}"
+        item = {
+            "id": msg_id,
+            "to": to_email,
+            "subject": subject,
+            "body": body,
+            "attempts": 0,
+            "next_at": 0.0,
+            "last_error": None,
+        }
+        self._write_item(self.pending_dir / f"{msg_id}.json", item)
+        self._wake.set()
+        return msg_id
+
+    def pending_count(self) -> int:
+        """Pendientes + enviándose (en inflight/ de algún worker)."""
+        return sum(1 for d in (self.pending_dir, self.inflight_dir) for _ in d.glob("*.json"))
+
+    # -----------------------------------------------------
+    # Ciclo de vida del worker
+    # -----------------------------------------------------
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._recover_inflight()
+        self._thread = threading.Thread(target=self._run, name="mail-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._close_smtp()
+
+    def drain(self, timeout: float = 10.0) -> bool:
+        """Espera a que la cola quede vacía (tests / shutdown)."""
+        deadline = _now() + timeout
+        while _now() < deadline:
+            if self.pending_count() == 0:
+                return True
+            self._wake.set()
+            time.sleep(0.05)
+        return False
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                sent_any = self.process_batch()
+            except Exception:
+                log.exception("mail worker error")
+                sent_any = False
+
+            if self._smtp is not None and _now() - self._last_used > self.idle_close:
+                self._close_smtp()
+
+            if not sent_any:
+                self._wake.wait(timeout=self._sleep_hint())
+                self._wake.clear()
+
+    def _sleep_hint(self) -> float:
+        """Hasta el próximo reintento visto en el último ciclo (sin releer el spool)."""
+        next_at = self._next_at
+        if next_at is None:
+            return max(1.0, self.idle_close)
+        return min(max(0.05, next_at - _now()), max(1.0, self.idle_close))
+
+    # -----------------------------------------------------
+    # Envío
+    # -----------------------------------------------------
+    def _scan(self) -> Tuple[List[Tuple[Path, Dict[str, Any]]], Optional[float]]:
+        """Una pasada por pending/: (listos en orden, next_at mínimo del resto)."""
+        now = _now()
+        due: List[Tuple[Path, Dict[str, Any]]] = []
+        next_at: Optional[float] = None
+        for p in sorted(self.pending_dir.glob("*.json")):
+            try:
+                item = self._read_item(p)
+            except FileNotFoundError:
+                continue
+            if item is None:
+                self._bury_unreadable(p)
+                continue
+            t = _next_at_of(item)
+            if t <= now:
+                due.append((p, item))
+            else:
+                next_at = _earliest(next_at, t)
+        return due, next_at
+
+    def process_batch(self) -> bool:
+        """Envía hasta batch_size mensajes listos. Devuelve True si envió alguno."""
+        due, next_at = self._scan()
+        if len(due) > self.batch_size:
+            next_at = _now()  # quedan listos para el siguiente lote
+        batch = due[: self.batch_size]
+
+        sent_any = False
+        for p, _ in batch:
+            claimed = self._claim(p)
+            if claimed is None:
+                continue  # otro worker lo tomó
+            # releído tras reclamarlo: otro worker pudo reprogramarlo entre medias
+            try:
+                item = self._read_item(claimed)
+            except FileNotFoundError:
+                continue
+            if item is None:
+                self._bury_unreadable(claimed)
+                continue
+            t = _next_at_of(item)
+            if t > _now():
+                self._release(claimed)
+                next_at = _earliest(next_at, t)
+                continue
+            try:
+                self._send(item)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                # rechazo de ESTE mensaje: la conexión sigue sirviendo
+                next_at = _earliest(next_at, self._retry_later(claimed, item, e))
+                continue
+            except Exception as e:
+                # conexión posiblemente rota: se recrea en el siguiente intento
+                self._close_smtp()
+                next_at = _earliest(next_at, self._retry_later(claimed, item, e))
+                continue
+            try:
+                claimed.unlink()
+            except FileNotFoundError:
+                pass
+            self.sent += 1
+            sent_any = True
+        self._next_at = next_at
+        return sent_any
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            # usada hace poco: confiamos en ella sin NOOP extra
+            if _now() - self._last_used < 5.0:
+                return self._smtp
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except Exception:
+                pass
+            self._close_smtp()
+
+        server = self.smtp_factory(self.host, self.port, timeout=30)
+        if self.use_tls:
+            server.starttls()
+        if self.user:
+            server.login(self.user, self.password or "")
+        self._smtp = server
+        self._last_used = _now()
+        return server
+
+    def _send(self, item: Dict[str, Any]) -> None:
+        msg = MIMEText(str(item.get("body") or ""), "plain", "utf-8")
+        msg["Subject"] = str(item.get("subject") or "")
+        msg["From"] = self.sender
+        msg["To"] = str(item.get("to") or "")
+        self._connection().send_message(msg)
+        self._last_used = _now()
+
+    def _claim(self, path: Path) -> Optional[Path]:
+        """pending/ -> inflight/ (atómico entre procesos); None si otro lo tomó."""
+        target = self.inflight_dir / path.name
+        try:
+            os.rename(path, target)
+        except FileNotFoundError:
+            return None
+        # mtime = momento del reclamo (para detectar reclamos huérfanos)
+        os.utime(target)
+        return target
+
+    def _release(self, path: Path) -> None:
+        """inflight/ -> pending/ (se reintenta más tarde)."""
+        os.replace(path, self.pending_dir / path.name)
+
+    def _recover_inflight(self) -> int:
+        """Devuelve a pending/ los reclamos huérfanos (worker caído a mitad de envío)."""
+        limit = _now() - self.inflight_timeout
+        n = 0
+        for p in self.inflight_dir.glob("*.json"):
+            try:
+                if p.stat().st_mtime > limit:
+                    continue
+                self._release(p)
+            except FileNotFoundError:
+                continue
+            n += 1
+        if n:
+            log.warning("mail: %d mensajes huérfanos en inflight/ vuelven a pending/", n)
+        return n
+
+    def _retry_later(self, path: Path, item: Dict[str, Any], err: Exception) -> Optional[float]:
+        """Reprograma con backoff (`path` en inflight/); devuelve el nuevo next_at (None si va a dead/)."""
+        attempts = int(item.get("attempts") or 0) + 1
+        item["attempts"] = attempts
+        item["last_error"] = repr(err)[:300]
+        self.failed += 1
+
+        if attempts >= self.max_attempts:
+            self._write_item(self.dead_dir / path.name, item)
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            self.dead += 1
+            log.warning("mail descartado tras %d intentos to=%s error=%s", attempts, item.get("to"), item["last_error"])
+            return None
+
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (attempts - 1)))
+        item["next_at"] = _now() + delay
+        self._write_item(path, item)
+        self._release(path)
+        return item["next_at"]
+
+    def _bury_unreadable(self, path: Path) -> None:
+        """JSON corrupto: nunca se podrá enviar, a dead/ tal cual."""
+        try:
+            os.replace(path, self.dead_dir / path.name)
+        except FileNotFoundError:
+            return
+        self.dead += 1
+        log.warning("mail ilegible movido a dead/: %s", path.name)
+
+    def _close_smtp(self) -> None:
+        server, self._smtp = self._smtp, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    # -----------------------------------------------------
+    # Spool en disco (escritura atómica)
+    # -----------------------------------------------------
+    @staticmethod
+    def _write_item(path: Path, item: Dict[str, Any]) -> None:
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(item, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _read_item(path: Path) -> Optional[Dict[str, Any]]:
+        """El item, o None si no es un JSON válido (FileNotFoundError se propaga)."""
+        try:
+            obj = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise
+        except Exception:
+            return None
+        return obj if isinstance(obj, dict) else None
@@ -1,38 +1,142 @@
 # main.py
-from fastapi import FastAPI, HTTPException, Body
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Body, Query
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr, validator, root_validator
-from typing import Optional, List, Any, Dict
+from typing import Optional, List, Any, Dict, Tuple
 from uuid import uuid4
 from pathlib import Path
 import json
 import time
 import os
 import inspect
-import traceback
-
-import smtplib
-from email.mime.text import MIMEText
+import logging
 
 # Motor IA (minimax + experiencia)
 from ai_engine import (
     choose_best_move,
     board_to_key,
+    engine_version,
+    find_legal_move,
+    apply_move,
+    RULESET_VERSION,
+    SHARED_TT,
+    SearchAborted,
     get_learned_move_by_key,
+    multipv,
+    SearchStats,
+    SearchStatsAggregate,
 )
 
+from log_config import RequestIdMiddleware, setup_logging, shutdown_logging
 from routes.patterns import router as patterns_router
+from routes.games import STORE as GAMES_STORE, router as games_router
+from routes.ws_ai import router as ws_ai_router
+from user_store import UserStore
+from analysis_cache import cache_from_env
+from experience_log import experience_log_from_env
+from board_codec import normalize_side, parse_board, parse_position, position_key
+from ponder import ponderer_from_env
+from position_key import key_hash, position_hash
+from mail_queue import MailQueue
+from metrics import (
+    ANALYSIS_CACHE as ANALYSIS_CACHE_METRIC,
+    METRICS,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    JSONL_BYTES,
+    JSONL_ROWS,
+    MetricsMiddleware,
+    observe_search,
+)
 
 # =========================
-# CONFIG DEBUG
+# LOGGING (nivel por entorno: ver log_config.py)
 # =========================
-DEBUG_AI = True  # pon False cuando ya funcione
+setup_logging()
+log = logging.getLogger("main")
+
+
+# Acumulado de estadísticas de búsqueda de /ai/move (ver /ai/search-stats)
+SEARCH_STATS = SearchStatsAggregate()
+
+_SEARCH_CUTOFFS = METRICS.gauge("ai_search_cutoffs_by_index", "Cortes beta acumulados por índice de jugada", ("index",))
+_SEARCH_TIME = METRICS.gauge("ai_search_phase_seconds", "Tiempo acumulado por fase de búsqueda", ("phase",))
+
+
+def _collect_search_totals() -> None:
+    snap = SEARCH_STATS.snapshot()
+    for i, n in enumerate(snap["cutoffs_by_index"]):
+        _SEARCH_CUTOFFS.set(n, index=str(i) if i < len(snap["cutoffs_by_index"]) - 1 else f"{i}+")
+    _SEARCH_TIME.set(snap["movegen_ms"] / 1000.0, phase="movegen")
+    _SEARCH_TIME.set(snap["eval_ms"] / 1000.0, phase="eval")
+
+
+METRICS.add_collector(_collect_search_totals)
+
+
+# Caché de análisis delante de choose_best_move (ver analysis_cache.py);
+# con DAMAS_SHARED_CACHE=1 usa además una L2 mmap compartida entre workers
+ANALYSIS_CACHE = cache_from_env(Path(__file__).resolve().parent / "data")
+
+# parámetros fijos de la búsqueda de /ai/move (forman parte de la clave de caché)
+AI_MOVE_DEPTH = 4
+AI_MOVE_LEARNED_LINES = 6000
+
+# /ai/analyze (multi-PV): profundidad por defecto = la de /ai/move
+AI_ANALYZE_MAX_DEPTH = int(os.environ.get("DAMAS_ANALYZE_MAX_DEPTH", "") or 6)
+AI_ANALYZE_MAX_PV = 10
+
+_CACHE_ENTRIES = METRICS.gauge("ai_analysis_cache_entries", "Entradas en la caché de análisis", ())
+_CACHE_BYTES = METRICS.gauge("ai_analysis_cache_bytes", "Bytes estimados de la caché de análisis", ())
+
+
+def _collect_cache_totals() -> None:
+    st = ANALYSIS_CACHE.stats()
+    _CACHE_ENTRIES.set(st["entries"])
+    _CACHE_BYTES.set(st["bytes"])
+
+
+METRICS.add_collector(_collect_cache_totals)
+
+
+def _ai_move_cache_params() -> tuple:
+    return ("move", AI_MOVE_DEPTH, AI_MOVE_LEARNED_LINES, engine_version())
 
 
-def dprint(*args):
-    if DEBUG_AI:
-        print(*args)
+def _ponder_search(board: List[List[Any]], side: str, stop: Any) -> bool:
+    """Lo mismo que haría /ai/move para esa posición, directo a la caché."""
+    k = board_to_key(board, side)
+    params = _ai_move_cache_params()
+    if ANALYSIS_CACHE.contains(k, params):
+        return False
+    stats = SearchStats()
+    move_str = choose_best_move(
+        board,
+        side,
+        depth=AI_MOVE_DEPTH,
+        fen=None,
+        use_learned=True,
+        learned_max_lines=AI_MOVE_LEARNED_LINES,
+        stats=stats,
+        stop=stop,
+    )
+    if not move_str:
+        return True
+    # cancelada (plazo / wait_for) o sin llegar a AI_MOVE_DEPTH: la PVS
+    # devuelve la última iteración completa; no se cachea bajo la clave
+    # de profundidad completa (como en ai_reply)
+    if stop is not None and stop.is_set():
+        return True
+    if stats.source == "minimax" and stats.depth < AI_MOVE_DEPTH:
+        return True
+    search = stats.to_dict()
+    search["pondered"] = True
+    ANALYSIS_CACHE.put(k, params, {"move": move_str.strip(), "search": search})
+    return True
+
+
+# Pondering opt-in por partida (ver ponder.py)
+PONDER = ponderer_from_env(_ponder_search)
 
 
 app = FastAPI(
@@ -48,22 +152,34 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
 app.include_router(patterns_router)
+app.include_router(games_router)
+app.include_router(ws_ai_router)
 
 
 # -------------------------------------------------------------------
 # "Base de datos" simple: archivo JSON
 # -------------------------------------------------------------------
-USERS_FILE = Path("users.json")
-
 # -------------------------------------------------------------------
 # ✅ Ruta ABSOLUTA donde guardaremos los logs de jugadas de IA
 # -------------------------------------------------------------------
 BASE_DIR = Path(__file__).resolve().parent
+# relativo al backend, no al cwd desde el que se lanza uvicorn
+USERS_FILE = BASE_DIR / "users.json"
 DATA_DIR = BASE_DIR / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 AI_MOVES_LOG = DATA_DIR / "ai_moves.jsonl"
+# segmentado + compactación en segundo plano (ver experience_log.py)
+EXPERIENCE_LOG = experience_log_from_env(AI_MOVES_LOG)
+
+# -------------------------------------------------------------------
+# ✅ Usuarios: SQLite indexado (migra users.json la primera vez)
+# -------------------------------------------------------------------
+USERS_DB = DATA_DIR / "users.sqlite3"
+USER_STORE = UserStore(USERS_DB, legacy_json=USERS_FILE)
 
 # -------------------------------------------------------------------
 # ✅ TEACH: overrides persistentes (enseñar a la IA)
@@ -94,16 +210,34 @@ def _atomic_save_json(path: Path, obj: Any) -> None:
         # fallback best-effort
         path.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
 
-# Estructura:
-# OVERRIDES_BY_K = { "<k>": { "move": "c3-d4", "ts": 123, "count": 2, "note": "" } }
-OVERRIDES_BY_K: Dict[str, Dict[str, Any]] = _load_json_file(AI_TEACH_OVERRIDES, default={})
+# Estructura en disco:
+#   { "<k>": { "move": "c3-d4", "ts": 123, "count": 2, "note": "" } }
+# En memoria, por hash de la posición (position_key.py); la k va en la
+# entrada solo para guardar el archivo y para debug:
+#   OVERRIDES_BY_K = { <hash>: { "k": "<k>", "move": "c3-d4", ... } }
+def _index_overrides(raw: Any) -> Dict[int, Dict[str, Any]]:
+    out: Dict[int, Dict[str, Any]] = {}
+    if isinstance(raw, dict):
+        for k, entry in raw.items():
+            h = key_hash(k)
+            if h is not None and isinstance(entry, dict):
+                out[h] = {**entry, "k": k}
+    return out
+
+def _overrides_file_obj() -> Dict[str, Dict[str, Any]]:
+    return {e["k"]: {f: v for f, v in e.items() if f != "k"} for e in OVERRIDES_BY_K.values()}
+
+OVERRIDES_BY_K: Dict[int, Dict[str, Any]] = _index_overrides(_load_json_file(AI_TEACH_OVERRIDES, default={}))
 
 def _teach_log_append(row: Dict[str, Any]) -> None:
     try:
         row["ts"] = int(row.get("ts") or time.time() * 1000)
         AI_TEACH_LOG.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(row, ensure_ascii=False) + "\n"
         with AI_TEACH_LOG.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            f.write(line)
+        JSONL_ROWS.inc(file=AI_TEACH_LOG.name)
+        JSONL_BYTES.inc(len(line.encode("utf-8")), file=AI_TEACH_LOG.name)
     except Exception:
         pass
 
@@ -119,15 +253,54 @@ SENDER_NAME = "Reino de las Damas"
 SENDER_EMAIL = SMTP_USER
 
 
-def send_email(to_email: str, subject: str, body: str) -> None:
-    msg = MIMEText(body, "plain", "utf-8")
-    msg["Subject"] = subject
-    msg["From"] = f"{SENDER_NAME} <{SENDER_EMAIL}>"
-    msg["To"] = to_email
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASSWORD)
-        server.send_message(msg)
+SMTP_USE_TLS = True
+
+# Los handlers solo encolan; el envío real lo hace el worker (1 conexión reutilizada)
+MAIL_QUEUE = MailQueue(
+    DATA_DIR / "mail_spool",
+    host=SMTP_HOST,
+    port=SMTP_PORT,
+    user=SMTP_USER,
+    password=SMTP_PASSWORD,
+    sender=f"{SENDER_NAME} <{SENDER_EMAIL}>",
+    use_tls=SMTP_USE_TLS,
+)
+
+
+def send_email(to_email: str, subject: str, body: str) -> str:
+    """Encola el correo y devuelve su id (no bloquea la request)."""
+    return MAIL_QUEUE.enqueue(to_email, subject, body)
+
+
+@app.on_event("startup")
+def _start_ponder() -> None:
+    PONDER.start()
+
+
+@app.on_event("shutdown")
+def _stop_ponder() -> None:
+    PONDER.stop()
+
+
+@app.on_event("startup")
+def _start_experience_compactor() -> None:
+    EXPERIENCE_LOG.start()
+
+
+@app.on_event("shutdown")
+def _stop_experience_compactor() -> None:
+    EXPERIENCE_LOG.stop()
+
+
+@app.on_event("startup")
+def _start_mail_dispatcher() -> None:
+    MAIL_QUEUE.start()
+
+
+@app.on_event("shutdown")
+def _stop_mail_dispatcher() -> None:
+    MAIL_QUEUE.stop()
+    shutdown_logging()
 
 
 # -------------------------------------------------------------------
@@ -183,6 +356,12 @@ class UserInDB(UserBase):
     password_hash: str
 
 
+class UserLogin(BaseModel):
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    password: str
+
+
 # -------------------------------------------------------------------
 # Modelos para IA
 # -------------------------------------------------------------------
@@ -193,11 +372,16 @@ class AIMoveRequest(BaseModel):
     Compatible:
     - {fen: ..., side: "R"/"N"}     (legacy)
     - {board: ..., side_to_move: "R"/"N"}
+
+    Opcional: game_id (agrupa las requests de una partida) y
+    ponder=true (buscar en el tiempo del rival tras responder).
     """
     fen: Optional[Any] = None
     board: Optional[Any] = None
     side: Optional[str] = None
     side_to_move: Optional[str] = None
+    game_id: Optional[str] = None
+    ponder: bool = False
 
     @root_validator(pre=True)
     def _normalize(cls, values):
@@ -208,6 +392,9 @@ class AIMoveRequest(BaseModel):
         if "fen" not in values and "board" in values:
             values["fen"] = values.get("board")
 
+        if "game_id" not in values and "gameId" in values:
+            values["game_id"] = values.get("gameId")
+
         # side alias
         if "side" not in values:
             for k in ("side_to_move", "sideToMove", "turn", "color", "lado"):
@@ -217,6 +404,11 @@ class AIMoveRequest(BaseModel):
         return values
 
 
+class AIAnalyzeRequest(AIMoveRequest):
+    """Como AIMoveRequest + depth opcional (tope DAMAS_ANALYZE_MAX_DEPTH)."""
+    depth: Optional[int] = None
+
+
 class AIMoveResponse(BaseModel):
     ok: bool = True
     move: str
@@ -294,18 +486,27 @@ def fake_hash_password(password: str) -> str:
 
 
 def load_users() -> List[UserInDB]:
-    if not USERS_FILE.exists():
-        return []
-    text = USERS_FILE.read_text(encoding="utf-8").strip()
-    if not text:
-        return []
-    data = json.loads(text)
-    return [UserInDB(**item) for item in data]
+    return [UserInDB(**row) for row in USER_STORE.list_all()]
 
 
 def save_users(users: List[UserInDB]) -> None:
-    data = [u.dict() for u in users]
-    USERS_FILE.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    USER_STORE.replace_all(u.dict() for u in users)
+
+
+def find_user(
+    user_id: Optional[str] = None,
+    email: Optional[str] = None,
+    phone: Optional[str] = None,
+) -> Optional[UserInDB]:
+    """Lookup indexado (id > email > teléfono) sin cargar todos los usuarios."""
+    row = None
+    if user_id:
+        row = USER_STORE.get_by_id(user_id)
+    if row is None and email:
+        row = USER_STORE.get_by_email(email)
+    if row is None and phone:
+        row = USER_STORE.get_by_phone(phone)
+    return UserInDB(**row) if row else None
 
 
 def user_to_public(u: UserInDB) -> UserPublic:
@@ -328,6 +529,39 @@ def health():
     return {"status": "ok", "message": "Backend Damas10x10 funcionando"}
 
 
+# -------------------------------------------------------------------
+# Usuarios: registro / login (lookups indexados)
+# -------------------------------------------------------------------
+@app.post("/register", response_model=UserPublic)
+def register(user: UserCreate):
+    new_user = UserInDB(
+        id=str(uuid4()),
+        password_hash=fake_hash_password(user.password),
+        **user.dict(exclude={"password"}),
+    )
+    if not USER_STORE.insert_unique(new_user.dict()):
+        raise HTTPException(status_code=400, detail="Ya existe un usuario con ese email o teléfono")
+    return user_to_public(new_user)
+
+
+@app.post("/login", response_model=UserPublic)
+def login(req: UserLogin):
+    email = (req.email or "").strip() or None
+    phone = (req.phone or "").strip() or None
+    if not email and not phone:
+        raise HTTPException(status_code=400, detail="Debes ingresar email o teléfono")
+
+    u = find_user(email=email, phone=phone)
+    if u is None or u.password_hash != fake_hash_password(req.password):
+        raise HTTPException(status_code=401, detail="Credenciales incorrectas")
+    return user_to_public(u)
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return Response(content=METRICS.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/ai")
 def ai_root():
     return {"ok": True, "hint": "Use POST /ai/move, POST /ai/train, POST /ai/log-moves, POST /ai/teach"}
@@ -357,79 +591,14 @@ def _safe_stat_size(p: Path) -> int:
         return 0
 
 
-def _append_jsonl_line(path: Path, row: Dict[str, Any]) -> None:
-    """
-    ✅ Append seguro a JSONL:
-    - crea data/ si no existe
-    - escribe 1 línea JSON (UTF-8)
-    """
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(row, ensure_ascii=False) + "\n")
-
-
 # -------------------------------------------------------------------
-# ✅ LIMPIEZA/Canonización 10×10 (CRÍTICO)
+# ✅ LIMPIEZA/Canonización 10×10: ver board_codec.py (parse_position)
 # -------------------------------------------------------------------
-_ALLOWED = {"r", "n", "R", "N"}
-
-
-def _try_json_load_if_str(x: Any) -> Any:
-    if isinstance(x, str):
-        s = x.strip()
-        if s.startswith("[") and s.endswith("]"):
-            try:
-                return json.loads(s)
-            except Exception:
-                return None
-    return x
-
-
-def _clean_cell(cell: Any) -> Any:
-    if cell is None:
-        return None
-    if isinstance(cell, dict):
-        return None
-    if isinstance(cell, (list, tuple)):
-        return None
-    if isinstance(cell, str):
-        s = cell.strip()
-        if s in _ALLOWED:
-            return s
-        if s.lower() in ("null", "none", ""):
-            return None
-        return None
-    return None
-
-
-def _normalize_board_10x10(x: Any) -> Optional[List[List[Any]]]:
-    x = _try_json_load_if_str(x)
-    if not isinstance(x, list) or len(x) != 10:
-        return None
-    out: List[List[Any]] = []
-    for r in range(10):
-        row = x[r]
-        if not isinstance(row, list) or len(row) != 10:
-            return None
-        out_row = [_clean_cell(row[c]) for c in range(10)]
-        out.append(out_row)
-    return out
-
-
 def _canon_board_key_json(board_10: List[List[Any]]) -> str:
     # Legacy: JSON compactado del board (lo mantenemos para compat)
     return json.dumps(board_10, ensure_ascii=False, separators=(",", ":"))
 
 
-def _normalize_side(side_raw: Any) -> str:
-    s = str(side_raw or "R").strip().upper()
-    if s in ("ROJO", "R", "WHITE", "W", "BLANCO", "BLANCAS"):
-        return "R"
-    if s in ("NEGRO", "N", "BLACK", "B", "NEGRAS"):
-        return "N"
-    return "R" if s.startswith("R") else "N"
-
-
 # -------------------------------------------------------------------
 # Stats de log
 # -------------------------------------------------------------------
@@ -444,20 +613,39 @@ def ai_log_stats():
             "file": str(AI_MOVES_LOG),
             "abs": str(abs_path),
             "exists": exists,
-            "bytes": size
+            "bytes": size,
+            "segments": EXPERIENCE_LOG.stats(),
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"log-stats error: {repr(e)}")
 
 
+# -------------------------------------------------------------------
+# Estadísticas agregadas de búsqueda (/ai/move)
+# -------------------------------------------------------------------
+@app.get("/ai/search-stats")
+def ai_search_stats(reset: bool = False):
+    snap = SEARCH_STATS.snapshot()
+    if reset:
+        SEARCH_STATS.reset()
+    return {
+        "ok": True,
+        "stats": snap,
+        "cache": ANALYSIS_CACHE.stats(),
+        "tt": SHARED_TT.stats() if SHARED_TT is not None else None,
+        "ponder": PONDER.stats(),
+        "games": GAMES_STORE.stats(),
+    }
+
+
 # -------------------------------------------------------------------
 # ✅ DEBUG: KEY CANÓNICA + lookup directo
 # -------------------------------------------------------------------
 @app.post("/ai/debug-key")
 def ai_debug_key(req: AIDebugKeyRequest) -> Any:
-    side = _normalize_side(req.side)
+    side = normalize_side(req.side)
 
-    board_10 = _normalize_board_10x10(req.board)
+    board_10 = parse_board(req.board)
     if board_10 is None:
         return JSONResponse(
             status_code=200,
@@ -478,7 +666,7 @@ def ai_debug_key(req: AIDebugKeyRequest) -> Any:
     except Exception:
         learned = None
 
-    teach = OVERRIDES_BY_K.get(k)
+    teach = OVERRIDES_BY_K.get(position_hash(board_10, side))
 
     return {
         "ok": True,
@@ -494,10 +682,10 @@ def ai_debug_key(req: AIDebugKeyRequest) -> Any:
 # -------------------------------------------------------------------
 @app.post("/ai/teach", response_model=AITeachResponse)
 def ai_teach(req: AITeachRequest):
-    side = _normalize_side(req.side or req.side_to_move or "R")
+    side = normalize_side(req.side or req.side_to_move or "R")
 
     board_raw = req.board if req.board is not None else req.fen
-    board_10 = _normalize_board_10x10(board_raw)
+    board_10 = parse_board(board_raw)
     if board_10 is None:
         return JSONResponse(
             status_code=200,
@@ -509,7 +697,7 @@ def ai_teach(req: AITeachRequest):
                 "side": side,
                 "count": 0,
                 "reason": "invalid_board",
-                "detail": "Board inválido: se esperaba lista 10x10 (o string JSON de lista 10x10).",
+                "detail": "Board inválido: se esperaba lista 10x10, string JSON de esa lista o string compacto (key de 100 casillas o 50 casillas oscuras).",
             },
         )
 
@@ -545,17 +733,20 @@ def ai_teach(req: AITeachRequest):
             },
         )
 
-    prev = OVERRIDES_BY_K.get(k) if isinstance(OVERRIDES_BY_K, dict) else None
+    h = position_hash(board_10, side)
+    prev = OVERRIDES_BY_K.get(h)
     prev_count = int(prev.get("count", 0)) if isinstance(prev, dict) else 0
     count = prev_count + 1
 
-    OVERRIDES_BY_K[k] = {
+    OVERRIDES_BY_K[h] = {
+        "k": k,
         "move": move,
         "ts": int(req.ts or time.time() * 1000),
         "count": count,
         "note": (req.note or "").strip()[:240],
     }
-    _atomic_save_json(AI_TEACH_OVERRIDES, OVERRIDES_BY_K)
+    _atomic_save_json(AI_TEACH_OVERRIDES, _overrides_file_obj())
+    ANALYSIS_CACHE.invalidate(k)
 
     _teach_log_append({
         "t": "teach",
@@ -567,7 +758,7 @@ def ai_teach(req: AITeachRequest):
         "ts": req.ts,
     })
 
-    dprint(f"[AI.TEACH] stored override k(len={len(k)}) side={side} move={move} count={count}")
+    log.info("teach override stored side=%s move=%s count=%d k_len=%d", side, move, count, len(k))
 
     return AITeachResponse(
         ok=True,
@@ -582,7 +773,16 @@ def ai_teach(req: AITeachRequest):
 
 # -------------------------------------------------------------------
 # Guardar logs (guardamos 'k' REAL + legacy)
+# Cada fila se valida una sola vez aquí, al entrar:
+#   - la jugada debe ser legal en (board, side) -> si no, skipped
+#   - se guarda normalizada (ruta completa de find_legal_move: "c3-e5-g7")
+#   - (k, jugada) repetida dentro del mismo lote se guarda una vez
+#   - tag "rules" = RULESET_VERSION (la lectura confía en estas filas)
+#   - "__GAME_RESULT__" (resultado de partida del frontend) no es una
+#     jugada: se guarda con su score, sin validar ni deduplicar
 # -------------------------------------------------------------------
+GAME_RESULT = "__GAME_RESULT__"
+
 def _append_moves_to_jsonl(entries_raw: List[Any]) -> Dict[str, Any]:
     if not entries_raw:
         return {
@@ -597,6 +797,11 @@ def _append_moves_to_jsonl(entries_raw: List[Any]) -> Dict[str, Any]:
 
     saved = 0
     skipped = 0
+    illegal = 0
+    duplicates = 0
+    seen: set = set()      # (hash de la posición, código de jugada) del lote
+    touched: set = set()   # keys cuyo análisis cacheado hay que invalidar
+    rows: List[Dict[str, Any]] = []
 
     for item in entries_raw:
         if not isinstance(item, dict):
@@ -607,10 +812,11 @@ def _append_moves_to_jsonl(entries_raw: List[Any]) -> Dict[str, Any]:
         if board_raw is None:
             board_raw = item.get("fen", None)
 
-        board_10 = _normalize_board_10x10(board_raw)
-        if board_10 is None:
+        pos = parse_position(board_raw)
+        if pos is None:
             skipped += 1
             continue
+        board_10, body = pos
 
         move = item.get("move", None)
         if move is None or (isinstance(move, str) and not move.strip()):
@@ -619,7 +825,7 @@ def _append_moves_to_jsonl(entries_raw: List[Any]) -> Dict[str, Any]:
 
         ts = item.get("ts", None)
         score = item.get("score", 0)
-        side = _normalize_side(item.get("side", None))
+        side = normalize_side(item.get("side", None))
 
         try:
             ts = int(ts) if ts is not None else int(time.time() * 1000)
@@ -631,26 +837,67 @@ def _append_moves_to_jsonl(entries_raw: List[Any]) -> Dict[str, Any]:
         except Exception:
             score = 0.0
 
-        k = board_to_key(board_10, side)
+        k = position_key(body, side)
         legacy_json = _canon_board_key_json(board_10)
 
+        if move == GAME_RESULT:
+            # resultado de partida: no es una jugada, pasa tal cual con su score
+            rows.append({
+                "ts": ts,
+                "k": k,
+                "move": GAME_RESULT,
+                "score": score,
+                "side": side,
+                "rules": RULESET_VERSION,
+                "fen": legacy_json,  # compat
+                "key": legacy_json,  # compat
+            })
+            saved += 1
+            continue
+
+        mv = find_legal_move(board_10, side, str(move))
+        if mv is None:
+            illegal += 1
+            skipped += 1
+            continue
+        slot = (position_hash(board_10, side), mv.code)
+        if slot in seen:
+            duplicates += 1
+            skipped += 1
+            continue
+        seen.add(slot)
+
         row = {
             "ts": ts,
             "k": k,  # ✅ CLAVE OFICIAL PARA MATCH
-            "move": str(move).strip(),
+            "move": mv.to_algebraic(),
             "score": score,
             "side": side,
+            "rules": RULESET_VERSION,
             "fen": legacy_json,  # compat
             "key": legacy_json,  # compat
         }
 
-        _append_jsonl_line(AI_MOVES_LOG, row)
+        rows.append(row)
+        touched.add(k)
         saved += 1
 
+    # un solo write() por lote al segmento activo (puede sellarlo)
+    written = EXPERIENCE_LOG.append_rows(rows)
+    if written:
+        JSONL_ROWS.inc(len(rows), file=AI_MOVES_LOG.name)
+        JSONL_BYTES.inc(written, file=AI_MOVES_LOG.name)
+
+    # la experiencia de estas posiciones cambió: su análisis cacheado ya no vale
+    for k in touched:
+        ANALYSIS_CACHE.invalidate(k)
+
     return {
         "status": "ok",
         "saved": saved,
         "skipped": skipped,
+        "illegal": illegal,
+        "duplicates": duplicates,
         "bytes": _safe_stat_size(AI_MOVES_LOG),
         "file": str(AI_MOVES_LOG),
         "abs": str(AI_MOVES_LOG.resolve()),
@@ -666,8 +913,7 @@ def ai_log_moves(payload: Any = Body(...)):
         entries_raw = _normalize_log_payload(payload)
         return _append_moves_to_jsonl(entries_raw)
     except Exception as e:
-        print("[AI-LOG] Error guardando logs:", repr(e))
-        print(traceback.format_exc())
+        log.exception("/ai/log-moves: error guardando logs")
         return JSONResponse(
             status_code=500,
             content={"ok": False, "where": "/ai/log-moves", "error": repr(e)},
@@ -684,8 +930,7 @@ def ai_train(batch: Any = Body(...)):
         moves_raw = _normalize_log_payload(batch)
         return _append_moves_to_jsonl(moves_raw)
     except Exception as e:
-        print("[AI-TRAIN] Error:", repr(e))
-        print(traceback.format_exc())
+        log.exception("/ai/train: error guardando logs")
         return JSONResponse(
             status_code=500,
             content={"ok": False, "where": "/ai/train", "error": repr(e)},
@@ -693,79 +938,167 @@ def ai_train(batch: Any = Body(...)):
 
 
 # -------------------------------------------------------------------
-# /ai/move — ✅ ahora usa:
-# 1) TEACH override inmediato
-# 2) choose_best_move con experiencia completa
+# Pondering: tras responder, buscar las respuestas probables del rival
 # -------------------------------------------------------------------
-@app.post("/ai/move", response_model=AIMoveResponse)
-def ai_move(req: AIMoveRequest):
-    side = _normalize_side(req.side or req.side_to_move or "R")
-    dprint(f"[AI.DEBUG] /ai/move side_norm={side!r}")
-
-    board_raw = req.board if req.board is not None else req.fen
-    dprint(f"[AI.DEBUG] /ai/move board_raw type={type(board_raw).__name__}")
+def _maybe_ponder(game_id: Optional[str], ponder: bool, board_10: List[List[Any]], side: str, move_str: str) -> None:
+    if not (ponder and game_id):
+        return
+    try:
+        mv = find_legal_move(board_10, side, move_str)
+        if mv is None:
+            return
+        after = apply_move(board_10, mv, side)
+        PONDER.submit(game_id, after, "N" if side == "R" else "R")
+    except Exception as e:
+        log.warning("ponder submit error: %r", e)
 
-    board_10 = _normalize_board_10x10(board_raw)
-    if board_10 is None:
-        dprint("[AI.DEBUG] invalid_board: board inválido o no 10x10. head:", str(board_raw)[:180])
-        return JSONResponse(
-            status_code=200,
-            content={
-                "ok": False,
-                "move": "",
-                "reason": "invalid_board",
-                "detail": "Board inválido: se esperaba lista 10x10 (o string JSON de lista 10x10).",
-            },
-        )
 
+# -------------------------------------------------------------------
+# Respuesta de la IA (compartida por /ai/move y /games):
+# 1) TEACH override inmediato
+# 2) caché de análisis (LRU + TTL)
+# 3) choose_best_move con experiencia completa
+# Devuelve (jugada | None, reason, meta)
+# searcher/stop: búsqueda alternativa (streaming) y cancelación, ver
+# choose_best_move y routes/ws_ai.py
+# -------------------------------------------------------------------
+def ai_reply(
+    board_10: List[List[Any]],
+    side: str,
+    k: Optional[str] = None,
+    game_id: Optional[str] = None,
+    ponder: bool = False,
+    searcher: Any = None,
+    stop: Any = None,
+    history: Optional[List[int]] = None,
+    king_plies: int = 0,
+) -> Tuple[Optional[str], str, Dict[str, Any]]:
     # key canónica (solo meta/debug)
-    k = board_to_key(board_10, side)
-    dprint("[AI.DEBUG] key(k) len=", len(k))
-
-    # ✅ DEBUG EXTREMO: imprimir key completa y base_key
+    k = k or board_to_key(board_10, side)
     try:
         base_k = k.split("|side:")[0] if "|side:" in k else k
     except Exception:
         base_k = k
 
-    dprint("[AI.DEBUG] k FULL =", k)
-    dprint("[AI.DEBUG] base_k =", base_k)
+    log.debug("ai_reply side=%s k=%s", side, k)
+
+    # si el ponder de esta partida está buscando justo esta posición, esperarlo
+    if game_id:
+        PONDER.wait_for(game_id, k)
 
     # ---------------------------------------------------------
     # ✅ 1) TEACH OVERRIDE (prioridad máxima)
     # ---------------------------------------------------------
     try:
-        override = OVERRIDES_BY_K.get(k) if isinstance(OVERRIDES_BY_K, dict) else None
+        override = OVERRIDES_BY_K.get(position_hash(board_10, side))
         if isinstance(override, dict):
             om = str(override.get("move", "")).strip()
             if om:
-                dprint(f"[AI.TEACH] override HIT -> {om}")
-                return AIMoveResponse(
-                    ok=True,
-                    move=om,
-                    reason="teach_override",
-                    meta={"side": side, "k": k, "base_k": base_k, "source": "teach_override"},
-                )
+                log.debug("teach override hit move=%s", om)
+                st = SearchStats()
+                st.source = "teach_override"
+                SEARCH_STATS.add(st)
+                observe_search(st)
+                _maybe_ponder(game_id, ponder, board_10, side, om)
+                return om, "teach_override", {"side": side, "k": k, "base_k": base_k, "source": "teach_override"}
     except Exception as e:
-        dprint("[AI.TEACH] override check error:", repr(e))
+        log.warning("teach override check error: %r", e)
+
+    # ---------------------------------------------------------
+    # ✅ 2) CACHÉ DE ANÁLISIS (misma k + parámetros + versión de motor)
+    # ---------------------------------------------------------
+    # con historial repetible (sesión en tramo de damas) el resultado
+    # depende del camino, no solo de k: ni se lee ni se guarda
+    cache_params = _ai_move_cache_params()
+    cacheable = not history
+    cached = ANALYSIS_CACHE.get(k, cache_params) if cacheable else None
+    if cacheable:
+        ANALYSIS_CACHE_METRIC.inc(result="hit" if cached is not None else "miss")
+    if cached is not None:
+        st = SearchStats()
+        st.source = "analysis_cache"
+        SEARCH_STATS.add(st)
+        observe_search(st)
+        _maybe_ponder(game_id, ponder, board_10, side, cached["move"])
+        return cached["move"], "analysis_cache", {
+            "side": side, "k": k, "base_k": base_k, "search": cached["search"], "cached": True,
+        }
 
     # ---------------------------------------------------------
-    # ✅ 2) EXPERIENCIA + MINIMAX (tu flujo actual)
+    # ✅ 3) EXPERIENCIA + MINIMAX (tu flujo actual)
     # ---------------------------------------------------------
+    stats = SearchStats()
+    meta = {"side": side, "k": k, "base_k": base_k}
     try:
         move_str = choose_best_move(
             board_10,
             side,
-            depth=4,
+            depth=AI_MOVE_DEPTH,
             fen=None,
             use_learned=True,         # ✅ activar experiencia
-            learned_max_lines=6000,
+            learned_max_lines=AI_MOVE_LEARNED_LINES,
+            stats=stats,
+            stop=stop,
+            searcher=searcher,
+            history=history,
+            king_plies=king_plies,
         )
+    except SearchAborted:
+        return None, "aborted", meta
     except Exception as e:
-        dprint("[AI.DEBUG] choose_best_move ERROR:", repr(e))
+        log.exception("choose_best_move error")
         move_str = None
+    SEARCH_STATS.add(stats)
+    observe_search(stats)
 
     if not move_str or not isinstance(move_str, str) or not move_str.strip():
+        return None, "no_legal_move", meta
+
+    search = stats.to_dict()
+    aborted = stop is not None and stop.is_set()
+    if aborted:
+        # resultado parcial (última iteración completa): no se cachea
+        search["aborted"] = True
+    elif cacheable:
+        ANALYSIS_CACHE.put(k, cache_params, {"move": move_str.strip(), "search": search})
+    _maybe_ponder(game_id, ponder, board_10, side, move_str)
+
+    meta["search"] = search
+    return move_str.strip(), "choose_best_move", meta
+
+
+# hooks para routes/games.py (sin import circular de main)
+app.state.ai_reply = ai_reply
+GAMES_STORE.on_evict = PONDER.cancel
+
+
+# -------------------------------------------------------------------
+# /ai/move
+# -------------------------------------------------------------------
+@app.post("/ai/move", response_model=AIMoveResponse)
+def ai_move(req: AIMoveRequest):
+    side = normalize_side(req.side or req.side_to_move or "R")
+    board_raw = req.board if req.board is not None else req.fen
+
+    pos = parse_position(board_raw)
+    if pos is None:
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("/ai/move invalid_board type=%s head=%s", type(board_raw).__name__, str(board_raw)[:180])
+        return JSONResponse(
+            status_code=200,
+            content={
+                "ok": False,
+                "move": "",
+                "reason": "invalid_board",
+                "detail": "Board inválido: se esperaba lista 10x10, string JSON de esa lista o string compacto (key de 100 casillas o 50 casillas oscuras).",
+            },
+        )
+
+    board_10, body = pos
+    move_str, reason, meta = ai_reply(
+        board_10, side, k=position_key(body, side), game_id=req.game_id, ponder=req.ponder,
+    )
+    if move_str is None:
         return JSONResponse(
             status_code=200,
             content={
@@ -776,9 +1109,40 @@ def ai_move(req: AIMoveRequest):
             },
         )
 
-    return AIMoveResponse(
-        ok=True,
-        move=move_str.strip(),
-        reason="choose_best_move",
-        meta={"side": side, "k": k, "base_k": base_k},
-    )
+    return AIMoveResponse(ok=True, move=move_str, reason=reason, meta=meta)
+
+
+# -------------------------------------------------------------------
+# ✅ /ai/analyze?multipv=K: las K mejores jugadas con score y variante
+#   (pistas del editor de Training / página IA). Solo búsqueda: sin
+#   experiencia ni teach overrides. Cacheado como /ai/move.
+# -------------------------------------------------------------------
+@app.post("/ai/analyze")
+def ai_analyze(req: AIAnalyzeRequest, multipv_k: int = Query(1, alias="multipv", ge=1, le=AI_ANALYZE_MAX_PV)):
+    side = normalize_side(req.side or req.side_to_move or "R")
+    pos = parse_position(req.board if req.board is not None else req.fen)
+    if pos is None:
+        return JSONResponse(
+            status_code=200,
+            content={"ok": False, "reason": "invalid_board", "detail": "Se esperaba board 10x10."},
+        )
+
+    board_10, body = pos
+    k = position_key(body, side)
+    depth = max(1, min(int(req.depth or AI_MOVE_DEPTH), AI_ANALYZE_MAX_DEPTH))
+
+    params = ("analyze", depth, multipv_k, engine_version())
+    cached = ANALYSIS_CACHE.get(k, params)
+    ANALYSIS_CACHE_METRIC.inc(result="hit" if cached is not None else "miss")
+    if cached is not None:
+        return {"ok": True, "k": k, "side": side, **cached, "cached": True}
+
+    stats = SearchStats()
+    t0 = time.perf_counter()
+    lines = multipv(board_10, side, depth, multipv_k, stats)
+    stats.source = "analyze"
+    stats.elapsed = time.perf_counter() - t0
+
+    result = {"depth": stats.depth, "multipv": multipv_k, "lines": lines, "search": stats.to_dict()}
+    ANALYSIS_CACHE.put(k, params, result)
+    return {"ok": True, "k": k, "side": side, **result}
@@ -0,0 +1,282 @@
+# backend-python/metrics.py
+# =========================================================
+# Métricas en memoria + exposición en texto (formato Prometheus)
+# - Sin dependencias externas
+# - Thread-safe: 1 lock por métrica (sección crítica mínima)
+# - Counter / Gauge / Histogram con labels fijos por métrica
+# - MetricsMiddleware (ASGI puro): latencia por ruta
+#
+# Uso:
+#   from metrics import METRICS
+#   METRICS.counter("x_total", "ayuda", ("stage",)).inc(stage="a")
+#   METRICS.render()  -> texto para GET /metrics
+# =========================================================
+
+from __future__ import annotations
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt_num(x: float) -> str:
+    if x == float("inf"):
+        return "+Inf"
+    if float(x).is_integer():
+        return str(int(x))
+    return repr(float(x))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if not self.labelnames:
+            return ()
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_num(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        # por labels: [conteos por bucket (+Inf al final), suma, total]
+        self._series: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        k = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(k)
+            if s is None:
+                s = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[k] = s
+            s[0][idx] += 1
+            s[1] += value
+            s[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, ([*s[0]], s[1], s[2])) for k, s in self._series.items())
+        out: List[str] = []
+        for k, (counts, total, n) in items:
+            acc = 0
+            for b, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, k, ('le', _fmt_num(b)))} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labelnames, k)} {_fmt_num(total)}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labelnames, k)} {n}")
+        return out
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _get_or_create(self, cls, name: str, *args: Any, **kwargs: Any):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = cls(name, *args, **kwargs)
+                self._metrics[name] = m
+            elif not isinstance(m, cls):
+                raise ValueError(f"métrica {name} ya registrada como {m.kind}")
+            return m
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def add_collector(self, fn: Callable[[], None]) -> None:
+        """fn() se ejecuta justo antes de render() (p.ej. para actualizar gauges)."""
+        with self._lock:
+            self._collectors.append(fn)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        for fn in collectors:
+            try:
+                fn()
+            except Exception:
+                pass
+        lines: List[str] = []
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---------------------------------------------------------
+# Métricas compartidas del backend
+# ---------------------------------------------------------
+HTTP_LATENCY = METRICS.histogram(
+    "http_request_duration_seconds", "Latencia de requests HTTP por ruta", ("method", "route", "status"),
+)
+SEARCH_DEPTH = METRICS.histogram(
+    "ai_search_depth", "Profundidad nominal de las búsquedas minimax", (), buckets=(1, 2, 3, 4, 5, 6, 7, 8, 10, 12),
+)
+SEARCH_NODES = METRICS.histogram(
+    "ai_search_nodes", "Nodos visitados por búsqueda", (),
+    buckets=(100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000),
+)
+SEARCH_SECONDS = METRICS.histogram("ai_search_seconds", "Duración de choose_best_move", ())
+AI_LOOKUP = METRICS.counter(
+    "ai_lookup_total", "Resultado de cada etapa de /ai/move (teach_override, analysis_cache, learned_key, learned_base, minimax)",
+    ("stage", "result"),
+)
+ANALYSIS_CACHE = METRICS.counter(
+    "ai_analysis_cache_total", "Consultas a la caché de análisis de /ai/move", ("result",),
+)
+JSONL_ROWS = METRICS.counter("ai_jsonl_rows_written_total", "Filas JSONL escritas", ("file",))
+JSONL_BYTES = METRICS.counter("ai_jsonl_bytes_written_total", "Bytes JSONL escritos", ("file",))
+PATTERN_SYNC_SIZE = METRICS.histogram(
+    "ai_pattern_sync_patterns", "Número de patrones recibidos por /ai/patterns/sync", (),
+    buckets=(0, 10, 100, 1000, 10000, 100000),
+)
+PATTERN_SYNC_BYTES = METRICS.histogram(
+    "ai_pattern_sync_bytes", "Tamaño del índice guardado por /ai/patterns/sync", (),
+    buckets=(1e3, 1e4, 1e5, 1e6, 1e7, 1e8),
+)
+
+
+def observe_search(stats: Any) -> None:
+    """Vuelca un SearchStats del motor en las métricas de búsqueda/lookup."""
+    src = getattr(stats, "source", None)
+    if src == "teach_override":
+        AI_LOOKUP.inc(stage="teach_override", result="hit")
+        return
+    AI_LOOKUP.inc(stage="teach_override", result="miss")
+    if src == "analysis_cache":
+        AI_LOOKUP.inc(stage="analysis_cache", result="hit")
+        return
+    if src in (None, "learned_fen"):
+        if src == "learned_fen":
+            AI_LOOKUP.inc(stage="learned_fen", result="hit")
+        return
+    AI_LOOKUP.inc(stage="learned_key", result="hit" if src == "learned_key" else "miss")
+    if src == "learned_key":
+        return
+    AI_LOOKUP.inc(stage="learned_base", result="hit" if src == "learned_base" else "miss")
+    if src == "minimax":
+        AI_LOOKUP.inc(stage="minimax", result="fallback")
+        SEARCH_DEPTH.observe(stats.depth)
+        SEARCH_NODES.observe(stats.nodes)
+        SEARCH_SECONDS.observe(stats.elapsed)
+
+
+# ---------------------------------------------------------
+# Middleware ASGI (sin BaseHTTPMiddleware: menos overhead)
+# ---------------------------------------------------------
+class MetricsMiddleware:
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope.get("type") != "http":
+            await self.app(scope, receive, send)
+            return
+
+        t0 = time.perf_counter()
+        status = {"code": 500}
+
+        async def _send(message: Dict[str, Any]) -> None:
+            if message.get("type") == "http.response.start":
+                status["code"] = message.get("status", 500)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            route = scope.get("route")
+            # plantilla de ruta (no la URL real) para no disparar la cardinalidad
+            route_label = getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.observe(
+                time.perf_counter() - t0,
+                method=scope.get("method", ""),
+                route=route_label,
+                status=str(status["code"]),
+            )
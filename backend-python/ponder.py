@@ -0,0 +1,269 @@
+# backend-python/ponder.py
+# =========================================================
+# Pondering: buscar en el tiempo del rival (opt-in por partida)
+#
+# Tras responder /ai/move con {game_id, ponder: true}, main.py hace
+# submit(game_id, tablero_tras_nuestra_jugada, side_rival). Un hilo
+# en segundo plano:
+#   1) predice las respuestas del rival (minimax corto desde su lado:
+#      la mejor primero, luego el resto en orden del generador)
+#   2) para las primeras `max_replies` ejecuta search_fn(board, side,
+#      stop) -> la búsqueda que haría /ai/move y la deja en la caché
+#      de análisis (False = ya estaba); la siguiente /ai/move de esa
+#      posición es un hit.
+#
+# Presupuesto global de CPU (el motor comparte GIL con las requests):
+#   - 1 hilo de ponder por proceso
+#   - `budget_s` segundos de ponder por ventana de `window_s`
+#   - `max_job_s` por posición (deadline en el stop flag)
+# Una /ai/move nueva de la misma partida cancela su ponder pendiente;
+# si el hilo está justo buscando esa posición, wait_for() espera a
+# que termine (hasta el deadline) en lugar de empezar de cero.
+# =========================================================
+
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ai_engine import SearchAborted, apply_move, board_to_key, generate_legal_moves, minimax
+
+log = logging.getLogger("ponder")
+
+Board = List[List[Optional[str]]]
+SearchFn = Callable[[Board, str, Any], bool]
+
+
+def _other(side: str) -> str:
+    return "N" if side == "R" else "R"
+
+
+class _StopFlag:
+    """is_set() = cancelado o fuera de tiempo (lo consulta minimax en cada nodo)."""
+    __slots__ = ("_cancel", "_deadline")
+
+    def __init__(self, cancel: threading.Event, deadline: float) -> None:
+        self._cancel = cancel
+        self._deadline = deadline
+
+    def is_set(self) -> bool:
+        return self._cancel.is_set() or time.monotonic() > self._deadline
+
+
+class _Job:
+    __slots__ = ("game_id", "board", "side", "cancel", "current_k", "done")
+
+    def __init__(self, game_id: str, board: Board, side: str) -> None:
+        self.game_id = game_id
+        self.board = board
+        self.side = side                      # quien mueve = el rival
+        self.cancel = threading.Event()
+        self.current_k: Optional[str] = None  # posición que se está buscando ahora
+        self.done = threading.Event()         # se activa al terminar current_k
+
+
+class Ponderer:
+    def __init__(
+        self,
+        search_fn: SearchFn,
+        budget_s: float = 20.0,
+        window_s: float = 60.0,
+        max_job_s: float = 5.0,
+        max_replies: int = 3,
+        predict_depth: int = 2,
+    ) -> None:
+        self.search_fn = search_fn
+        self.budget_s = float(budget_s)
+        self.window_s = float(window_s)
+        self.max_job_s = float(max_job_s)
+        self.max_replies = int(max_replies)
+        self.predict_depth = int(predict_depth)
+
+        self._cv = threading.Condition()
+        self._pending: "OrderedDict[str, _Job]" = OrderedDict()
+        self._running: Optional[_Job] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        # (t_inicio, segundos) de cada búsqueda dentro de la ventana
+        self._spent: List[Tuple[float, float]] = []
+
+        self.counters: Dict[str, int] = {
+            "submitted": 0, "searched": 0, "cached": 0, "aborted": 0, "budget": 0, "replaced": 0, "waited": 0,
+        }
+
+    # -------------------------------------------------------
+    # API (hilos de request)
+    # -------------------------------------------------------
+    def submit(self, game_id: str, board: Board, side: str) -> None:
+        with self._cv:
+            if self._stopping:
+                return
+            self._cancel_locked(game_id)
+            self._pending[game_id] = _Job(game_id, board, side)
+            self.counters["submitted"] += 1
+            self._cv.notify()
+
+    def cancel(self, game_id: str) -> None:
+        with self._cv:
+            self._cancel_locked(game_id)
+
+    def wait_for(self, game_id: str, k: str) -> bool:
+        """
+        Llamar al inicio de /ai/move: si el ponder de la partida está
+        buscando justo `k`, espera a que termine (resultado en la caché);
+        el resto del ponder de esa partida se cancela.
+        """
+        with self._cv:
+            job = self._running if self._running is not None and self._running.game_id == game_id else None
+            waiting = job is not None and job.current_k == k
+            if not waiting:
+                self._cancel_locked(game_id)
+            else:
+                self._pending.pop(game_id, None)
+        if not waiting:
+            return False
+        job.done.wait(self.max_job_s)
+        job.cancel.set()
+        with self._cv:
+            self.counters["waited"] += 1
+        return True
+
+    def _cancel_locked(self, game_id: str) -> None:
+        if self._pending.pop(game_id, None) is not None:
+            self.counters["replaced"] += 1
+        if self._running is not None and self._running.game_id == game_id:
+            self._running.cancel.set()
+
+    # -------------------------------------------------------
+    # Presupuesto
+    # -------------------------------------------------------
+    def _budget_left(self) -> float:
+        now = time.monotonic()
+        self._spent = [(t, s) for t, s in self._spent if now - t < self.window_s]
+        return self.budget_s - sum(s for _, s in self._spent)
+
+    # -------------------------------------------------------
+    # Hilo de ponder
+    # -------------------------------------------------------
+    def start(self) -> None:
+        with self._cv:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="ponder", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cv:
+            self._stopping = True
+            self._pending.clear()
+            if self._running is not None:
+                self._running.cancel.set()
+            self._cv.notify_all()
+            t = self._thread
+            self._thread = None
+        if t is not None:
+            t.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                while not self._pending and not self._stopping:
+                    self._cv.wait()
+                if self._stopping:
+                    return
+                _, job = self._pending.popitem(last=False)
+                self._running = job
+            try:
+                self._ponder(job)
+            except Exception:
+                log.exception("ponder: error en partida %s", job.game_id)
+            finally:
+                with self._cv:
+                    self._running = None
+                job.done.set()
+
+    def _replies(self, job: _Job) -> List[Any]:
+        moves = generate_legal_moves(job.board, job.side)
+        if len(moves) <= 1 or self.predict_depth <= 0:
+            return moves[: self.max_replies]
+        stop = _StopFlag(job.cancel, time.monotonic() + self.max_job_s)
+        _, best = minimax(job.board, job.side, self.predict_depth, float("-inf"), float("inf"), job.side, stop=stop)
+        if best is not None:
+            moves = [best] + [m for m in moves if m.code != best.code]
+        return moves[: self.max_replies]
+
+    def _ponder(self, job: _Job) -> None:
+        try:
+            replies = self._replies(job)
+        except SearchAborted:
+            with self._cv:
+                self.counters["aborted"] += 1
+            return
+
+        me = _other(job.side)
+        for mv in replies:
+            with self._cv:
+                left = self._budget_left()
+                if left <= 0:
+                    self.counters["budget"] += 1
+                    return
+            if job.cancel.is_set():
+                return
+
+            board2 = apply_move(job.board, mv, job.side)
+            k2 = board_to_key(board2, me)
+            job.done.clear()
+            with self._cv:
+                job.current_k = k2
+            stop = _StopFlag(job.cancel, time.monotonic() + min(self.max_job_s, left))
+            t0 = time.monotonic()
+            try:
+                searched = self.search_fn(board2, me, stop)
+                with self._cv:
+                    self.counters["searched" if searched else "cached"] += 1
+            except SearchAborted:
+                with self._cv:
+                    self.counters["aborted"] += 1
+                return
+            finally:
+                with self._cv:
+                    self._spent.append((t0, time.monotonic() - t0))
+                    job.current_k = None
+                job.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cv:
+            return {
+                **self.counters,
+                "pending": len(self._pending),
+                "running": self._running.game_id if self._running is not None else None,
+                "budget_left_s": round(self._budget_left(), 3),
+                "budget_s": self.budget_s,
+                "window_s": self.window_s,
+            }
+
+
+def ponderer_from_env(search_fn: SearchFn) -> Ponderer:
+    """
+    DAMAS_PONDER_BUDGET=20     segundos de CPU por ventana
+    DAMAS_PONDER_WINDOW=60
+    DAMAS_PONDER_MAX_JOB=5     segundos máximos por posición
+    DAMAS_PONDER_REPLIES=3     respuestas del rival a precalcular
+    """
+    def num(name: str, default: float) -> float:
+        try:
+            return float(os.environ.get(name, "") or default)
+        except ValueError:
+            return default
+
+    return Ponderer(
+        search_fn,
+        budget_s=num("DAMAS_PONDER_BUDGET", 20),
+        window_s=num("DAMAS_PONDER_WINDOW", 60),
+        max_job_s=num("DAMAS_PONDER_MAX_JOB", 5),
+        max_replies=int(num("DAMAS_PONDER_REPLIES", 3)),
+    )
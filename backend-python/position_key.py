@@ -0,0 +1,145 @@
+# backend-python/position_key.py
+# =========================================================
+# Claves compactas de posición para las tablas en memoria
+#
+# - hash Zobrist de 64 bits: XOR de un número aleatorio fijo por
+#   (casilla, pieza) y otro por bando. Semilla fija: el mismo hash en
+#   todos los procesos y reinicios.
+# - base (sin bando) = XOR solo de las piezas; hash = base ^ SIDE_HASH.
+#   Las filas de experiencia sin side se guardan bajo la base, y la
+#   búsqueda "por tablero sin side" mira base, base^R y base^N en vez
+#   de guardar cada fila dos veces.
+# - incremental: hash del hijo = hash ^ move_delta(board, mv, side)
+#   (lo usa la búsqueda: TT e historial de repeticiones).
+# - packed: las 50 casillas oscuras en base 5 + bando = 15 bytes, para
+#   comprobar colisiones donde haga falta. 5^50 * 2 ≈ 2^117.1: no cabe
+#   en 13 bytes (104 bits) ni en 14 (112).
+# La key de board_to_key ("..n./...|side:R") queda para logs, debug y
+# los archivos que ya la usan.
+# =========================================================
+
+from __future__ import annotations
+import json
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+BOARD_SIZE = 10
+N_SQUARES = BOARD_SIZE * BOARD_SIZE
+PIECES = ("r", "n", "R", "N")
+
+Board = List[List[Optional[str]]]
+
+_rng = random.Random(0xDA3A5_10C10)
+# ZOBRIST[pieza][casilla], casilla = fila * 10 + col
+ZOBRIST: Dict[str, Tuple[int, ...]] = {
+    p: tuple(_rng.getrandbits(64) for _ in range(N_SQUARES)) for p in PIECES
+}
+SIDE_HASH: Dict[str, int] = {"R": _rng.getrandbits(64), "N": _rng.getrandbits(64)}
+SIDE_FLIP = SIDE_HASH["R"] ^ SIDE_HASH["N"]
+del _rng
+
+_PROMOTE = {("r", 0): "R", ("n", BOARD_SIZE - 1): "N"}
+
+
+# ---------------------------------------------------------
+# Hash
+# ---------------------------------------------------------
+def base_hash(board: Board) -> int:
+    """Hash de las piezas (sin bando)."""
+    h = 0
+    for r in range(BOARD_SIZE):
+        row = board[r]
+        off = r * BOARD_SIZE
+        for c in range(BOARD_SIZE):
+            ch = row[c]
+            if ch is not None:
+                h ^= ZOBRIST[ch][off + c]
+    return h
+
+
+def position_hash(board: Board, side: str) -> int:
+    return base_hash(board) ^ SIDE_HASH[side]
+
+
+def move_delta(board: Board, mv: Any, side: str) -> int:
+    """hash(apply_move(board, mv, side), otro) == hash(board, side) ^ move_delta(...)."""
+    piece = board[mv.fr][mv.fc]
+    to_sq = mv.tr * BOARD_SIZE + mv.tc
+    d = ZOBRIST[piece][mv.fr * BOARD_SIZE + mv.fc] ^ ZOBRIST[_PROMOTE.get((piece, mv.tr), piece)][to_sq] ^ SIDE_FLIP
+    for cr, cc in mv.captures:
+        d ^= ZOBRIST[board[cr][cc]][cr * BOARD_SIZE + cc]
+    return d
+
+
+def _body_hash(body: str) -> Optional[int]:
+    rows = body.split("/")
+    if len(rows) != BOARD_SIZE or any(len(row) != BOARD_SIZE for row in rows):
+        return None
+    h = 0
+    for r, row in enumerate(rows):
+        off = r * BOARD_SIZE
+        for c, ch in enumerate(row):
+            z = ZOBRIST.get(ch)
+            if z is not None:
+                h ^= z[off + c]
+    return h
+
+
+def key_hashes(k: Any) -> Optional[Tuple[int, int]]:
+    """
+    (hash, base) de una key de board_to_key. Sin '|side:' (o con un
+    side desconocido) hash == base. También acepta el fen legacy (string
+    JSON de la lista 10x10). None si no es un tablero.
+    """
+    if not isinstance(k, str):
+        return None
+    s = k.strip()
+    if s.startswith("["):
+        try:
+            rows = json.loads(s)
+        except ValueError:
+            return None
+        if not isinstance(rows, list) or len(rows) != BOARD_SIZE:
+            return None
+        if any(not isinstance(row, list) or len(row) != BOARD_SIZE for row in rows):
+            return None
+        base = base_hash([[ch if ch in ZOBRIST else None for ch in row] for row in rows])
+        return base, base
+    body, _, side = s.partition("|side:")
+    base = _body_hash(body)
+    if base is None:
+        return None
+    return base ^ SIDE_HASH.get(side.strip(), 0), base
+
+
+def key_hash(k: Any) -> Optional[int]:
+    hs = key_hashes(k)
+    return hs[0] if hs is not None else None
+
+
+# ---------------------------------------------------------
+# Tablero empaquetado (comprobación de colisiones)
+# ---------------------------------------------------------
+PACKED_SIZE = 15
+_DARK = tuple((r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE) if (r + c) % 2 == 1)
+_DIGIT = {None: 0, "r": 1, "n": 2, "R": 3, "N": 4}
+_PIECE = (None, "r", "n", "R", "N")
+
+
+def pack_position(board: Board, side: str) -> bytes:
+    """50 casillas oscuras en base 5 y el bando en el bit bajo: 15 bytes."""
+    v = 0
+    for r, c in _DARK:
+        v = v * 5 + _DIGIT[board[r][c]]
+    return ((v << 1) | (side == "N")).to_bytes(PACKED_SIZE, "big")
+
+
+def unpack_position(data: bytes) -> Tuple[Board, str]:
+    v = int.from_bytes(data, "big")
+    side = "N" if v & 1 else "R"
+    v >>= 1
+    board: Board = [[None] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+    for r, c in reversed(_DARK):
+        v, d = divmod(v, 5)
+        board[r][c] = _PIECE[d]
+    return board, side
@@ -0,0 +1,163 @@
+# backend-python/routes/games.py
+# =========================================================
+# API de partidas con estado en el servidor
+#
+#   POST   /games                 -> crea la partida (board opcional)
+#   POST   /games/{id}/move       -> {"move": "c3-d4", "reply": true}
+#   GET    /games/{id}            -> estado (+ jugadas legales)
+#   DELETE /games/{id}
+#
+# La respuesta de la IA usa el mismo flujo que /ai/move (teach
+# override -> caché de análisis -> choose_best_move), registrado por
+# main.py en app.state.ai_reply; el tablero entrante se parsea con
+# board_codec (mismos formatos que /ai/move).
+# =========================================================
+
+import os
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, root_validator
+
+from ai_engine import initial_board
+from board_codec import normalize_side, parse_board
+from game_sessions import GameSession, SessionStore
+
+router = APIRouter(
+    prefix="/games",
+    tags=["Games"]
+)
+
+STORE = SessionStore(
+    max_sessions=int(os.environ.get("DAMAS_GAMES_MAX", "") or 2000),
+    idle_s=float(os.environ.get("DAMAS_GAMES_IDLE_S", "") or 1800),
+)
+
+
+class GameCreateRequest(BaseModel):
+    """
+    {board?: 10x10 | string JSON | string compacto, side?: "R"/"N", ai_side?: "R"/"N", ponder?: bool}
+    Sin board -> posición inicial.
+    """
+    board: Optional[Any] = None
+    side: Optional[str] = None
+    ai_side: Optional[str] = None
+    ponder: bool = False
+
+    @root_validator(pre=True)
+    def _normalize(cls, values):
+        if not isinstance(values, dict):
+            return values
+        if "board" not in values and "fen" in values:
+            values["board"] = values.get("fen")
+        if "side" not in values:
+            for k in ("side_to_move", "sideToMove", "turn"):
+                if k in values:
+                    values["side"] = values.get(k)
+                    break
+        if "ai_side" not in values and "aiSide" in values:
+            values["ai_side"] = values.get("aiSide")
+        return values
+
+
+class GameMoveRequest(BaseModel):
+    move: str
+    reply: bool = True
+
+
+def _side(x: Any, default: Optional[str] = "R") -> Optional[str]:
+    if x is None or not str(x).strip():
+        return default
+    return normalize_side(x)
+
+
+def _get(game_id: str) -> GameSession:
+    sess = STORE.get(game_id)
+    if sess is None:
+        raise HTTPException(status_code=404, detail="game_not_found")
+    return sess
+
+
+def ai_turn(app: Any, sess: GameSession, **kwargs: Any) -> Dict[str, Any]:
+    """
+    Juega la IA en la sesión (ya con sess.lock tomado).
+    kwargs extra (searcher, stop) pasan a app.state.ai_reply; si `stop`
+    quedó activado no se juega nada ({"aborted": True}).
+    """
+    if sess.over:
+        return {"move": None, "reason": "game_over"}
+    move_str, reason, meta = app.state.ai_reply(
+        sess.board, sess.side, k=sess.k, game_id=sess.id, ponder=sess.ponder,
+        history=sess.reversible, king_plies=sess.king_plies, **kwargs,
+    )
+    stop = kwargs.get("stop")
+    if stop is not None and stop.is_set():
+        # búsqueda cancelada: cancelar NO es "mueve ya", no se juega la parcial
+        return {"move": None, "reason": "aborted", "aborted": True, "proposed": move_str}
+    mv = sess.find(move_str) if move_str else None
+    if mv is None:
+        # p.ej. un teach override que no es legal aquí
+        return {"move": None, "reason": reason if move_str is None else "illegal_ai_move", "proposed": move_str}
+    played = sess.play(mv)
+    return {"move": played, "reason": reason, "search": meta.get("search")}
+
+
+@router.post("")
+def create_game(req: GameCreateRequest, request: Request):
+    side = _side(req.side)
+    if req.board is None:
+        board = initial_board()
+    else:
+        board = parse_board(req.board)
+        if board is None:
+            return JSONResponse(
+                status_code=200,
+                content={"ok": False, "reason": "invalid_board", "detail": "Se esperaba board 10x10."},
+            )
+
+    sess = STORE.create(board, side, ai_side=_side(req.ai_side, None), ponder=req.ponder)
+    reply = None
+    with sess.lock:
+        # si arranca moviendo la IA, responde ya
+        if sess.ai_side == sess.side:
+            reply = ai_turn(request.app, sess)
+        return {"ok": True, "game": sess.to_dict(with_legal=True), "reply": reply}
+
+
+@router.get("/{game_id}")
+def get_game(game_id: str):
+    sess = _get(game_id)
+    with sess.lock:
+        out = sess.to_dict(with_legal=True)
+        out["moves"] = list(sess.moves)
+        return {"ok": True, "game": out}
+
+
+@router.post("/{game_id}/move")
+def play_move(game_id: str, req: GameMoveRequest, request: Request):
+    sess = _get(game_id)
+    with sess.lock:
+        if sess.over:
+            return {"ok": False, "reason": "game_over", "game": sess.to_dict()}
+
+        mv = sess.find(req.move)
+        if mv is None:
+            return {
+                "ok": False,
+                "reason": "illegal_move",
+                "move": req.move,
+                "game": sess.to_dict(with_legal=True),
+            }
+        played = sess.play(mv)
+
+        reply = None
+        if req.reply and (sess.ai_side is None or sess.ai_side == sess.side):
+            reply = ai_turn(request.app, sess)
+
+        return {"ok": True, "played": played, "reply": reply, "game": sess.to_dict(with_legal=True)}
+
+
+@router.delete("/{game_id}")
+def delete_game(game_id: str):
+    return {"ok": True, "deleted": STORE.delete(game_id)}
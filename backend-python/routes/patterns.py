@@ -2,6 +2,8 @@ from fastapi import APIRouter
 from pathlib import Path
 import json
 
+from metrics import PATTERN_SYNC_BYTES, PATTERN_SYNC_SIZE
+
 # Router principal de patrones
 router = APIRouter(
     prefix="/ai/patterns",
@@ -49,10 +51,12 @@ def sync_pattern_index(payload: dict):
     Recibe patrones desde el frontend y los guarda en disco.
     """
     patterns = payload.get("patterns", {})
+    PATTERN_SYNC_SIZE.observe(len(patterns) if hasattr(patterns, "__len__") else 0)
 
     try:
         with open(PATTERN_FILE, "w", encoding="utf-8") as f:
             json.dump(patterns, f, indent=2, ensure_ascii=False)
+        PATTERN_SYNC_BYTES.observe(PATTERN_FILE.stat().st_size)
 
         return {
             "ok": True,
@@ -0,0 +1,238 @@
+# backend-python/routes/ws_ai.py
+# =========================================================
+# WebSocket /ws/ai: juego contra la IA con 1 conexión por partida
+#
+# Cliente -> servidor (JSON, `id` opcional para correlacionar):
+#   {"type": "move",    "id": 1, "board": ..., "side": "R", "ponder": true}
+#   {"type": "move",    "id": 2, "game_id": "...", "move": "c3-d4"}   (sesión /games)
+#   {"type": "analyze", "id": 3, "board": ..., "side": "N", "depth": 6}
+#   {"type": "cancel",  "id": 3}
+#   {"type": "ping"}
+# Servidor -> cliente:
+#   {"type": "info", "id", "depth", "score", "move", "nodes", "elapsed_ms"}   (por iteración)
+#   {"type": "bestmove", "id", "move", "reason", "meta", ["played", "game"]}
+#   {"type": "bestmove", "id", "move": null, "aborted": true, ...}       (tras cancel)
+#   {"type": "analysis", "id", "move", "score", "depth", "nodes", "elapsed_ms", "aborted"}
+#   {"type": "error", "id", "reason"} / {"type": "pong"}
+#
+# Una búsqueda a la vez por conexión: un move/analyze nuevo cancela
+# el anterior. La búsqueda corre en el threadpool; la info de cada
+# iteración vuelve al loop con call_soon_threadsafe.
+# Cancelar no es "mueve ya": un move cancelado responde aborted y la
+# IA no juega en la sesión (la jugada del humano sí queda).
+# =========================================================
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from ai_engine import SearchAborted, SearchStats, board_to_key, iterative_deepening
+from board_codec import normalize_side, parse_board
+from metrics import METRICS
+from routes.games import STORE, ai_turn
+
+log = logging.getLogger("ws_ai")
+
+router = APIRouter(tags=["AI WebSocket"])
+
+MAX_ANALYZE_DEPTH = int(os.environ.get("DAMAS_WS_MAX_DEPTH", "") or 8)
+
+WS_CONNECTIONS = METRICS.gauge("ai_ws_connections", "Conexiones abiertas en /ws/ai", ())
+WS_MESSAGES = METRICS.counter("ai_ws_messages_total", "Mensajes recibidos en /ws/ai por tipo", ("type",))
+
+
+class _Conn:
+    """Estado de una conexión: cola de salida + búsqueda en curso."""
+
+    def __init__(self, ws: WebSocket) -> None:
+        self.ws = ws
+        self.loop = asyncio.get_running_loop()
+        self.out: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+        self.stop: Optional[threading.Event] = None
+        self.ponder_id = f"ws-{uuid4().hex[:12]}"  # game_id del ponder sin sesión
+
+    def push(self, msg: Dict[str, Any]) -> None:
+        """Desde cualquier hilo."""
+        self.loop.call_soon_threadsafe(self.out.put_nowait, msg)
+
+    def cancel(self) -> None:
+        if self.stop is not None:
+            self.stop.set()
+
+    async def sender(self) -> None:
+        while True:
+            msg = await self.out.get()
+            if msg is None:
+                return
+            await self.ws.send_text(json.dumps(msg, ensure_ascii=False))
+
+
+def _streaming_searcher(conn: _Conn, rid: Any):
+    def on_iteration(info: Dict[str, Any]) -> None:
+        conn.push({"type": "info", "id": rid, **info})
+
+    def searcher(board, side, depth, stats, stop, history=None, king_plies=0):
+        return iterative_deepening(
+            board, side, depth, stats, stop, on_iteration, history=history, king_plies=king_plies,
+        )
+
+    return searcher
+
+
+# ---------------------------------------------------------
+# Trabajos (corren en el threadpool)
+# ---------------------------------------------------------
+def _do_move(conn: _Conn, msg: Dict[str, Any], stop: threading.Event) -> Dict[str, Any]:
+    rid = msg.get("id")
+    app = conn.ws.app
+    searcher = _streaming_searcher(conn, rid)
+
+    game_id = msg.get("game_id") or msg.get("gameId")
+    if game_id:
+        sess = STORE.get(str(game_id))
+        if sess is None:
+            return {"type": "error", "id": rid, "reason": "game_not_found"}
+        with sess.lock:
+            played = None
+            if msg.get("move"):
+                mv = sess.find(str(msg["move"]))
+                if mv is None:
+                    return {"type": "error", "id": rid, "reason": "illegal_move", "game": sess.to_dict(with_legal=True)}
+                played = sess.play(mv)
+            reply = ai_turn(app, sess, searcher=searcher, stop=stop)
+            out = {
+                "type": "bestmove",
+                "id": rid,
+                "move": reply.get("move"),
+                "reason": reply.get("reason"),
+                "meta": {"search": reply.get("search")},
+                "played": played,
+                "game": sess.to_dict(with_legal=True),
+            }
+            if reply.get("aborted"):
+                out["aborted"] = True
+            return out
+
+    board = parse_board(msg.get("board", msg.get("fen")))
+    if board is None:
+        return {"type": "error", "id": rid, "reason": "invalid_board"}
+    side = normalize_side(msg.get("side") or msg.get("side_to_move"))
+    ponder = bool(msg.get("ponder"))
+    move_str, reason, meta = app.state.ai_reply(
+        board, side, game_id=conn.ponder_id, ponder=ponder, searcher=searcher, stop=stop,
+    )
+    if stop.is_set():
+        return {"type": "bestmove", "id": rid, "move": None, "reason": "aborted", "aborted": True, "meta": meta}
+    return {"type": "bestmove", "id": rid, "move": move_str, "reason": reason, "meta": meta}
+
+
+def _do_analyze(conn: _Conn, msg: Dict[str, Any], stop: threading.Event) -> Dict[str, Any]:
+    rid = msg.get("id")
+    app = conn.ws.app
+
+    game_id = msg.get("game_id") or msg.get("gameId")
+    if game_id:
+        sess = STORE.get(str(game_id))
+        if sess is None:
+            return {"type": "error", "id": rid, "reason": "game_not_found"}
+        with sess.lock:
+            board, side = sess.board, sess.side
+            history, king_plies = list(sess.reversible), sess.king_plies
+    else:
+        board = parse_board(msg.get("board", msg.get("fen")))
+        if board is None:
+            return {"type": "error", "id": rid, "reason": "invalid_board"}
+        side = normalize_side(msg.get("side") or msg.get("side_to_move"))
+        history, king_plies = None, 0
+
+    try:
+        depth = max(1, min(int(msg.get("depth") or 6), MAX_ANALYZE_DEPTH))
+    except (TypeError, ValueError):
+        depth = 6
+
+    stats = SearchStats()
+    t0 = time.perf_counter()
+    def on_iteration(info: Dict[str, Any]) -> None:
+        conn.push({"type": "info", "id": rid, **info})
+
+    try:
+        score, mv = iterative_deepening(
+            board, side, depth, stats, stop, on_iteration, history=history, king_plies=king_plies,
+        )
+    except SearchAborted:
+        return {"type": "analysis", "id": rid, "move": None, "aborted": True}
+    return {
+        "type": "analysis",
+        "id": rid,
+        "k": board_to_key(board, side),
+        "move": mv.to_algebraic() if mv is not None else None,
+        "score": score if mv is not None else None,
+        "depth": stats.depth,
+        "nodes": stats.nodes,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+        "aborted": stop.is_set(),
+    }
+
+
+async def _run(conn: _Conn, fn, msg: Dict[str, Any], stop: threading.Event) -> None:
+    try:
+        result = await conn.loop.run_in_executor(None, fn, conn, msg, stop)
+    except Exception as e:
+        log.exception("/ws/ai: error en %s", msg.get("type"))
+        result = {"type": "error", "id": msg.get("id"), "reason": repr(e)}
+    conn.out.put_nowait(result)
+
+
+# ---------------------------------------------------------
+# Endpoint
+# ---------------------------------------------------------
+@router.websocket("/ws/ai")
+async def ws_ai(ws: WebSocket):
+    await ws.accept()
+    conn = _Conn(ws)
+    sender = asyncio.create_task(conn.sender())
+    WS_CONNECTIONS.inc()
+    try:
+        while True:
+            raw = await ws.receive_text()
+            try:
+                msg = json.loads(raw)
+                if not isinstance(msg, dict):
+                    raise ValueError("mensaje no es objeto")
+            except ValueError:
+                conn.out.put_nowait({"type": "error", "reason": "invalid_json"})
+                continue
+
+            kind = str(msg.get("type") or "")
+            WS_MESSAGES.inc(type=kind if kind in ("move", "analyze", "cancel", "ping") else "other")
+
+            if kind == "ping":
+                conn.out.put_nowait({"type": "pong", "id": msg.get("id")})
+            elif kind == "cancel":
+                conn.cancel()
+            elif kind in ("move", "analyze"):
+                # una búsqueda a la vez: la nueva cancela la anterior
+                conn.cancel()
+                conn.stop = threading.Event()
+                fn = _do_move if kind == "move" else _do_analyze
+                conn.task = asyncio.create_task(_run(conn, fn, msg, conn.stop))
+            else:
+                conn.out.put_nowait({"type": "error", "id": msg.get("id"), "reason": "unknown_type"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        WS_CONNECTIONS.inc(-1)
+        conn.cancel()
+        conn.out.put_nowait(None)
+        try:
+            await sender
+        except Exception:
+            pass
@@ -0,0 +1,226 @@
+# backend-python/selfplay.py
+# =========================================================
+# Auto-juego (self-play) headless para generar experiencia
+#
+#   python selfplay.py --games 200 --workers 4 --depth 3 --random-plies 4
+#
+# - Cada partida corre en un proceso del pool (ProcessPoolExecutor)
+#   usando minimax del motor (sin experiencia: juego "limpio").
+# - Apertura aleatoria: las primeras N jugadas se eligen al azar
+#   (semilla = seed + índice de partida -> reproducible).
+# - Al terminar cada partida el proceso principal escribe EN BLOQUE
+#   en data/ai_moves.jsonl:
+#     · 1 fila por jugada del motor, score = resultado para quien movió
+#       (+1 ganó, -1 perdió, 0 tablas), mismo formato que /ai/log-moves
+#     · 1 fila {"move": "__GAME_RESULT__", "score": ±1/0} (vista de R)
+# - Reanudable: data/selfplay_state.json guarda qué partidas del run
+#   ya están escritas; relanzar con los mismos parámetros continúa.
+# =========================================================
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from experience_log import experience_log_from_env
+from ai_engine import RULESET_VERSION, apply_move, board_to_key, generate_legal_moves, initial_board, minimax
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+DEFAULT_OUT = DATA_DIR / "ai_moves.jsonl"
+DEFAULT_STATE = DATA_DIR / "selfplay_state.json"
+
+GAME_RESULT = "__GAME_RESULT__"
+
+
+def _other(side: str) -> str:
+    return "N" if side == "R" else "R"
+
+
+# ---------------------------------------------------------
+# Una partida (se ejecuta en el proceso worker)
+# ---------------------------------------------------------
+def play_game(index: int, seed: int, depth: int, random_plies: int, max_plies: int) -> Dict[str, Any]:
+    rng = random.Random(seed + index)
+    board = initial_board()
+    side = "R"
+    plies: List[Dict[str, Any]] = []
+    winner: Optional[str] = None
+    t0 = time.perf_counter()
+
+    for ply in range(max_plies):
+        moves = generate_legal_moves(board, side)
+        if not moves:
+            winner = _other(side)  # sin jugadas = derrota
+            break
+
+        if ply < random_plies:
+            mv = rng.choice(moves)
+            from_engine = False
+        elif len(moves) == 1:
+            mv = moves[0]
+            from_engine = True
+        else:
+            _, mv = minimax(board, side, depth, float("-inf"), float("inf"), side)
+            mv = mv or moves[0]
+            from_engine = True
+
+        if from_engine:
+            plies.append({
+                "k": board_to_key(board, side),
+                "fen": json.dumps(board, ensure_ascii=False, separators=(",", ":")),
+                "move": mv.to_algebraic(),
+                "side": side,
+            })
+        board = apply_move(board, mv, side)
+        side = _other(side)
+
+    return {
+        "index": index,
+        "winner": winner,  # None = tablas por límite de jugadas
+        "plies": plies,
+        "final_k": board_to_key(board, side),
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+# ---------------------------------------------------------
+# Escritura en bloque + estado reanudable (proceso principal)
+# ---------------------------------------------------------
+def game_rows(result: Dict[str, Any], run_id: str) -> List[Dict[str, Any]]:
+    ts = int(time.time() * 1000)
+    winner = result["winner"]
+    game_id = f"{run_id}-{result['index']}"
+    rows: List[Dict[str, Any]] = []
+    for p in result["plies"]:
+        score = 0.0 if winner is None else (1.0 if p["side"] == winner else -1.0)
+        rows.append({
+            "ts": ts,
+            "k": p["k"],
+            "move": p["move"],
+            "score": score,
+            "side": p["side"],
+            "fen": p["fen"],
+            "key": p["fen"],
+            "rules": RULESET_VERSION,
+            "src": "selfplay",
+            "game": game_id,
+        })
+    rows.append({
+        "ts": ts,
+        "k": result["final_k"],
+        "move": GAME_RESULT,
+        "score": 0.0 if winner is None else (1.0 if winner == "R" else -1.0),
+        "side": "R",
+        "rules": RULESET_VERSION,
+        "src": "selfplay",
+        "game": game_id,
+    })
+    return rows
+
+
+def append_rows_bulk(path: Path, rows: List[Dict[str, Any]]) -> int:
+    """Un solo write() por partida al segmento activo (ver experience_log.py); devuelve bytes escritos."""
+    return experience_log_from_env(path).append_rows(rows)
+
+
+def _load_state(path: Path, run_id: str) -> Set[int]:
+    try:
+        obj = json.loads(path.read_text(encoding="utf-8"))
+        if obj.get("run_id") == run_id:
+            return set(int(i) for i in obj.get("done", []))
+    except Exception:
+        pass
+    return set()
+
+
+def _save_state(path: Path, run_id: str, config: Dict[str, Any], done: Set[int]) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(
+        json.dumps({"run_id": run_id, "config": config, "done": sorted(done)}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    os.replace(tmp, path)
+
+
+def run_selfplay(
+    games: int,
+    workers: int = 0,
+    depth: int = 3,
+    random_plies: int = 4,
+    max_plies: int = 200,
+    seed: int = 1,
+    out_path: Path = DEFAULT_OUT,
+    state_path: Path = DEFAULT_STATE,
+) -> Dict[str, Any]:
+    config = {"games": games, "depth": depth, "random_plies": random_plies, "max_plies": max_plies, "seed": seed}
+    run_id = f"sp{seed}-d{depth}-r{random_plies}-m{max_plies}"
+    done = _load_state(state_path, run_id)
+    todo = [i for i in range(games) if i not in done]
+
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    print(f"[SELFPLAY] run={run_id} pendientes={len(todo)}/{games} workers={workers} -> {out_path}")
+
+    stats = {"games": 0, "R": 0, "N": 0, "draw": 0, "rows": 0, "bytes": 0}
+    t0 = time.time()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_game, i, seed, depth, random_plies, max_plies) for i in todo]
+        for fut in as_completed(futures):
+            result = fut.result()
+            rows = game_rows(result, run_id)
+            stats["bytes"] += append_rows_bulk(out_path, rows)
+            stats["rows"] += len(rows)
+            # estado DESPUÉS de escribir: un corte aquí repite como mucho 1 partida
+            done.add(result["index"])
+            _save_state(state_path, run_id, config, done)
+
+            stats["games"] += 1
+            stats[result["winner"] or "draw"] += 1
+            elapsed = max(time.time() - t0, 1e-9)
+            if stats["games"] % 10 == 0 or stats["games"] == len(todo):
+                print(
+                    f"[SELFPLAY] {stats['games']}/{len(todo)} partidas "
+                    f"R={stats['R']} N={stats['N']} tablas={stats['draw']} "
+                    f"{stats['games'] / elapsed * 3600:.0f} partidas/h"
+                )
+
+    elapsed = time.time() - t0
+    stats["seconds"] = round(elapsed, 3)
+    stats["games_per_hour"] = round(stats["games"] / elapsed * 3600, 1) if elapsed > 0 else None
+    return stats
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Self-play Damas10x10 -> data/ai_moves.jsonl")
+    ap.add_argument("--games", type=int, default=100)
+    ap.add_argument("--workers", type=int, default=0, help="0 = núcleos - 1")
+    ap.add_argument("--depth", type=int, default=3)
+    ap.add_argument("--random-plies", type=int, default=4, help="jugadas de apertura al azar")
+    ap.add_argument("--max-plies", type=int, default=200, help="límite -> tablas")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    ap.add_argument("--state", type=Path, default=DEFAULT_STATE)
+    args = ap.parse_args(argv)
+
+    stats = run_selfplay(
+        games=args.games,
+        workers=args.workers,
+        depth=args.depth,
+        random_plies=args.random_plies,
+        max_plies=args.max_plies,
+        seed=args.seed,
+        out_path=args.out,
+        state_path=args.state,
+    )
+    print("[SELFPLAY] fin:", json.dumps(stats))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,386 @@
+# backend-python/shared_cache.py
+# =========================================================
+# Caché compartida entre workers (uvicorn --workers N) sobre un
+# archivo mapeado en memoria (mmap)
+#
+# Layout del archivo (little endian):
+#   [cabecera 64 B]
+#   [tabla de invalidaciones: n_inval × 24 B]
+#       base_hash u64 | ts_ms u64 | crc32 u32 | pad u32
+#   [tabla de entradas: n_slots × slot_size B]
+#       hash u64 | ts_ms u64 | expira u32 | len u16 | crc32 u32 | payload
+#
+# - Sin locks en lectura/escritura: cada slot lleva crc32 de cabecera
+#   + payload; una escritura a medias (dos workers en el mismo slot,
+#   o un proceso que muere a mitad) se detecta y cuenta como miss.
+# - Buckets de 2 slots: se reemplaza el mismo hash o el más viejo.
+# - Hash estable entre procesos (blake2b, no hash() de Python).
+# - Invalidación por posición: se anota "base invalidada en ts"; las
+#   entradas escritas antes de ese ts se ignoran. Si la anotación
+#   pisa la de otra base, su ts pasa al "suelo" global de la cabecera
+#   (conservador: nunca revive una entrada invalidada).
+# - El archivo persiste: un worker que reinicia encuentra la caché
+#   caliente. Si cambia el layout (tamaño/versión) se reinicializa.
+# - SharedTT (más abajo): la tabla de transposición de la búsqueda,
+#   en su propio archivo con slots fijos.
+# =========================================================
+
+from __future__ import annotations
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+try:  # solo para serializar la inicialización del archivo
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+MAGIC = b"DMSC"
+LAYOUT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHHIIQ")        # magic, version, slot_size, n_slots, n_inval, floor_ms
+_HEADER_SIZE = 64
+_FLOOR_OFFSET = 16                          # offset de floor_ms dentro de la cabecera
+_INVAL = struct.Struct("<QQII")             # base_hash, ts_ms, crc, pad
+_SLOT = struct.Struct("<QQIHI")             # hash, ts_ms, expira, len, crc
+_U64 = struct.Struct("<Q")
+
+
+def key_hash(key: str) -> int:
+    h = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+    return h or 1  # 0 = slot vacío
+
+
+def _base_of(k: str) -> str:
+    return k.split("|side:", 1)[0]
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _init_mapped_file(fd: int, size: int, expected: bytes, cmp_len: int) -> None:
+    """Deja el archivo con `size` bytes y cabecera `expected` (los
+    primeros cmp_len bytes deben coincidir); si no, lo reinicia a ceros."""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        st = os.fstat(fd)
+        head = os.pread(fd, len(expected), 0) if st.st_size >= len(expected) else b""
+        if st.st_size == size and head[:cmp_len] == expected[:cmp_len]:
+            return
+        os.ftruncate(fd, 0)
+        os.ftruncate(fd, size)  # ceros = todo vacío
+        os.pwrite(fd, expected, 0)
+    finally:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class SharedCache:
+    def __init__(self, path: Path, size_mb: float = 16, slot_size: int = 512, n_inval: int = 4096) -> None:
+        self.path = Path(path)
+        self.slot_size = int(slot_size)
+        self.n_inval = int(n_inval)
+        inval_bytes = self.n_inval * _INVAL.size
+        self.n_slots = max(2, (int(size_mb * 1024 * 1024) - _HEADER_SIZE - inval_bytes) // self.slot_size) & ~1
+        self._inval_off = _HEADER_SIZE
+        self._slots_off = _HEADER_SIZE + inval_bytes
+        self.size = self._slots_off + self.n_slots * self.slot_size
+        self.max_payload = self.slot_size - _SLOT.size
+
+        self.hits = 0
+        self.misses = 0
+        self.torn = 0
+        self.writes = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._init_file()
+        self._mm = mmap.mmap(self._fd, self.size)
+
+    # -------------------------------------------------------
+    # Inicialización (único punto con lock: flock del archivo)
+    # -------------------------------------------------------
+    def _expected_header(self) -> bytes:
+        return _HEADER.pack(MAGIC, LAYOUT_VERSION, self.slot_size, self.n_slots, self.n_inval, 0)
+
+    def _init_file(self) -> None:
+        # se compara todo menos floor_ms
+        _init_mapped_file(self._fd, self.size, self._expected_header(), _FLOOR_OFFSET)
+
+    def close(self) -> None:
+        try:
+            self._mm.close()
+        finally:
+            os.close(self._fd)
+
+    # -------------------------------------------------------
+    # Entradas
+    # -------------------------------------------------------
+    def _bucket(self, h: int) -> Tuple[int, int]:
+        i = (h % self.n_slots) & ~1
+        base = self._slots_off + i * self.slot_size
+        return base, base + self.slot_size
+
+    def _read_slot(self, off: int) -> Optional[Tuple[int, int, int, bytes]]:
+        """(hash, ts_ms, expira, payload) o None si vacío/roto."""
+        h, ts, exp, n, crc = _SLOT.unpack_from(self._mm, off)
+        if h == 0:
+            return None
+        if n > self.max_payload:
+            self.torn += 1
+            return None
+        start = off + _SLOT.size
+        payload = self._mm[start:start + n]
+        if zlib.crc32(payload, zlib.crc32(_SLOT.pack(h, ts, exp, n, 0))) != crc:
+            self.torn += 1
+            return None
+        return h, ts, exp, payload
+
+    def get_raw(self, key: str, min_ts: int = 0) -> Optional[Tuple[bytes, int]]:
+        """(payload, ts_ms) si existe, no expiró, se escribió en/después de min_ts y después del suelo."""
+        h = key_hash(key)
+        now_s = int(time.time())
+        for off in self._bucket(h):
+            slot = self._read_slot(off)
+            if slot is None or slot[0] != h:
+                continue
+            _, ts, exp, payload = slot
+            if exp and exp < now_s:
+                break
+            if ts < min_ts or ts <= self.floor_ms():
+                break
+            self.hits += 1
+            return payload, ts
+        self.misses += 1
+        return None
+
+    def put_raw(self, key: str, payload: bytes, ttl: float = 0, ts_ms: Optional[int] = None) -> bool:
+        if len(payload) > self.max_payload:
+            return False
+        h = key_hash(key)
+        ts = ts_ms if ts_ms is not None else _now_ms()
+        exp = int(time.time() + ttl) if ttl else 0
+
+        # mismo hash > vacío/roto > el más viejo
+        target, oldest = None, None
+        for off in self._bucket(h):
+            slot = self._read_slot(off)
+            if slot is None:
+                target = target or off
+                continue
+            if slot[0] == h:
+                target = off
+                break
+            if oldest is None or slot[1] < oldest[1]:
+                oldest = (off, slot[1])
+        if target is None:
+            target = oldest[0]
+
+        n = len(payload)
+        crc = zlib.crc32(payload, zlib.crc32(_SLOT.pack(h, ts, exp, n, 0)))
+        start = target + _SLOT.size
+        self._mm[start:start + n] = payload
+        _SLOT.pack_into(self._mm, target, h, ts, exp, n, crc)
+        self.writes += 1
+        return True
+
+    def get(self, key: str, min_ts: int = 0) -> Optional[Any]:
+        hit = self.get_raw(key, min_ts)
+        if hit is None:
+            return None
+        try:
+            return json.loads(hit[0])
+        except ValueError:
+            self.torn += 1
+            return None
+
+    def put(self, key: str, value: Any, ttl: float = 0) -> bool:
+        payload = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return self.put_raw(key, payload, ttl)
+
+    # -------------------------------------------------------
+    # Invalidaciones por posición (k sin side)
+    # -------------------------------------------------------
+    def floor_ms(self) -> int:
+        return _U64.unpack_from(self._mm, _FLOOR_OFFSET)[0]
+
+    def _raise_floor(self, ts: int) -> None:
+        if ts > self.floor_ms():
+            _U64.pack_into(self._mm, _FLOOR_OFFSET, ts)
+
+    def _inval_off_of(self, bh: int) -> int:
+        return self._inval_off + (bh % self.n_inval) * _INVAL.size
+
+    def invalidate(self, k: str) -> None:
+        bh = key_hash(_base_of(k))
+        off = self._inval_off_of(bh)
+        old_h, old_ts, old_crc, _ = _INVAL.unpack_from(self._mm, off)
+        if old_h and old_h != bh:
+            # se pisa la anotación de otra base: su ts pasa al suelo global
+            self._raise_floor(old_ts)
+        ts = _now_ms()
+        crc = zlib.crc32(_U64.pack(bh) + _U64.pack(ts))
+        _INVAL.pack_into(self._mm, off, bh, ts, crc, 0)
+
+    def invalidated_at(self, k: str) -> int:
+        """ts_ms de la última invalidación de la base de k (0 = nunca)."""
+        bh = key_hash(_base_of(k))
+        h, ts, crc, _ = _INVAL.unpack_from(self._mm, self._inval_off_of(bh))
+        if h == 0 or h != bh:
+            return 0
+        if zlib.crc32(_U64.pack(h) + _U64.pack(ts)) != crc:
+            # anotación rota: conservador, invalida todo lo anterior a ahora
+            self.torn += 1
+            return _now_ms()
+        return ts
+
+    def stats(self) -> dict:
+        return {
+            "path": str(self.path),
+            "bytes": self.size,
+            "slots": self.n_slots,
+            "slot_size": self.slot_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "torn": self.torn,
+        }
+
+
+# =========================================================
+# Tabla de transposición compartida (SharedTT)
+#
+# Mismo archivo mmap entre workers, pero con slots fijos de 32 B y sin
+# JSON ni crc: la TT se consulta en cada nodo de la búsqueda.
+#   [cabecera 64 B]  magic "DMTT", versión, n_slots
+#   [slots: n_slots × 32 B]
+#       check u64 | score f64 | move u64 | depth u16 | flag u8 | pad
+# - Sin locks ("lockless hashing"): check = clave ^ las otras 3
+#   palabras; un slot a medias no cuadra y cuenta como miss.
+# - La clave u64 la pone quien llama: TranspositionTable (ai_engine.py)
+#   usa hash de la posición (Zobrist con semilla fija, igual en todos
+#   los procesos) ^ key_hash(engine_version()), así las entradas de otra
+#   versión (pesos, reglas, búsqueda) simplemente no aciertan.
+# - Buckets de 2 slots: el 1.º prefiere profundidad, el 2.º siempre se
+#   reemplaza. Jugadas cuyo código no cabe en 64 bits se guardan sin
+#   jugada (solo se pierde la pista de ordenación).
+# =========================================================
+TT_MAGIC = b"DMTT"
+TT_LAYOUT_VERSION = 1
+
+_TT_HEADER = struct.Struct("<4sHHI")        # magic, version, slot_size, n_slots
+_TT_SLOT = struct.Struct("<QQQQ")           # check, score (bits f64), move, depth | flag << 16
+_TT_SLOT_SIZE = _TT_SLOT.size
+_F64 = struct.Struct("<d")
+_MASK64 = (1 << 64) - 1
+
+
+class SharedTT:
+    def __init__(self, path: Path, size_mb: float = 64) -> None:
+        self.path = Path(path)
+        self.n_slots = max(2, (int(size_mb * 1024 * 1024) - _HEADER_SIZE) // _TT_SLOT_SIZE) & ~1
+        self.size = _HEADER_SIZE + self.n_slots * _TT_SLOT_SIZE
+
+        self.hits = 0
+        self.misses = 0  # incluye slots a medias (no se distinguen de otra posición)
+        self.writes = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        header = _TT_HEADER.pack(TT_MAGIC, TT_LAYOUT_VERSION, _TT_SLOT_SIZE, self.n_slots)
+        _init_mapped_file(self._fd, self.size, header, len(header))
+        self._mm = mmap.mmap(self._fd, self.size)
+
+    def close(self) -> None:
+        try:
+            self._mm.close()
+        finally:
+            os.close(self._fd)
+
+    def _bucket(self, key: int) -> int:
+        return _HEADER_SIZE + ((key % self.n_slots) & ~1) * _TT_SLOT_SIZE
+
+    def _read(self, off: int, key: int) -> Optional[Tuple[int, int, float, Optional[int]]]:
+        check, w_score, move, w_meta = _TT_SLOT.unpack_from(self._mm, off)
+        if check ^ w_score ^ move ^ w_meta != key:
+            return None
+        return w_meta & 0xFFFF, w_meta >> 16, _F64.unpack(_U64.pack(w_score))[0], move or None
+
+    def get(self, key: int) -> Optional[Tuple[int, int, float, Optional[int]]]:
+        """(depth, flag, score, código de jugada o None), como TranspositionTable."""
+        key &= _MASK64
+        off = self._bucket(key)
+        for o in (off, off + _TT_SLOT_SIZE):
+            entry = self._read(o, key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    def put(self, key: int, depth: int, flag: int, score: float, move: Optional[int]) -> None:
+        key &= _MASK64
+        off = self._bucket(key)
+        first = self._read(off, key)
+        if first is None:
+            # vacío, roto u otra posición: se compara con lo que haya
+            check, _, _, w_meta = _TT_SLOT.unpack_from(self._mm, off)
+            if check and depth < (w_meta & 0xFFFF):
+                off += _TT_SLOT_SIZE
+        elif depth < first[0]:
+            off += _TT_SLOT_SIZE
+        w_score = _U64.unpack(_F64.pack(score))[0]
+        w_move = move if move is not None and move <= _MASK64 else 0
+        w_meta = (min(depth, 0xFFFF) & 0xFFFF) | ((flag & 0xFF) << 16)
+        _TT_SLOT.pack_into(self._mm, off, key ^ w_score ^ w_move ^ w_meta, w_score, w_move, w_meta)
+        self.writes += 1
+
+    def stats(self) -> dict:
+        return {
+            "path": str(self.path),
+            "bytes": self.size,
+            "slots": self.n_slots,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+        }
+
+
+def shared_cache_from_env(data_dir: Path) -> Optional[SharedCache]:
+    """
+    DAMAS_SHARED_CACHE=1 | <ruta>   (vacío = desactivada)
+    DAMAS_SHARED_CACHE_MB=16
+    """
+    spec = os.environ.get("DAMAS_SHARED_CACHE", "").strip()
+    if not spec or spec in ("0", "false", "no"):
+        return None
+    path = data_dir / "search_cache.mmap" if spec in ("1", "true", "yes") else Path(spec)
+    try:
+        size_mb = float(os.environ.get("DAMAS_SHARED_CACHE_MB", "") or 16)
+    except ValueError:
+        size_mb = 16
+    return SharedCache(path, size_mb=size_mb)
+
+
+def shared_tt_from_env(data_dir: Path) -> Optional[SharedTT]:
+    """
+    DAMAS_SHARED_TT=1 | <ruta>   (vacío = cada búsqueda con su TT local)
+    DAMAS_SHARED_TT_MB=64
+    """
+    spec = os.environ.get("DAMAS_SHARED_TT", "").strip()
+    if not spec or spec in ("0", "false", "no"):
+        return None
+    path = data_dir / "search_tt.mmap" if spec in ("1", "true", "yes") else Path(spec)
+    try:
+        size_mb = float(os.environ.get("DAMAS_SHARED_TT_MB", "") or 64)
+    except ValueError:
+        size_mb = 64
+    return SharedTT(path, size_mb=size_mb)
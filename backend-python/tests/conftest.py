@@ -0,0 +1,6 @@
+# backend-python/tests/conftest.py
+# Los módulos del backend se importan por nombre (como hace main.py).
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,205 @@
+# backend-python/tests/test_mail_queue.py
+# =========================================================
+# MailQueue contra un servidor SMTP stub (socket local, sin TLS)
+# =========================================================
+
+import os
+import socketserver
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from mail_queue import MailQueue
+
+
+class _StubSMTP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = []       # (conexión, destinatario)
+        self.refuse_rcpt = 0     # cuántos RCPT rechazar (451) antes de aceptar
+
+
+class _StubHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str) -> None:
+        self.wfile.write((line + "\r\n").encode("ascii"))
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        srv = self.server
+        with srv.lock:
+            srv.connections += 1
+            conn = srv.connections
+        self._reply("220 stub ESMTP")
+        rcpt = None
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            cmd = raw.decode("ascii", "replace").strip()
+            verb = cmd.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self._reply("250 stub")
+            elif verb in ("MAIL", "RSET"):
+                rcpt = None
+                self._reply("250 OK")
+            elif verb == "NOOP":
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                with srv.lock:
+                    refuse = srv.refuse_rcpt > 0
+                    if refuse:
+                        srv.refuse_rcpt -= 1
+                if refuse:
+                    self._reply("451 try later")
+                else:
+                    rcpt = cmd.split(":", 1)[1].strip(" <>")
+                    self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 go ahead")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with srv.lock:
+                    srv.messages.append((conn, rcpt))
+                self._reply("250 queued")
+            elif verb == "QUIT":
+                self._reply("221 bye")
+                return
+            else:
+                self._reply("502 unknown")
+
+
+@pytest.fixture
+def smtp_server():
+    srv = _StubSMTP()
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _queue(tmp_path: Path, srv: _StubSMTP, **kw) -> MailQueue:
+    return MailQueue(
+        tmp_path / "spool",
+        "127.0.0.1",
+        srv.server_address[1],
+        sender="noreply@test",
+        use_tls=False,
+        **kw,
+    )
+
+
+def test_reuses_one_connection_and_drains(tmp_path, smtp_server):
+    q = _queue(tmp_path, smtp_server, batch_size=3)
+    for i in range(7):
+        q.enqueue(f"u{i}@test", "hola", "cuerpo")
+    q.start()
+    try:
+        assert q.drain(timeout=10)
+    finally:
+        q.stop()
+
+    assert q.sent == 7
+    assert sorted(r for _, r in smtp_server.messages) == sorted(f"u{i}@test" for i in range(7))
+    assert smtp_server.connections == 1
+    assert q.pending_count() == 0
+
+
+def test_backoff_retries_then_sends(tmp_path, smtp_server):
+    smtp_server.refuse_rcpt = 2
+    q = _queue(tmp_path, smtp_server, base_backoff=0.2, max_attempts=5)
+    msg_id = q.enqueue("u@test", "hola", "cuerpo")
+    item_path = q.pending_dir / f"{msg_id}.json"
+
+    assert q.process_batch() is False
+    item = q._read_item(item_path)
+    assert item["attempts"] == 1
+    # backoff: aún no toca reintentar
+    assert item["next_at"] > time.time()
+    assert q.process_batch() is False
+    assert q._read_item(item_path)["attempts"] == 1
+
+    time.sleep(0.25)
+    assert q.process_batch() is False
+    item = q._read_item(item_path)
+    assert item["attempts"] == 2
+    assert item["next_at"] - time.time() > 0.25  # 0.2 * 2
+
+    q.start()
+    try:
+        assert q.drain(timeout=5)
+    finally:
+        q.stop()
+    assert q.sent == 1 and q.failed == 2
+    assert [r for _, r in smtp_server.messages] == ["u@test"]
+    # rechazos de RCPT no cierran la conexión
+    assert smtp_server.connections == 1
+
+
+def test_gives_up_after_max_attempts(tmp_path, smtp_server):
+    smtp_server.refuse_rcpt = 100
+    q = _queue(tmp_path, smtp_server, base_backoff=0.0, max_attempts=3)
+    msg_id = q.enqueue("u@test", "hola", "cuerpo")
+    for _ in range(3):
+        q.process_batch()
+    assert q.pending_count() == 0
+    assert (q.dead_dir / f"{msg_id}.json").exists()
+    assert q.dead == 1 and q.sent == 0
+
+
+def test_corrupt_spool_file_goes_to_dead(tmp_path, smtp_server):
+    q = _queue(tmp_path, smtp_server)
+    (q.pending_dir / "0000000000000-broken.json").write_text("{no es json", encoding="utf-8")
+    q.enqueue("u@test", "hola", "cuerpo")
+
+    q.start()
+    try:
+        assert q.drain(timeout=5)
+    finally:
+        q.stop()
+    assert q.sent == 1
+    assert (q.dead_dir / "0000000000000-broken.json").exists()
+    assert q.dead == 1
+
+
+def test_workers_sharing_the_spool_send_each_message_once(tmp_path, smtp_server):
+    # como uvicorn --workers 3: un dispatcher por proceso sobre el mismo spool
+    queues = [_queue(tmp_path, smtp_server, batch_size=2) for _ in range(3)]
+    for i in range(30):
+        queues[0].enqueue(f"u{i}@test", "hola", "cuerpo")
+    for q in queues:
+        q.start()
+    try:
+        assert queues[0].drain(timeout=10)
+    finally:
+        for q in queues:
+            q.stop()
+
+    assert sum(q.sent for q in queues) == 30
+    assert sorted(r for _, r in smtp_server.messages) == sorted(f"u{i}@test" for i in range(30))
+
+
+def test_stale_inflight_goes_back_to_pending_on_start(tmp_path, smtp_server):
+    q = _queue(tmp_path, smtp_server, inflight_timeout=60)
+    old = q._claim(q.pending_dir / f"{q.enqueue('old@test', 'hola', 'cuerpo')}.json")
+    fresh = q._claim(q.pending_dir / f"{q.enqueue('fresh@test', 'hola', 'cuerpo')}.json")
+    t = time.time() - 120
+    os.utime(old, (t, t))
+
+    q.start()
+    try:
+        # solo el huérfano vuelve y se envía; el reclamo reciente es de "otro worker"
+        deadline = time.time() + 5
+        while not smtp_server.messages and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        q.stop()
+    assert [r for _, r in smtp_server.messages] == ["old@test"]
+    assert fresh.exists()
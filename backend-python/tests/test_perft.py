@@ -0,0 +1,52 @@
+# backend-python/tests/test_perft.py
+# =========================================================
+# Perft del motor contra el generador de referencia (bench/reference.py),
+# que no comparte código con ai_engine.py.
+# =========================================================
+
+import random
+
+import pytest
+
+from ai_engine import generate_legal_moves, key_to_board
+from bench.perft import perft
+from bench.positions import PERFT_POSITIONS
+from bench.reference import parse_key, reference_move_strs, reference_perft
+
+REF_DEPTH = 4  # la referencia es lenta; d=5 lo cubre `python -m bench.reference`
+
+
+@pytest.mark.parametrize("pos", PERFT_POSITIONS, ids=[p["name"] for p in PERFT_POSITIONS])
+def test_reference_matches_known_counts(pos):
+    board, side = parse_key(pos["k"])
+    for depth in range(1, REF_DEPTH + 1):
+        assert reference_perft(board, side, depth) == pos["nodes"][depth], depth
+
+
+@pytest.mark.parametrize("pos", PERFT_POSITIONS, ids=[p["name"] for p in PERFT_POSITIONS])
+def test_engine_perft_matches_known_counts(pos):
+    board, side = key_to_board(pos["k"])
+    for depth, expected in sorted(pos["nodes"].items()):
+        assert perft(board, side, depth) == expected, depth
+
+
+def _random_board(rng):
+    board = [[None] * 10 for _ in range(10)]
+    dark = [(r, c) for r in range(10) for c in range(10) if (r + c) % 2 == 1]
+    for r, c in rng.sample(dark, rng.randint(4, 30)):
+        p = rng.choice("rnrnRN")
+        if p == "r" and r == 0:
+            p = "R"
+        if p == "n" and r == 9:
+            p = "N"
+        board[r][c] = p
+    return board
+
+
+def test_engine_moves_match_reference_on_random_boards():
+    rng = random.Random(46)
+    for _ in range(3000):
+        board = _random_board(rng)
+        for side in ("R", "N"):
+            got = sorted(mv.to_algebraic() for mv in generate_legal_moves(board, side))
+            assert got == reference_move_strs(board, side), (board, side)
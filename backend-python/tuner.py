@@ -0,0 +1,247 @@
+# backend-python/tuner.py
+# =========================================================
+# Ajuste offline de pesos de evaluación (Texel)
+#
+#   python tuner.py --log data/ai_moves.jsonl --out data/eval_weights.json
+#
+# 1) Lee ai_moves.jsonl en streaming (bloques de --chunk filas),
+#    vía experience_log.py: tabla compacta + segmentos vivos.
+#    Solo filas cuyo score es un resultado real (OUTCOME_SOURCES,
+#    p.ej. self-play): las de /ai/log-moves traen score 0 por jugada
+#    y serían etiquetas de ruido. Cada fila con key+side y score en
+#    [-1, 1] es un ejemplo:
+#       posición = k (antes de mover), resultado = (score + 1) / 2
+#    (score = resultado de la partida para quien movió).
+# 2) Extrae features vectorizadas con batch_eval (6 términos).
+# 3) Ajusta K (escala del sigmoide) con los pesos actuales y luego
+#    los pesos minimizando el MSE de sigmoid(K * eval) vs resultado
+#    (descenso de gradiente con NumPy, regularización L2 hacia los
+#    pesos actuales, peón fijo en 1.0 como ancla de escala).
+# 4) Escribe un archivo de pesos versionado que ai_engine.py carga
+#    al arrancar (data/eval_weights.json).
+# =========================================================
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ai_engine import eval_weights
+from batch_eval import FEATURES, features_batch, keys_to_tensor, weights_vector
+from experience_log import ExperienceLog
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_LOG = BASE_DIR / "data" / "ai_moves.jsonl"
+DEFAULT_OUT = BASE_DIR / "data" / "eval_weights.json"
+
+GAME_RESULT = "__GAME_RESULT__"
+# "src" de las filas cuyo score es el resultado de la partida
+OUTCOME_SOURCES = frozenset({"selfplay"})
+ANCHOR = "pawn"
+
+
+# ---------------------------------------------------------
+# Lectura en streaming
+# ---------------------------------------------------------
+def iter_examples(log_path: Path, chunk: int = 50000) -> Iterator[Tuple[List[str], np.ndarray, np.ndarray]]:
+    """Genera (keys, signos_side, resultados[0..1]) por bloques."""
+    keys: List[str] = []
+    signs: List[float] = []
+    ys: List[float] = []
+
+    for row in ExperienceLog(log_path).iter_rows():
+        if row.get("move") in (None, "", GAME_RESULT):
+            continue
+        if row.get("src") not in OUTCOME_SOURCES:
+            continue
+        k = row.get("k")
+        if not isinstance(k, str) or "|side:" not in k:
+            continue
+        side = k.rsplit("|side:", 1)[1].strip()
+        if side not in ("R", "N"):
+            continue
+        try:
+            score = float(row.get("score"))
+            count = max(1, int(row.get("count") or 1))
+        except (TypeError, ValueError):
+            continue
+        # fila compactada: score = suma de `count` resultados; la media
+        # repetida `count` veces da el mismo gradiente del MSE
+        score /= count
+        if not -1.0 <= score <= 1.0:
+            continue
+
+        for _ in range(count):
+            keys.append(k)
+            signs.append(1.0 if side == "R" else -1.0)
+            ys.append((score + 1.0) / 2.0)
+
+            if len(keys) >= chunk:
+                yield keys, np.array(signs), np.array(ys)
+                keys, signs, ys = [], [], []
+
+    if keys:
+        yield keys, np.array(signs), np.array(ys)
+
+
+def load_dataset(log_path: Path, chunk: int = 50000, limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """X: features desde el punto de vista del side que mueve (N,6); y: (N,)."""
+    xs: List[np.ndarray] = []
+    ys: List[np.ndarray] = []
+    total = 0
+    for keys, sign, y in iter_examples(log_path, chunk):
+        try:
+            feats = features_batch(keys_to_tensor(keys))
+        except ValueError:
+            continue
+        xs.append((feats * sign[:, None]).astype(np.float64))
+        ys.append(y)
+        total += len(keys)
+        if limit and total >= limit:
+            break
+    if not xs:
+        return np.zeros((0, len(FEATURES))), np.zeros(0)
+    X = np.concatenate(xs)
+    y = np.concatenate(ys)
+    if limit:
+        X, y = X[:limit], y[:limit]
+    return X, y
+
+
+# ---------------------------------------------------------
+# Ajuste
+# ---------------------------------------------------------
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -50.0, 50.0)))
+
+
+def texel_loss(X: np.ndarray, y: np.ndarray, w: np.ndarray, K: float) -> float:
+    return float(np.mean((_sigmoid(K * (X @ w)) - y) ** 2))
+
+
+def fit_k(X: np.ndarray, y: np.ndarray, w: np.ndarray) -> float:
+    """Búsqueda en rejilla + refinamiento de K con los pesos dados."""
+    best_k, best = 1.0, float("inf")
+    for k in np.geomspace(0.05, 20.0, 60):
+        loss = texel_loss(X, y, w, float(k))
+        if loss < best:
+            best_k, best = float(k), loss
+    step = best_k * 0.1
+    for _ in range(30):
+        for cand in (best_k - step, best_k + step):
+            if cand > 0:
+                loss = texel_loss(X, y, w, cand)
+                if loss < best:
+                    best_k, best = cand, loss
+        step *= 0.6
+    return best_k
+
+
+def fit_weights(
+    X: np.ndarray,
+    y: np.ndarray,
+    w0: np.ndarray,
+    K: float,
+    epochs: int = 400,
+    lr: float = 0.05,
+    l2: float = 1e-3,
+) -> np.ndarray:
+    """Adam sobre MSE(sigmoid(K·Xw), y) + l2·|w - w0|²; el ancla no se mueve."""
+    anchor = FEATURES.index(ANCHOR)
+    free = np.ones_like(w0)
+    free[anchor] = 0.0
+
+    # escala por feature para que un mismo lr sirva a todos los términos
+    scale = np.maximum(np.abs(X).mean(axis=0), 1e-6)
+    w = w0.copy()
+    m = np.zeros_like(w)
+    v = np.zeros_like(w)
+    b1, b2, eps = 0.9, 0.999, 1e-8
+    n = max(len(y), 1)
+
+    for t in range(1, epochs + 1):
+        p = _sigmoid(K * (X @ w))
+        grad = (2.0 / n) * (X.T @ ((p - y) * p * (1.0 - p))) * K + 2.0 * l2 * (w - w0)
+        grad *= free
+        m = b1 * m + (1 - b1) * grad
+        v = b2 * v + (1 - b2) * grad * grad
+        mh = m / (1 - b1 ** t)
+        vh = v / (1 - b2 ** t)
+        w -= lr * (mh / (np.sqrt(vh) + eps)) / scale
+    return w
+
+
+def tune(
+    log_path: Path = DEFAULT_LOG,
+    epochs: int = 400,
+    lr: float = 0.05,
+    l2: float = 1e-3,
+    limit: Optional[int] = None,
+    chunk: int = 50000,
+) -> Dict:
+    t0 = time.time()
+    X, y = load_dataset(log_path, chunk=chunk, limit=limit)
+    if len(y) == 0:
+        raise SystemExit(f"[TUNER] sin ejemplos utilizables en {log_path}")
+
+    base = eval_weights()
+    w0 = weights_vector(base)
+    K = fit_k(X, y, w0)
+    loss_before = texel_loss(X, y, w0, K)
+    w = fit_weights(X, y, w0, K, epochs=epochs, lr=lr, l2=l2)
+    loss_after = texel_loss(X, y, w, K)
+
+    weights = {name: round(float(val), 6) for name, val in zip(FEATURES, w)}
+    return {
+        "version": f"texel-{time.strftime('%Y%m%d-%H%M%S')}-n{len(y)}",
+        "created": int(time.time() * 1000),
+        "source": str(log_path),
+        "positions": int(len(y)),
+        "K": round(K, 6),
+        "loss_before": round(loss_before, 8),
+        "loss_after": round(loss_after, 8),
+        "seconds": round(time.time() - t0, 3),
+        "base_weights": base,
+        "weights": weights,
+    }
+
+
+def save_weights(result: Dict, out_path: Path = DEFAULT_OUT) -> None:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    tmp.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, out_path)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Tuner Texel de pesos de evaluación")
+    ap.add_argument("--log", type=Path, default=DEFAULT_LOG)
+    ap.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    ap.add_argument("--epochs", type=int, default=400)
+    ap.add_argument("--lr", type=float, default=0.05)
+    ap.add_argument("--l2", type=float, default=1e-3)
+    ap.add_argument("--limit", type=int, default=None, help="máximo de posiciones")
+    ap.add_argument("--chunk", type=int, default=50000)
+    ap.add_argument("--dry-run", action="store_true", help="no escribe el archivo de pesos")
+    args = ap.parse_args(argv)
+
+    result = tune(args.log, epochs=args.epochs, lr=args.lr, l2=args.l2, limit=args.limit, chunk=args.chunk)
+    print(
+        f"[TUNER] {result['positions']} posiciones K={result['K']} "
+        f"loss {result['loss_before']:.6f} -> {result['loss_after']:.6f}"
+    )
+    for name in FEATURES:
+        print(f"[TUNER]   {name:<12} {result['base_weights'][name]:>9.4f} -> {result['weights'][name]:>9.4f}")
+    if not args.dry_run:
+        save_weights(result, args.out)
+        print(f"[TUNER] pesos {result['version']} -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
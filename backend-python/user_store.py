@@ -0,0 +1,238 @@
+# backend-python/user_store.py
+# =========================================================
+# Repositorio de usuarios sobre SQLite (stdlib)
+# - Índices por id (PK), email y teléfono -> lookups O(log n)
+# - Caché de lectura en proceso (LRU pequeña)
+# - Escrituras transaccionales (todo o nada)
+# - Migración única desde users.json (formato legacy)
+# =========================================================
+
+from __future__ import annotations
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id    TEXT PRIMARY KEY,
+    email TEXT,
+    phone TEXT,
+    data  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS idx_users_phone ON users(phone);
+CREATE TABLE IF NOT EXISTS meta (
+    k TEXT PRIMARY KEY,
+    v TEXT
+);
+"""
+
+UserRow = Dict[str, Any]
+
+log = logging.getLogger(__name__)
+
+
+def _norm_email(email: Any) -> Optional[str]:
+    if not isinstance(email, str):
+        return None
+    e = email.strip().lower()
+    return e or None
+
+
+def _norm_phone(phone: Any) -> Optional[str]:
+    if not isinstance(phone, str):
+        return None
+    p = phone.strip()
+    return p or None
+
+
+class UserStore:
+    """
+    Almacén indexado de usuarios.
+
+    Las filas se devuelven como dicts (copias), así el repositorio no
+    depende de los modelos Pydantic de main.py.
+    """
+
+    def __init__(self, db_path: Path, legacy_json: Optional[Path] = None, cache_size: int = 256) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        self._cache: "OrderedDict[Tuple[str, str], Optional[UserRow]]" = OrderedDict()
+        self._cache_size = max(0, int(cache_size))
+
+        if legacy_json is not None:
+            self.migrate_from_json(Path(legacy_json))
+
+    # -----------------------------------------------------
+    # Caché de lectura
+    # -----------------------------------------------------
+    def _cache_get(self, ck: Tuple[str, str]) -> Tuple[bool, Optional[UserRow]]:
+        if ck in self._cache:
+            self._cache.move_to_end(ck)
+            row = self._cache[ck]
+            return True, (dict(row) if row is not None else None)
+        return False, None
+
+    def _cache_put(self, ck: Tuple[str, str], row: Optional[UserRow]) -> None:
+        if self._cache_size <= 0:
+            return
+        self._cache[ck] = dict(row) if row is not None else None
+        self._cache.move_to_end(ck)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def _invalidate(self) -> None:
+        # Las escrituras son raras frente a las lecturas: vaciar es simple y correcto
+        self._cache.clear()
+
+    # -----------------------------------------------------
+    # Lecturas
+    # -----------------------------------------------------
+    def _get_by(self, column: str, value: Optional[str]) -> Optional[UserRow]:
+        if not value:
+            return None
+        ck = (column, value)
+        with self._lock:
+            hit, row = self._cache_get(ck)
+            if hit:
+                return row
+            cur = self._conn.execute(f"SELECT data FROM users WHERE {column} = ? LIMIT 1", (value,))
+            found = cur.fetchone()
+            row = json.loads(found[0]) if found else None
+            self._cache_put(ck, row)
+            return dict(row) if row is not None else None
+
+    def get_by_id(self, user_id: Optional[str]) -> Optional[UserRow]:
+        return self._get_by("id", user_id)
+
+    def get_by_email(self, email: Optional[str]) -> Optional[UserRow]:
+        return self._get_by("email", _norm_email(email))
+
+    def get_by_phone(self, phone: Optional[str]) -> Optional[UserRow]:
+        return self._get_by("phone", _norm_phone(phone))
+
+    def list_all(self) -> List[UserRow]:
+        with self._lock:
+            cur = self._conn.execute("SELECT data FROM users ORDER BY rowid")
+            return [json.loads(r[0]) for r in cur.fetchall()]
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0])
+
+    # -----------------------------------------------------
+    # Escrituras (transaccionales)
+    # -----------------------------------------------------
+    @staticmethod
+    def _params(row: UserRow) -> Tuple[str, Optional[str], Optional[str], str]:
+        user_id = str(row["id"])
+        return (
+            user_id,
+            _norm_email(row.get("email")),
+            _norm_phone(row.get("phone")),
+            json.dumps(row, ensure_ascii=False),
+        )
+
+    def _write(self, sql_rows: Iterable[Tuple[str, Any]]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in sql_rows:
+                    self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._invalidate()
+
+    def upsert(self, row: UserRow) -> None:
+        self.upsert_many([row])
+
+    def upsert_many(self, rows: Iterable[UserRow]) -> None:
+        self._write(
+            ("INSERT OR REPLACE INTO users(id, email, phone, data) VALUES (?, ?, ?, ?)", self._params(r))
+            for r in rows
+        )
+
+    def insert_unique(self, row: UserRow) -> bool:
+        """
+        Inserta un usuario nuevo comprobando email/teléfono dentro de
+        la misma transacción. Devuelve False si ya existe.
+        """
+        params = self._params(row)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self._conn.execute(
+                    "SELECT 1 FROM users WHERE id = ? OR (email IS NOT NULL AND email = ?) "
+                    "OR (phone IS NOT NULL AND phone = ?) LIMIT 1",
+                    (params[0], params[1], params[2]),
+                )
+                if cur.fetchone():
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.execute("INSERT INTO users(id, email, phone, data) VALUES (?, ?, ?, ?)", params)
+                self._conn.execute("COMMIT")
+                return True
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._invalidate()
+
+    def replace_all(self, rows: Iterable[UserRow]) -> None:
+        rows = list(rows)
+        ops: List[Tuple[str, Any]] = [("DELETE FROM users", ())]
+        ops += [("INSERT OR REPLACE INTO users(id, email, phone, data) VALUES (?, ?, ?, ?)", self._params(r)) for r in rows]
+        self._write(ops)
+
+    def delete(self, user_id: str) -> None:
+        self._write([("DELETE FROM users WHERE id = ?", (user_id,))])
+
+    # -----------------------------------------------------
+    # Migración desde users.json
+    # -----------------------------------------------------
+    def migrate_from_json(self, path: Path) -> int:
+        """
+        Importa users.json una sola vez (marcado en la tabla meta).
+        No borra el archivo original. Si no existe o no se puede leer,
+        no se marca: se reintenta en el próximo arranque.
+        """
+        with self._lock:
+            done = self._conn.execute("SELECT v FROM meta WHERE k = 'migrated_users_json'").fetchone()
+            if done:
+                return 0
+            if not path.exists():
+                return 0
+            try:
+                text = path.read_text(encoding="utf-8").strip()
+                data = json.loads(text) if text else []
+            except (OSError, ValueError) as e:
+                log.error("No se pudo leer %s, migración pendiente: %s", path, e)
+                return 0
+            if not isinstance(data, list):
+                log.error("%s no contiene una lista de usuarios, migración pendiente", path)
+                return 0
+            rows = [r for r in data if isinstance(r, dict) and r.get("id")]
+            ops: List[Tuple[str, Any]] = [
+                ("INSERT OR IGNORE INTO users(id, email, phone, data) VALUES (?, ?, ?, ?)", self._params(r))
+                for r in rows
+            ]
+            ops.append(("INSERT OR REPLACE INTO meta(k, v) VALUES ('migrated_users_json', ?)", (str(path),)))
+            self._write(ops)
+            return len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -214,6 +214,49 @@ export async function pedirJugadaIA(fen, sideToMove, boardSnapshot) {
   return data;
 }
 
+/**
+ * ✅ ANÁLISIS MULTI-PV (POST /ai/analyze?multipv=K)
+ * Devuelve { ok, depth, lines: [{ move, score, pv: [...] }] } con las K
+ * mejores jugadas (pistas del editor / página IA). No lanza excepción.
+ */
+export async function analizarPosicionIA({ board, side, multipv = 3, depth = null }) {
+  const sideNorm = normalizeSide(side);
+  const board10 = cleanBoard10x10(board);
+  if (!board10) {
+    return { ok: false, lines: [], reason: "invalid_board_client" };
+  }
+
+  const payload = { side: sideNorm, board: board10 };
+  if (depth) payload.depth = depth;
+  const k = Math.max(1, Math.min(10, Number(multipv) || 1));
+
+  dbg("[IA.API] POST", apiUrl(`/analyze?multipv=${k}`), payload);
+
+  const { resp, data, bodyText, error } = await fetchJsonWithTimeout(
+    apiUrl(`/analyze?multipv=${k}`),
+    {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(payload),
+    }
+  );
+
+  if (!resp) {
+    return {
+      ok: false,
+      lines: [],
+      reason: isAbortError(error) ? "timeout_abort" : "network_error",
+      meta: { error: String(error) },
+    };
+  }
+
+  if (!resp.ok) {
+    return { ok: false, lines: [], reason: `http_${resp.status}`, meta: { bodyText, raw: data } };
+  }
+
+  return data;
+}
+
 export async function enviarLogIA(entries) {
   const list = Array.isArray(entries) ? entries : [entries];
 
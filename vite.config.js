@@ -54,6 +54,18 @@ export default defineConfig({
         changeOrigin: true,
         secure: false,
       },
+      // partidas con estado en el servidor
+      "/games": {
+        target: "http://127.0.0.1:8001",
+        changeOrigin: true,
+        secure: false,
+      },
+      // IA por WebSocket (1 conexión por partida)
+      "/ws/ai": {
+        target: "ws://127.0.0.1:8001",
+        ws: true,
+        changeOrigin: true,
+      },
     },
   },
 });